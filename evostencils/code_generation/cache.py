@@ -0,0 +1,142 @@
+import hashlib
+import json
+import os
+
+
+class EvaluationCache:
+    """
+    Content-addressed disk cache that maps a generated program to its measured performance
+    """
+    def __init__(self, directory: str, maximum_number_of_entries=10000, maximum_size=None, eviction_ratio=0.9):
+        self._directory = directory
+        self._maximum_number_of_entries = maximum_number_of_entries
+        # Total size of all entries in bytes (unlimited if None)
+        self._maximum_size = maximum_size
+        # Fraction of the limits that remains after an eviction, such that the directory is rarely scanned
+        self._eviction_ratio = eviction_ratio
+        self._hits = 0
+        self._misses = 0
+        os.makedirs(directory, exist_ok=True)
+        # The number and size of the entries are tracked incrementally and only synchronized with the directory,
+        # which might be shared with other processes, on eviction
+        self._number_of_entries, self._size = self.scan()
+
+    @property
+    def directory(self):
+        return self._directory
+
+    @property
+    def maximum_number_of_entries(self):
+        return self._maximum_number_of_entries
+
+    @property
+    def maximum_size(self):
+        return self._maximum_size
+
+    @property
+    def number_of_entries(self):
+        return self._number_of_entries
+
+    @property
+    def size(self):
+        return self._size
+
+    @property
+    def hits(self):
+        return self._hits
+
+    @property
+    def misses(self):
+        return self._misses
+
+    @staticmethod
+    def compute_key(contents: list) -> str:
+        hash_function = hashlib.sha256()
+        for content in contents:
+            hash_function.update(content.encode('utf8'))
+            # Separator to prevent collisions between different splits of the same content
+            hash_function.update(b'\0')
+        return hash_function.hexdigest()
+
+    def _entry_path(self, key: str):
+        return f'{self.directory}/{key}.json'
+
+    def lookup(self, key: str):
+        path = self._entry_path(key)
+        try:
+            with open(path, 'r') as file:
+                values = json.load(file)
+            # Update the access time used for the least recently used eviction
+            os.utime(path)
+        except (OSError, ValueError):
+            self._misses += 1
+            return None
+        self._hits += 1
+        return tuple(values)
+
+    def insert(self, key: str, values: tuple):
+        path = self._entry_path(key)
+        # Write to a temporary file first, such that concurrent readers never see a partial entry
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        try:
+            previous_size = os.stat(path).st_size
+            self._number_of_entries -= 1
+            self._size -= previous_size
+        except OSError:
+            pass
+        try:
+            with open(tmp_path, 'w') as file:
+                json.dump(list(values), file)
+            size = os.stat(tmp_path).st_size
+            os.replace(tmp_path, path)
+        except OSError:
+            return
+        self._number_of_entries += 1
+        self._size += size
+        if self.exceeds_limits(self._number_of_entries, self._size):
+            self.evict()
+
+    def exceeds_limits(self, number_of_entries, size, ratio=1.0):
+        if number_of_entries > ratio * self.maximum_number_of_entries:
+            return True
+        return self.maximum_size is not None and size > ratio * self.maximum_size
+
+    def scan(self):
+        # Returns the number and total size of all entries in the directory
+        number_of_entries = 0
+        size = 0
+        try:
+            for entry in os.scandir(self.directory):
+                if entry.name.endswith('.json'):
+                    number_of_entries += 1
+                    size += entry.stat().st_size
+        except OSError:
+            pass
+        return number_of_entries, size
+
+    def evict(self):
+        # Removes the least recently used entries until the number and size of the entries are reduced
+        # to the eviction ratio of the limits
+        entries = []
+        try:
+            for entry in os.scandir(self.directory):
+                if entry.name.endswith('.json'):
+                    status = entry.stat()
+                    entries.append((status.st_mtime, status.st_size, entry.path))
+        except OSError:
+            # Entries might be removed concurrently by another process
+            return
+        entries.sort()
+        number_of_entries = len(entries)
+        size = sum(entry_size for _, entry_size, _ in entries)
+        for _, entry_size, path in entries:
+            if not self.exceeds_limits(number_of_entries, size, self._eviction_ratio):
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            number_of_entries -= 1
+            size -= entry_size
+        self._number_of_entries = number_of_entries
+        self._size = size
@@ -0,0 +1,114 @@
+import os
+import select
+import shutil
+import subprocess
+import tempfile
+import time
+
+# Launched with the single-file source mode of java (Java 11 or newer),
+# such that no separate build step is required for the server
+SERVER_SOURCE = """
+import java.io.BufferedReader;
+import java.io.InputStreamReader;
+import java.io.OutputStream;
+import java.io.PrintStream;
+
+public class CompilerServer {
+    public static void main(String[] args) throws Exception {
+        PrintStream protocol = System.out;
+        PrintStream error = System.err;
+        PrintStream silent = new PrintStream(OutputStream.nullOutputStream());
+        BufferedReader input = new BufferedReader(new InputStreamReader(System.in));
+        String line;
+        while ((line = input.readLine()) != null) {
+            int status = 0;
+            System.setOut(silent);
+            System.setErr(silent);
+            try {
+                Main.main(line.split("\\t"));
+            } catch (Throwable t) {
+                status = 1;
+            } finally {
+                System.setOut(protocol);
+                System.setErr(error);
+            }
+            protocol.println(status);
+            protocol.flush();
+        }
+    }
+}
+"""
+
+
+class CompilerServer:
+    """
+    Long-lived JVM that runs the ExaStencils compiler for each request it receives on its standard input
+    """
+    def __init__(self, absolute_compiler_path: str, working_directory: str):
+        self._absolute_compiler_path = absolute_compiler_path
+        self._working_directory = working_directory
+        self._process = None
+        self._source_directory = None
+
+    @property
+    def absolute_compiler_path(self):
+        return self._absolute_compiler_path
+
+    @property
+    def working_directory(self):
+        return self._working_directory
+
+    @property
+    def running(self):
+        return self._process is not None and self._process.poll() is None
+
+    def start(self):
+        if self.running:
+            return
+        self.stop()
+        self._source_directory = tempfile.mkdtemp(prefix='evostencils_compiler_server_')
+        source_path = f'{self._source_directory}/CompilerServer.java'
+        with open(source_path, 'w') as file:
+            file.write(SERVER_SOURCE)
+        self._process = subprocess.Popen(['java', '-cp', self.absolute_compiler_path, source_path],
+                                         stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                                         cwd=self.working_directory)
+
+    def stop(self):
+        if self._process is not None:
+            try:
+                self._process.stdin.close()
+                self._process.wait(timeout=10)
+            except (OSError, subprocess.TimeoutExpired):
+                self._process.kill()
+                self._process.wait()
+            self._process = None
+        if self._source_directory is not None:
+            shutil.rmtree(self._source_directory, ignore_errors=True)
+            self._source_directory = None
+
+    def compile(self, arguments: list, timeout: float):
+        # Returns the status of the compiler run or None if the server is not available anymore
+        if not self.running:
+            return None
+        try:
+            self._process.stdin.write(('\t'.join(arguments) + '\n').encode('utf8'))
+            self._process.stdin.flush()
+        except OSError:
+            self.stop()
+            return None
+        file_descriptor = self._process.stdout.fileno()
+        deadline = time.time() + timeout
+        response = b''
+        while not response.endswith(b'\n'):
+            ready, _, _ = select.select([file_descriptor], [], [], max(deadline - time.time(), 0))
+            if not ready:
+                # The state of the compiler is unknown after an interrupted run
+                self.stop()
+                raise subprocess.TimeoutExpired(['CompilerServer'] + arguments, timeout)
+            chunk = os.read(file_descriptor, 64)
+            if not chunk:
+                self.stop()
+                return None
+            response += chunk
+        return int(response.strip())
@@ -1,13 +1,23 @@
 from evostencils.expressions import base, partitioning as part, system, transformations
 from evostencils.expressions import krylov_subspace
 from evostencils.initialization import multigrid, parser
+from evostencils.code_generation.compiler_server import CompilerServer
+from evostencils.code_generation.cache import EvaluationCache
 import os
+import atexit
+import copy
+import hashlib
 import subprocess
 import math
+import select
+import statistics
 import sympy
 import time
 from typing import List
 
+BATCH_ENVIRONMENT_VARIABLE = 'EVOSTENCILS_NUMBER_OF_SAMPLES'
+BATCH_MARKER = 'EVOSTENCILS_SAMPLE_END'
+
 
 class CycleStorage:
     def __init__(self, equations: [multigrid.EquationInfo], fields: [sympy.Symbol], grids: List[base.Grid]):
@@ -30,13 +40,29 @@ class Field:
 
 class ProgramGenerator:
     def __init__(self, absolute_compiler_path: str, base_path: str, settings_path: str, knowledge_path: str,
-                 mpi_rank=0, platform='linux'):
+                 mpi_rank=0, platform='linux', use_compiler_server=False, evaluation_cache_path=None,
+                 evaluation_cache_size=10000, build_jobs=4, incremental_build=False, batched_evaluation=False,
+                 streaming_evaluation=False, divergence_window=3):
         self._average_generation_time = 0
         self._counter = 0
         self.timeout_copy_file = 60
         self.timeout_evaluate = 300
         self.timeout_exastencils_compiler = 300
         self.timeout_c_compiler = 180
+        self.build_jobs = build_jobs
+        self._incremental_build = incremental_build
+        self._build_fingerprints = {}
+        self._batched_evaluation = batched_evaluation
+        self._batched_main_generated = False
+        # Times to solution of the samples of the last batched evaluation together with their median and variance
+        self._last_evaluation_statistics = None
+        self._streaming_evaluation = streaming_evaluation
+        self._divergence_window = divergence_window
+        # Time to solution (in ms) above which a candidate is considered hopeless, only used in streaming mode
+        self.evaluation_time_limit = None
+        self._terminated_evaluations = 0
+        # Wall-clock time (in s) that elapses before the solver timer of the program starts
+        self._startup_time = None
         self._absolute_compiler_path = absolute_compiler_path
         self._base_path = base_path
         self._knowledge_path = knowledge_path
@@ -46,10 +72,13 @@ class ProgramGenerator:
         self._base_path_prefix, self._problem_name, self._debug_l3_path, self._output_path = \
             parser.extract_settings_information(base_path, settings_path)
         self._mpi_rank = mpi_rank
+        self._identifier = f'{mpi_rank}'
         self._platform = platform
-        self._knowledge_path_generated = f'{self._base_path_prefix}/{self.problem_name}_{self.mpi_rank}.knowledge'
-        self._settings_path_generated = f'{self._base_path_prefix}/{self.problem_name}_{self.mpi_rank}.settings'
-        self._layer3_path_generated = f'{self._base_path_prefix}/{self.problem_name}_{self.mpi_rank}.exa3'
+        self._use_compiler_server = use_compiler_server
+        self._compiler_server = None
+        self._compiler_server_failures = 0
+        self._maximum_compiler_server_failures = 3
+        self._initialize_generated_paths()
         self._output_path_generated = None
         self.run_exastencils_compiler()
         self._equations, self._operators, self._fields = \
@@ -68,6 +97,9 @@ class ProgramGenerator:
             raise RuntimeError("Compiler not found. Aborting.")
         self._solver_cache = {}
         self._field_declaration_cache = set()
+        self._evaluation_cache = None
+        if evaluation_cache_path is not None:
+            self._evaluation_cache = EvaluationCache(evaluation_cache_path, evaluation_cache_size)
 
     @property
     def absolute_compiler_path(self):
@@ -137,6 +169,34 @@ class ProgramGenerator:
     def mpi_rank(self):
         return self._mpi_rank
 
+    @property
+    def evaluation_cache(self):
+        return self._evaluation_cache
+
+    @property
+    def batched_evaluation(self):
+        return self._batched_evaluation
+
+    @property
+    def streaming_evaluation(self):
+        return self._streaming_evaluation
+
+    @property
+    def divergence_window(self):
+        return self._divergence_window
+
+    @property
+    def terminated_evaluations(self):
+        return self._terminated_evaluations
+
+    @property
+    def last_evaluation_statistics(self):
+        return self._last_evaluation_statistics
+
+    @property
+    def identifier(self):
+        return self._identifier
+
     @property
     def knowledge_path_generated(self):
         return self._knowledge_path_generated
@@ -145,6 +205,38 @@ class ProgramGenerator:
     def settings_path_generated(self):
         return self._settings_path_generated
 
+    def _initialize_generated_paths(self):
+        self._knowledge_path_generated = f'{self._base_path_prefix}/{self.problem_name}_{self.identifier}.knowledge'
+        self._settings_path_generated = f'{self._base_path_prefix}/{self.problem_name}_{self.identifier}.settings'
+        self._layer3_path_generated = f'{self._base_path_prefix}/{self.problem_name}_{self.identifier}.exa3'
+
+    def create_worker(self, worker_id: int):
+        # Each worker operates on its own copy of the generated files and builds into its own output directory
+        worker = copy.copy(self)
+        worker._identifier = f'{self.identifier}_{worker_id}'
+        worker._compiler_server = None
+        worker._build_fingerprints = {}
+        worker._initialize_generated_paths()
+        worker._solver_cache = dict(self._solver_cache)
+        worker._field_declaration_cache = set(self._field_declaration_cache)
+        worker.copy_generated_files(self)
+        return worker
+
+    def copy_generated_files(self, source):
+        tmp = f'{self.base_path}/{self._base_path_prefix}/{self.problem_name}'
+        for extension in ('exa1', 'exa2', 'exa4'):
+            subprocess.run(['cp', f'{tmp}_{source.identifier}.{extension}', f'{tmp}_{self.identifier}.{extension}'],
+                           stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, timeout=self.timeout_copy_file)
+        subprocess.run(['cp', f'{tmp}_base_{source.identifier}.exa3', f'{tmp}_base_{self.identifier}.exa3'],
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, timeout=self.timeout_copy_file)
+        subprocess.run(['cp', f'{self.base_path}/{source.knowledge_path_generated}',
+                        f'{self.base_path}/{self.knowledge_path_generated}'],
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, timeout=self.timeout_copy_file)
+        settings_path = self.generate_adapted_settings_file()
+        _, __, ___, output_path_generated = \
+            parser.extract_settings_information(self.base_path, settings_path)
+        self._output_path_generated = output_path_generated
+
     @staticmethod
     def generate_global_weights(n: int):
         # Hack to change the weights after generation
@@ -174,6 +266,36 @@ class ProgramGenerator:
         with open(path_to_file, 'w') as file:
             file.write(content)
 
+    def generate_runtime_weight_initializations(self, output_path, n: int):
+        # Hack to read the weights from the environment at startup,
+        # such that the executable must only be built once for all weights
+        path_to_file = f'{self.base_path}/{output_path}/Global/Global_initGlobals.cpp'
+        subprocess.run(['cp', path_to_file, f'{path_to_file}.backup'],
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, timeout=self.timeout_copy_file)
+        with open(path_to_file, 'r') as file:
+            lines = file.readlines()
+            last_line = lines[-1]
+            lines = lines[:-1]
+        content = '#include <cstdlib>\n'
+        for line in lines:
+            content += line
+        for i in range(0, n):
+            variable = f'EVOSTENCILS_OMEGA_{i}'
+            content += f'\tif (std::getenv("{variable}") != nullptr) {{\n'
+            content += f'\t\tomega_{i} = std::atof(std::getenv("{variable}"));\n'
+            content += '\t}\n'
+        content += last_line
+        with open(path_to_file, 'w') as file:
+            file.write(content)
+
+    @staticmethod
+    def generate_weight_environment(weights: List[float]):
+        # Same assignment of weights to global variables as in generate_global_weight_initializations
+        environment = dict(os.environ)
+        for i, weight in enumerate(reversed(weights)):
+            environment[f'EVOSTENCILS_OMEGA_{i}'] = repr(float(weight))
+        return environment
+
     def restore_global_initializations(self, output_path):
         # Hack to change the weights after generation
         path_to_file = f'{self.base_path}/{output_path}/Global/Global_initGlobals.cpp'
@@ -236,35 +358,271 @@ class ProgramGenerator:
             timeout = 10 * self._average_generation_time
             if self._counter < 5:
                 timeout = 1.5 * timeout - self._counter * self._average_generation_time
+        arguments = [f'{self.base_path}/{settings_path}', f'{self.base_path}/{knowledge_path}',
+                     f'{self.base_path}/lib/{self.platform}.platform']
         try:
             timeout = min(self.timeout_exastencils_compiler, timeout)
-            result = subprocess.run(['java', '-cp',
-                                     self.absolute_compiler_path, 'Main',
-                                     f'{self.base_path}/{settings_path}',
-                                     f'{self.base_path}/{knowledge_path}',
-                                     f'{self.base_path}/lib/{self.platform}.platform'],
-                                    stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
-                                    timeout=timeout)
+            returncode = self.run_exastencils_compiler_server(arguments, timeout)
+            if returncode is None:
+                result = subprocess.run(['java', '-cp', self.absolute_compiler_path, 'Main'] + arguments,
+                                        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                                        timeout=timeout)
+                returncode = result.returncode
         except subprocess.TimeoutExpired as e:
+            os.chdir(current_path)
             raise e
         os.chdir(current_path)
-        if result.returncode != 0:
+        if returncode != 0:
             raise RuntimeError("Compiler not working. Aborting.")
-        return result.returncode
+        return returncode
+
+    def run_exastencils_compiler_server(self, arguments, timeout):
+        # Returns None if the request must be handled by a separate compiler process instead
+        if not self._use_compiler_server or self._compiler_server_failures >= self._maximum_compiler_server_failures:
+            return None
+        if self._compiler_server is None:
+            self._compiler_server = CompilerServer(self.absolute_compiler_path, self.base_path)
+            # The JVM must not outlive the generator process
+            atexit.register(self.shutdown_compiler_server)
+        if not self._compiler_server.running:
+            self._compiler_server.start()
+        returncode = self._compiler_server.compile(arguments, timeout)
+        if returncode is None:
+            # Only a failure of the server itself is handled by a separate compiler process
+            self._compiler_server_failures += 1
+            self._compiler_server.stop()
+            return None
+        self._compiler_server_failures = 0
+        if returncode != 0:
+            # The compiler might have been left in an inconsistent state, such that the next request restarts it
+            self._compiler_server.stop()
+        return returncode
+
+    def shutdown_compiler_server(self):
+        if self._compiler_server is not None:
+            self._compiler_server.stop()
+            self._compiler_server = None
+            atexit.unregister(self.shutdown_compiler_server)
 
     def run_c_compiler(self, makefile_path):
-        result = subprocess.run(['make', '-j4', '-s', '-C', f'{self.base_path}/{makefile_path}'],
-                                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, timeout=self.timeout_c_compiler)
+        if self._incremental_build:
+            self.restore_unchanged_timestamps(makefile_path)
+        try:
+            result = subprocess.run(['make', f'-j{self.build_jobs}', '-s', '-C', f'{self.base_path}/{makefile_path}'],
+                                    stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                                    timeout=self.timeout_c_compiler)
+        except subprocess.TimeoutExpired as e:
+            self._build_fingerprints.pop(makefile_path, None)
+            raise e
+        if self._incremental_build:
+            if result.returncode == 0:
+                self.record_build_fingerprints(makefile_path)
+            else:
+                self._build_fingerprints.pop(makefile_path, None)
         return result.returncode
 
-    def evaluate(self, executable_path, infinity=1e300, number_of_samples=1):
+    def compute_build_fingerprints(self, makefile_path):
+        # Maps each generated source file to the hash of its content and its modification time
+        fingerprints = {}
+        source_extensions = ('.cpp', '.cc', '.cxx', '.c', '.h', '.hpp', '.cu', '.cuh')
+        root = f'{self.base_path}/{makefile_path}'
+        for directory, _, file_names in os.walk(root):
+            for file_name in file_names:
+                if file_name.endswith(source_extensions) or file_name == 'Makefile':
+                    path = os.path.join(directory, file_name)
+                    try:
+                        with open(path, 'rb') as file:
+                            digest = hashlib.sha1(file.read()).hexdigest()
+                        fingerprints[path] = digest, os.stat(path).st_mtime_ns
+                    except OSError:
+                        pass
+        return fingerprints
+
+    def record_build_fingerprints(self, makefile_path):
+        self._build_fingerprints[makefile_path] = self.compute_build_fingerprints(makefile_path)
+
+    def restore_unchanged_timestamps(self, makefile_path):
+        # The code generator rewrites all files, such that make would rebuild every translation unit.
+        # Resetting the timestamps of files whose content did not change since the last successful build
+        # lets make reuse the corresponding object files and rebuild only the changed ones.
+        if makefile_path not in self._build_fingerprints:
+            return
+        previous_fingerprints = self._build_fingerprints[makefile_path]
+        for path, (digest, _) in self.compute_build_fingerprints(makefile_path).items():
+            if path in previous_fingerprints:
+                previous_digest, previous_modification_time = previous_fingerprints[path]
+                if digest == previous_digest:
+                    try:
+                        os.utime(path, ns=(previous_modification_time, previous_modification_time))
+                    except OSError:
+                        pass
+
+    def generate_batched_main(self, output_path):
+        # Hack to run multiple solves within a single process
+        # The original main function is renamed and called repeatedly by a new main function
+        # The number of repetitions is passed as environment variable, such that a single run is the default
+        # Only the launch of the process is shared between the samples, while allocation and initialization
+        # are repeated with each call, as the structure of the application is defined by the problem
+        # The reported times to solution are not affected, as they are measured by the solver timer of the application
+        main_file_path = None
+        for root, _, file_names in os.walk(f'{self.base_path}/{output_path}'):
+            for file_name in file_names:
+                if file_name.endswith('.cpp'):
+                    with open(f'{root}/{file_name}', 'r') as file:
+                        if 'int main(' in file.read():
+                            main_file_path = f'{root}/{file_name}'
+                            break
+            if main_file_path is not None:
+                break
+        if main_file_path is None:
+            return False
+        with open(main_file_path, 'r') as file:
+            content = file.read()
+        if BATCH_MARKER in content:
+            return True
+        # MPI must not be initialized more than once per process
+        if 'MPI_Init' in content:
+            return False
+        content = '#include <cstdlib>\n#include <iostream>\n' + content.replace('int main(', 'int evostencils_main(', 1)
+        content += '\nint main(int argc, char** argv) {\n'
+        content += f'\tconst char* value = std::getenv("{BATCH_ENVIRONMENT_VARIABLE}");\n'
+        content += '\tint number_of_samples = (value != nullptr) ? std::atoi(value) : 1;\n'
+        content += '\tint status = 0;\n'
+        content += '\tfor (int i = 0; i < number_of_samples && status == 0; ++i) {\n'
+        content += '\t\tstatus = evostencils_main(argc, argv);\n'
+        content += f'\t\tstd::cout << "{BATCH_MARKER}" << std::endl;\n'
+        content += '\t}\n'
+        content += '\treturn status;\n'
+        content += '}\n'
+        with open(main_file_path, 'w') as file:
+            file.write(content)
+        return True
+
+    def evaluate_batched(self, executable_path, infinity=1e300, number_of_samples=1, environment=None):
+        # Returns None if the batched run fails for any reason, such that the samples are obtained from separate runs
+        # Repeated calls of the original main function might fail due to global state, which a single run does not have
+        if environment is None:
+            environment = dict(os.environ)
+        else:
+            environment = dict(environment)
+        environment[BATCH_ENVIRONMENT_VARIABLE] = str(number_of_samples)
+        try:
+            result = subprocess.run([f'{self.base_path}/{executable_path}/exastencils'],
+                                    stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                                    timeout=self.timeout_evaluate * number_of_samples, env=environment)
+        except subprocess.TimeoutExpired:
+            return None
+        if not result.returncode == 0:
+            return None
+        samples = self.parse_batched_output(result.stdout.decode('utf8'), infinity)
+        if len(samples) != number_of_samples:
+            return None
+        for _, convergence_factor, _ in samples:
+            if math.isinf(convergence_factor) or math.isnan(convergence_factor):
+                return None
+        self._last_evaluation_statistics = self.compute_sample_statistics(samples)
+        mean_convergence_factor = sum(convergence_factor for _, convergence_factor, _ in samples) / len(samples)
+        # The median is less sensitive to outliers caused by other processes than the mean
+        return self._last_evaluation_statistics['median'], mean_convergence_factor, samples[-1][2]
+
+    @staticmethod
+    def compute_sample_statistics(samples):
+        times = [time_to_solution for time_to_solution, _, _ in samples]
+        return {
+            'times': times,
+            'median': statistics.median(times),
+            'variance': statistics.pvariance(times)
+        }
+
+    def run_executable_streaming(self, executable_path, environment=None):
+        # Reads the output of the solver while it is running and terminates it as soon as it is clearly losing
+        # Returns None if the run has been terminated early
+        process = subprocess.Popen([f'{self.base_path}/{executable_path}/exastencils'],
+                                   stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, env=environment)
+        start_time = time.time()
+        deadline = start_time + self.timeout_evaluate
+        # The limit refers to the solver timer reported by the program, which excludes the startup of the program
+        # The startup time is measured on completed runs, such that no run is terminated before it is known
+        if self.evaluation_time_limit is not None and self._startup_time is not None:
+            deadline = min(deadline, start_time + self._startup_time + self.evaluation_time_limit / 1e3)
+        file_descriptor = process.stdout.fileno()
+        output = b''
+        number_of_diverging_iterations = 0
+        terminate = False
+        while True:
+            ready, _, _ = select.select([file_descriptor], [], [], max(deadline - time.time(), 0))
+            if not ready:
+                if time.time() >= start_time + self.timeout_evaluate:
+                    process.kill()
+                    process.wait()
+                    raise subprocess.TimeoutExpired(process.args, self.timeout_evaluate)
+                # The time to solution is already worse than the limit
+                terminate = True
+                break
+            chunk = os.read(file_descriptor, 4096)
+            if not chunk:
+                break
+            # Only complete lines are inspected
+            previous_lines = output.count(b'\n')
+            output += chunk
+            lines = output.split(b'\n')
+            for line in lines[previous_lines:-1]:
+                number_of_diverging_iterations = self.count_diverging_iterations(line, number_of_diverging_iterations)
+                if number_of_diverging_iterations >= self.divergence_window:
+                    terminate = True
+            if terminate:
+                break
+        if terminate:
+            process.kill()
+            process.wait()
+            self._terminated_evaluations += 1
+            return None
+        returncode = process.wait()
+        if returncode == 0:
+            try:
+                time_to_solution, _, _ = self.parse_output(output.decode('utf8'), math.inf)
+                startup_time = max(time.time() - start_time - time_to_solution / 1e3, 0.0)
+                if self._startup_time is None or startup_time < self._startup_time:
+                    self._startup_time = startup_time
+            except (IndexError, ValueError):
+                pass
+        return subprocess.CompletedProcess(process.args, returncode, stdout=output)
+
+    @staticmethod
+    def count_diverging_iterations(line: bytes, number_of_diverging_iterations: int):
+        # Returns the number of consecutive iterations with a convergence factor above one after the given output line
+        if b'convergence factor is ' not in line:
+            return number_of_diverging_iterations
+        try:
+            rho = float(line.split(b'convergence factor is ')[-1])
+        except ValueError:
+            return number_of_diverging_iterations
+        if rho > 1 or math.isnan(rho):
+            return number_of_diverging_iterations + 1
+        return 0
+
+    def evaluate(self, executable_path, infinity=1e300, number_of_samples=1, environment=None):
+        self._last_evaluation_statistics = None
+        batched_evaluation_failed = False
+        if self.batched_evaluation and self._batched_main_generated and not self.streaming_evaluation \
+                and number_of_samples > 1:
+            values = self.evaluate_batched(executable_path, infinity, number_of_samples, environment)
+            if values is not None:
+                return values
+            batched_evaluation_failed = True
         total_time = 0
         sum_of_convergence_factors = 0
         number_of_iterations = None
         count = 0
         for i in range(number_of_samples):
-            result = subprocess.run([f'{self.base_path}/{executable_path}/exastencils'],
-                                    stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, timeout=self.timeout_evaluate)
+            if self.streaming_evaluation:
+                result = self.run_executable_streaming(executable_path, environment)
+                if result is None:
+                    return infinity, infinity, infinity
+            else:
+                result = subprocess.run([f'{self.base_path}/{executable_path}/exastencils'],
+                                        stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, timeout=self.timeout_evaluate,
+                                        env=environment)
             if not result.returncode == 0:
                 return infinity, infinity, infinity
             output = result.stdout.decode('utf8')
@@ -276,6 +634,9 @@ class ProgramGenerator:
             count += 1
             if total_time > 5000:
                 break
+        if batched_evaluation_failed:
+            # The program can be run separately but not repeatedly within one process
+            self._batched_evaluation = False
         return total_time / count, sum_of_convergence_factors / count, number_of_iterations
 
     def initialize_code_generation(self, min_level: int, max_level: int, iteration_limit=100):
@@ -295,8 +656,8 @@ class ProgramGenerator:
         _, __, ___, output_path_generated = \
             parser.extract_settings_information(self.base_path, settings_path)
         self._output_path_generated = output_path_generated
-        debug_l3_path = f'{self.base_path}/{self._debug_l3_path}'.replace('_debug.exa3', f'_{self.mpi_rank}_debug.exa3')
-        l3_path = f'{self.base_path}/{self._base_path_prefix}/{self.problem_name}_base_{self.mpi_rank}.exa3'
+        debug_l3_path = f'{self.base_path}/{self._debug_l3_path}'.replace('_debug.exa3', f'_{self.identifier}_debug.exa3')
+        l3_path = f'{self.base_path}/{self._base_path_prefix}/{self.problem_name}_base_{self.identifier}.exa3'
         subprocess.run(['cp', debug_l3_path, l3_path], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
         return output_path_generated
 
@@ -305,6 +666,12 @@ class ProgramGenerator:
                               infinity=1e300, number_of_samples=1):
         cycle_function = self.generate_cycle_function(expression, storages, min_level, max_level, self.max_level)
         self.generate_l3_file(min_level, self.max_level, solver_program + cycle_function)
+        cache_key = None
+        if self.evaluation_cache is not None:
+            cache_key = self.compute_evaluation_cache_key(number_of_samples)
+            values = self.evaluation_cache.lookup(cache_key)
+            if values is not None:
+                return values
         try:
             start_time = time.time()
             returncode = self.run_exastencils_compiler(knowledge_path=self.knowledge_path_generated,
@@ -319,18 +686,41 @@ class ProgramGenerator:
         self._average_generation_time += (elapsed_time - self._average_generation_time) / self._counter
         if self._output_path_generated is None:
             raise RuntimeError('Output path not set')
+        if self.batched_evaluation:
+            self._batched_main_generated = self.generate_batched_main(self._output_path_generated)
         returncode = self.run_c_compiler(self._output_path_generated)
         if returncode != 0:
             return infinity, infinity, infinity
+        terminated_evaluations = self.terminated_evaluations
         try:
             runtime, convergence_factor, number_of_iterations = self.evaluate(self._output_path_generated, infinity, number_of_samples)
-            return runtime, convergence_factor, number_of_iterations
         except subprocess.TimeoutExpired:
             return infinity, infinity, infinity
+        # The result of an early terminated run depends on the current time limit and must not be cached
+        if cache_key is not None and terminated_evaluations == self.terminated_evaluations:
+            self.evaluation_cache.insert(cache_key, (runtime, convergence_factor, number_of_iterations))
+        return runtime, convergence_factor, number_of_iterations
+
+    def compute_evaluation_cache_key(self, number_of_samples: int):
+        contents = [f'{number_of_samples}']
+        tmp = f'{self.base_path}/{self._base_path_prefix}/{self.problem_name}_{self.identifier}'
+        file_paths = [f'{self.base_path}/{self._layer3_path_generated}', f'{tmp}.exa1', f'{tmp}.exa2', f'{tmp}.exa4',
+                      f'{self.base_path}/{self.knowledge_path_generated}',
+                      f'{self.base_path}/{self.settings_path_generated}',
+                      f'{self.base_path}/lib/{self.platform}.platform']
+        for file_path in file_paths:
+            try:
+                with open(file_path, 'r') as file:
+                    lines = file.readlines()
+            except OSError:
+                lines = []
+            # The configuration name only encodes the identifier of the generator
+            contents.append(''.join(line for line in lines if line.split('=')[0].strip(' \n\t') != 'configName'))
+        return EvaluationCache.compute_key(contents)
 
     @staticmethod
     def parse_output(output: str, infinity: float):
-        lines = output.splitlines()
+        lines = [line for line in output.splitlines() if line != BATCH_MARKER]
         convergence_factors = []
         count = 0
         for line in lines:
@@ -351,6 +741,19 @@ class ProgramGenerator:
         number_of_iterations = len(lines) - 3
         return time_to_solution, convergence_factor, number_of_iterations
 
+    @staticmethod
+    def parse_batched_output(output: str, infinity: float):
+        samples = []
+        for sample_output in output.split(BATCH_MARKER)[:-1]:
+            sample_output = sample_output.strip('\n')
+            if len(sample_output) == 0:
+                continue
+            try:
+                samples.append(ProgramGenerator.parse_output(sample_output, infinity))
+            except (IndexError, ValueError):
+                return []
+        return samples
+
     def generate_storage(self, min_level: int, max_level: int, finest_grids: List[base.Grid]):
         storage = []
         grid = finest_grids
@@ -657,9 +1060,9 @@ class ProgramGenerator:
 
     def generate_l3_file(self, min_level, max_level, program: str):
         # TODO fix hacky solution
-        input_file_path = f'{self._base_path_prefix}/{self.problem_name}_base_{self.mpi_rank}.exa3'
+        input_file_path = f'{self._base_path_prefix}/{self.problem_name}_base_{self.identifier}.exa3'
         output_file_path = \
-            f'{self._base_path_prefix}/{self.problem_name}_{self.mpi_rank}.exa3'
+            f'{self._base_path_prefix}/{self.problem_name}_{self.identifier}.exa3'
         with open(f'{self.base_path}/{input_file_path}', 'r') as input_file:
             with open(f'{self.base_path}/{output_file_path}', 'w') as output_file:
                 for field_declaration in self._field_declaration_cache:
@@ -691,7 +1094,7 @@ class ProgramGenerator:
                     tokens = line.split('=')
                     lhs = tokens[0].strip(' \n\t')
                     if lhs == 'configName':
-                        output_file.write(f'  {lhs}\t = "{self.problem_name}_{self.mpi_rank}"\n')
+                        output_file.write(f'  {lhs}\t = "{self.problem_name}_{self.identifier}"\n')
                     elif l2file_required:
                         output_file.write(line)
                     elif not lhs == 'l2file':
@@ -727,13 +1130,13 @@ class ProgramGenerator:
     def generate_adapted_layer_files(self, iteration_limit, coarse_grid_solver_type=None, number_of_cgs_iterations=None):
         base_path = self.base_path
         input_file_path = f'{self._base_path_prefix}/{self.problem_name}.exa3'
-        output_file_path = f'{self._base_path_prefix}/{self.problem_name}_{self.mpi_rank}.exa3'
+        output_file_path = f'{self._base_path_prefix}/{self.problem_name}_{self.identifier}.exa3'
         tmp = f'{self.base_path}/{self._base_path_prefix}/{self.problem_name}'
-        subprocess.run(['cp', f'{tmp}.exa1', f'{tmp}_{self.mpi_rank}.exa1'],
+        subprocess.run(['cp', f'{tmp}.exa1', f'{tmp}_{self.identifier}.exa1'],
                        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, timeout=self.timeout_copy_file)
-        subprocess.run(['cp', f'{tmp}.exa2', f'{tmp}_{self.mpi_rank}.exa2'],
+        subprocess.run(['cp', f'{tmp}.exa2', f'{tmp}_{self.identifier}.exa2'],
                        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, timeout=self.timeout_copy_file)
-        subprocess.run(['cp', f'{tmp}.exa4', f'{tmp}_{self.mpi_rank}.exa4'],
+        subprocess.run(['cp', f'{tmp}.exa4', f'{tmp}_{self.identifier}.exa4'],
                        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, timeout=self.timeout_copy_file)
 
         with open(f'{base_path}/{input_file_path}', 'r') as input_file:
@@ -810,7 +1213,7 @@ class ProgramGenerator:
         self.generate_adapted_layer_files(iteration_limit, solver_type, number_of_solver_iterations)
         settings_path = self.generate_adapted_settings_file(l2file_required=True)
         self.run_exastencils_compiler(knowledge_path=knowledge_path, settings_path=settings_path)
-        layer3_file_path = f'{self._debug_l3_path}'.replace('_debug.exa3', f'_{self.mpi_rank}_debug.exa3')
+        layer3_file_path = f'{self._debug_l3_path}'.replace('_debug.exa3', f'_{self.identifier}_debug.exa3')
         krylov_solver_function, residual_norm_function = \
             self.extract_krylov_subspace_method_from_layer3_file(layer3_file_path, level)
         krylov_solver_function = krylov_solver_function.replace('gen_mgCycle', f'{solver_type}_{number_of_solver_iterations}')
@@ -1,45 +1,221 @@
-import lfa_lab
+try:
+    import lfa_lab
+except ImportError:
+    lfa_lab = None
 import evostencils.stencils.periodic as periodic
 import evostencils.stencils.constant as constant
-from evostencils.expressions import base, system, partitioning
-from multiprocessing import Process, Queue
+from evostencils.expressions import base, system, partitioning, dag
+from evostencils.evaluation.lfa_workers import LFAWorkerPool, supervise
+from evostencils.evaluation import fourier
+from multiprocessing import Process, Queue, current_process
 from typing import List
 
 
 @periodic.convert_constant_stencils
-def stencil_to_lfa(stencil: periodic.Stencil, grid: base.Grid):
+def stencil_to_lfa(stencil: periodic.Stencil, grid, backend=lfa_lab):
     def recursive_descent(array, dimension):
         if dimension == 1:
-            return [lfa_lab.SparseStencil(element.entries) for element in array]
+            return [backend.SparseStencil(element.entries) for element in array]
         else:
             return [recursive_descent(element, dimension - 1) for element in array]
 
     tmp = recursive_descent(stencil.constant_stencils, stencil.dimension)
 
-    ndarray = lfa_lab.NdArray(tmp)
-    return lfa_lab.from_periodic_stencil(ndarray, grid)
+    ndarray = backend.NdArray(tmp)
+    return backend.from_periodic_stencil(ndarray, grid)
 
 
-def lfa_sparse_stencil_to_constant_stencil(stencil: lfa_lab.SparseStencil):
+def lfa_sparse_stencil_to_constant_stencil(stencil):
     return constant.Stencil(tuple(entry for entry in stencil), stencil.dim)
 
 
 class ConvergenceEvaluator:
 
-    def __init__(self, dimension, coarsening_factors, lfa_grids):
+    def __init__(self, dimension, coarsening_factors, lfa_grids, number_of_workers=1, timeout=120,
+                 lfa_symbol_cache_size=10000, backend=None, resolution=64, adaptive_resolution=False,
+                 minimum_resolution=16, refinement_tolerance=0.05, truncation_depth=None,
+                 coarse_grid_solver_model='exact', metrics=('spectral_radius',), number_of_steps=4,
+                 memory_limit=None):
+        # Use lfa_lab by default if it is available and the NumPy implementation otherwise
+        if backend is None:
+            backend = 'lfa_lab' if lfa_lab is not None and not adaptive_resolution else 'numpy'
+        if adaptive_resolution and backend != 'numpy':
+            raise RuntimeError("Adaptive resolution is only supported by the numpy backend")
+        if backend == 'lfa_lab':
+            if lfa_lab is None:
+                raise RuntimeError("lfa_lab is not available")
+            self._backend = lfa_lab
+        elif backend == 'numpy':
+            self._backend = fourier
+            lfa_grids = [fourier.Grid(dimension, g.step_size()) for g in lfa_grids]
+        else:
+            raise RuntimeError(f'Unknown LFA backend {backend}')
+        if coarse_grid_solver_model not in ('exact', 'bound'):
+            raise RuntimeError(f'Unknown coarse grid solver model {coarse_grid_solver_model}')
+        self._backend_name = backend
         self._lfa_grids = lfa_grids
         self._coarsening_factors = coarsening_factors
         self._dimension = dimension
+        self._number_of_workers = number_of_workers
+        # Wall-clock time limit (in s) of an evaluation, None allows evaluating the NumPy backend in-process
+        self._timeout = timeout
+        # Maximum resident set size of an isolated LFA evaluation in bytes
+        self._memory_limit = memory_limit
+        self._number_of_timeouts = 0
+        self._number_of_memory_violations = 0
+        self._unenforced_limits_reported = False
+        self._worker_pool = None
+        # Least recently used cache of LFA symbols, which are shared between structurally equal expressions
+        # The symbols are stored in a side table of the interned expression graph
+        self._expression_table = dag.ExpressionTable(maximum_number_of_nodes=10 * lfa_symbol_cache_size)
+        self._lfa_symbol_cache = self._expression_table.lfa_symbols
+        self._lfa_symbol_cache_size = lfa_symbol_cache_size
+        self._lfa_symbol_cache_hits = 0
+        self._lfa_symbol_cache_misses = 0
+        self._structural_keys = {}
+        self._transform_depth = 0
+        # Number of sampled frequencies per dimension on the finest grid (numpy backend only)
+        self._resolution = resolution
+        self._adaptive_resolution = adaptive_resolution
+        self._minimum_resolution = minimum_resolution
+        self._refinement_tolerance = refinement_tolerance
+        self._decision_thresholds = [0.9, 1.0]
+        self._resolutions = []
+        # Hierarchy of LFA grids for each component and the converted stencils and intergrid operators on them
+        self._lfa_grid_hierarchies = []
+        self._lfa_grid_table = []
+        self._lfa_grid_levels = []
+        self._lfa_operator_cache = {}
+        # Number of levels that are analyzed exactly, coarser cycles are replaced by an exact solve
+        self._truncation_depth = truncation_depth
+        # Coarse grid solvers that are given by a cycle can be modeled by their spectral radius
+        self._coarse_grid_solver_model = coarse_grid_solver_model
+        self._coarse_grid_solver_bounds = {}
+        # Metrics that are computed from each symbol, the spectral radius is always included
+        self._metrics = ()
+        self._number_of_steps = number_of_steps
+        self.set_metrics(metrics)
+        self.build_lfa_grid_table()
 
     @property
     def lfa_grids(self):
         return self._lfa_grids
 
-    def set_lfa_grids(self, new_lfa_grids: List[lfa_lab.Grid]):
+    @property
+    def backend(self):
+        return self._backend_name
+
+    @property
+    def resolution(self):
+        return self._resolution
+
+    @property
+    def adaptive_resolution(self):
+        return self._adaptive_resolution
+
+    @property
+    def minimum_resolution(self):
+        return self._minimum_resolution
+
+    @property
+    def refinement_tolerance(self):
+        return self._refinement_tolerance
+
+    @property
+    def decision_thresholds(self):
+        return self._decision_thresholds
+
+    def set_decision_thresholds(self, thresholds: List[float]):
+        thresholds = sorted(set(thresholds))
+        # The thresholds are sent to the workers with each task, such that they do not need to be restarted
+        self._decision_thresholds = thresholds
+
+    @property
+    def resolutions(self):
+        # Resolutions used for the most recently evaluated expressions (None if not known)
+        return self._resolutions
+
+    @property
+    def number_of_workers(self):
+        return self._number_of_workers
+
+    @property
+    def timeout(self):
+        return self._timeout
+
+    @property
+    def memory_limit(self):
+        return self._memory_limit
+
+    @property
+    def number_of_timeouts(self):
+        if self._worker_pool is not None:
+            return self._number_of_timeouts + self._worker_pool.number_of_timeouts
+        return self._number_of_timeouts
+
+    @property
+    def number_of_memory_violations(self):
+        if self._worker_pool is not None:
+            return self._number_of_memory_violations + self._worker_pool.number_of_memory_violations
+        return self._number_of_memory_violations
+
+    @property
+    def isolated(self):
+        # Evaluations are only subject to the limits if they are performed in a separate process
+        # The NumPy backend reports all failures as exceptions, such that it only needs to be isolated to enforce limits
+        return self._backend is not fourier or self.number_of_workers > 1 or self.memory_limit is not None \
+            or self.timeout is not None
+
+    @property
+    def worker_pool(self):
+        return self._worker_pool
+
+    def set_lfa_grids(self, new_lfa_grids: List, number_of_levels=1):
         self._lfa_grids = new_lfa_grids
+        # The cached symbols and workers depend on the grids
+        self.clear_lfa_symbol_cache()
+        self.shutdown()
+        self.build_lfa_grid_table(number_of_levels)
+
+    def reinitialize_lfa_grids(self, finest_grids: List[base.Grid], number_of_levels=1):
+        self._lfa_grids = [self._backend.Grid(self.dimension, g.step_size) for g in finest_grids]
+        self.clear_lfa_symbol_cache()
+        self.shutdown()
+        self.build_lfa_grid_table(number_of_levels)
 
-    def reinitialize_lfa_grids(self, finest_grids: List[base.Grid]):
-        self._lfa_grids = [lfa_lab.Grid(self.dimension, g.step_size) for g in finest_grids]
+    def build_lfa_grid_table(self, number_of_levels=1):
+        # The table maps the step size of a grid to the corresponding LFA grid for each component
+        self._lfa_grid_hierarchies = [[lfa_grid] for lfa_grid in self.lfa_grids]
+        self._lfa_grid_table = [{} for _ in self.lfa_grids]
+        self._lfa_grid_levels = [{} for _ in self.lfa_grids]
+        self._lfa_operator_cache.clear()
+        self._coarse_grid_solver_bounds.clear()
+        for i, hierarchy in enumerate(self._lfa_grid_hierarchies):
+            while len(hierarchy) < number_of_levels:
+                hierarchy.append(hierarchy[-1].coarse(self.coarsening_factors[i]))
+
+    @property
+    def lfa_symbol_cache_hits(self):
+        return self._lfa_symbol_cache_hits
+
+    @property
+    def lfa_symbol_cache_misses(self):
+        return self._lfa_symbol_cache_misses
+
+    @property
+    def expression_table(self):
+        return self._expression_table
+
+    def clear_lfa_symbol_cache(self):
+        self._expression_table.clear()
+        self._coarse_grid_solver_bounds.clear()
+
+    def shutdown(self):
+        if self._worker_pool is not None:
+            self._worker_pool.stop()
+            self._number_of_timeouts += self._worker_pool.number_of_timeouts
+            self._number_of_memory_violations += self._worker_pool.number_of_memory_violations
+            self._worker_pool = None
 
     @property
     def coarsening_factors(self):
@@ -50,24 +226,178 @@ class ConvergenceEvaluator:
         return self._dimension
 
     def get_lfa_grid(self, grid: base.Grid, i: int):
-        lfa_grid = self.lfa_grids[i]
-        step_size = lfa_grid.step_size()
-        while step_size < grid.step_size:
-            lfa_grid = lfa_grid.coarse(self.coarsening_factors[i])
-            step_size = lfa_grid.step_size()
-        return lfa_grid
+        table = self._lfa_grid_table[i]
+        if grid.step_size in table:
+            return table[grid.step_size]
+        hierarchy = self._lfa_grid_hierarchies[i]
+        level = 0
+        while hierarchy[level].step_size() < grid.step_size:
+            level += 1
+            if level == len(hierarchy):
+                hierarchy.append(hierarchy[-1].coarse(self.coarsening_factors[i]))
+        table[grid.step_size] = hierarchy[level]
+        self._lfa_grid_levels[i][grid.step_size] = level
+        return hierarchy[level]
+
+    def get_level(self, grid: base.Grid, i: int):
+        # Number of coarsening steps between the finest LFA grid and the given grid
+        self.get_lfa_grid(grid, i)
+        return self._lfa_grid_levels[i][grid.step_size]
+
+    @property
+    def metrics(self):
+        return self._metrics
+
+    @property
+    def number_of_steps(self):
+        return self._number_of_steps
+
+    def set_metrics(self, metrics):
+        metrics = tuple(metrics)
+        if 'spectral_radius' not in metrics:
+            metrics = ('spectral_radius',) + metrics
+        for name in metrics:
+            if name not in ('spectral_radius', 'spectral_norm', 'k_step_norm'):
+                raise RuntimeError(f'Unknown convergence metric {name}')
+        # The symbols of lfa_lab can not be raised to a power without evaluating the k-fold product again
+        if 'k_step_norm' in metrics and self._backend is not fourier:
+            raise RuntimeError("The k-step norm is only supported by the numpy backend")
+        self._metrics = metrics
+        # The workers compute the metrics that were requested at the time of their creation
+        self.shutdown()
+
+    @property
+    def truncation_depth(self):
+        return self._truncation_depth
+
+    @property
+    def coarse_grid_solver_model(self):
+        return self._coarse_grid_solver_model
+
+    def lookup_lfa_operator(self, key, convert: callable):
+        try:
+            if key in self._lfa_operator_cache:
+                return self._lfa_operator_cache[key]
+        except TypeError:
+            # Stencils with unhashable entries are not cached
+            return convert()
+        lfa_operator = convert()
+        self._lfa_operator_cache[key] = lfa_operator
+        return lfa_operator
+
+    def convert_stencil(self, stencil, lfa_grid):
+        key = ('stencil', tuple(lfa_grid.step_size()), self.compute_stencil_key(stencil))
+        return self.lookup_lfa_operator(key, lambda: stencil_to_lfa(stencil, lfa_grid, self._backend))
+
+    def convert_partition_filters(self, partitioning_type, stencil, grid: base.Grid, lfa_grid):
+        # The filters only depend on the shape of the stencil and the grid
+        key = ('partitioning', getattr(partitioning_type, '__name__', type(partitioning_type).__name__),
+               tuple(periodic.determine_maximal_shape(stencil)), tuple(lfa_grid.step_size()))
+
+        def convert():
+            partition_stencils = partitioning_type.generate(stencil, grid)
+            return tuple(stencil_to_lfa(partition_stencil, lfa_grid, self._backend)
+                         for partition_stencil in partition_stencils)
+        return self.lookup_lfa_operator(key, convert)
+
+    def convert_intergrid_operator(self, operator: base.InterGridOperator, i: int):
+        stencil = operator.generate_stencil()
+        key = (type(operator).__name__, i, operator.fine_grid.step_size, operator.coarse_grid.step_size,
+               self.compute_stencil_key(stencil))
+
+        def convert():
+            lfa_fine_grid = self.get_lfa_grid(operator.fine_grid, i)
+            lfa_coarse_grid = self.get_lfa_grid(operator.coarse_grid, i)
+            lfa_stencil = self.convert_stencil(stencil, lfa_fine_grid)
+            if isinstance(operator, base.Restriction):
+                return self._backend.injection_restriction(lfa_fine_grid, lfa_coarse_grid) * lfa_stencil
+            elif isinstance(operator, base.Prolongation):
+                return lfa_stencil * self._backend.injection_interpolation(lfa_fine_grid, lfa_coarse_grid)
+            else:
+                raise NotImplementedError("Not implemented")
+        return self.lookup_lfa_operator(key, convert)
+
+    @staticmethod
+    def compute_grid_key(grid: base.Grid):
+        return dag.grid_key(grid)
+
+    @staticmethod
+    def compute_stencil_key(stencil):
+        return dag.stencil_key(stencil)
+
+    def compute_structural_key(self, expression: base.Expression):
+        # Two expressions with the same key are transformed to equivalent LFA symbols
+        # The key is the interned node of the expression or None if the expression can not be interned
+        return self._expression_table.intern(expression, self._structural_keys)
+
+    @staticmethod
+    def find_operator(expression: base.Expression, grid: List[base.Grid]):
+        # Returns the operator of the first residual that is computed on the given grid
+        stack = [expression]
+        while len(stack) > 0:
+            expression = stack.pop()
+            if isinstance(expression, base.Residual):
+                if expression.operator.grid == grid:
+                    return expression.operator
+                stack.extend([expression.rhs, expression.approximation])
+            elif isinstance(expression, base.Cycle):
+                stack.extend([expression.rhs, expression.approximation, expression.correction])
+            elif isinstance(expression, base.BinaryExpression):
+                stack.extend([expression.operand2, expression.operand1])
+            elif isinstance(expression, (base.UnaryExpression, base.Scaling)):
+                stack.append(expression.operand)
+        return None
+
+    def truncate(self, expression: base.Cycle):
+        # Returns the coarse grid operator if the cycle is below the truncation depth and None otherwise
+        if self.truncation_depth is None or isinstance(expression.rhs, system.RightHandSide):
+            return None
+        grid = expression.grid
+        if self.get_level(grid[0], 0) < self.truncation_depth:
+            return None
+        return self.find_operator(expression, grid)
+
+    def get_coarse_grid_solver_bound(self, coarse_grid_solver: base.CoarseGridSolver):
+        key = self.compute_structural_key(coarse_grid_solver.expression)
+        if key not in self._coarse_grid_solver_bounds:
+            metrics, _ = self.compute_metrics_locally(coarse_grid_solver.expression)
+            self._coarse_grid_solver_bounds[key] = min(metrics['spectral_radius'], 1.0)
+        return self._coarse_grid_solver_bounds[key]
 
     def transform(self, expression: base.Expression):
+        # Structural keys are only valid as long as the expression is not modified
+        if self._transform_depth == 0:
+            self._structural_keys.clear()
+        self._transform_depth += 1
+        try:
+            return self._transform(expression)
+        finally:
+            self._transform_depth -= 1
+
+    def _transform(self, expression: base.Expression):
         if expression.lfa_symbol is not None:
             return expression.lfa_symbol
+        key = self.compute_structural_key(expression)
+        if key is not None and key.id in self._lfa_symbol_cache:
+            self._lfa_symbol_cache_hits += 1
+            self._lfa_symbol_cache.move_to_end(key.id)
+            expression.lfa_symbol = self._lfa_symbol_cache[key.id]
+            return expression.lfa_symbol
+        self._lfa_symbol_cache_misses += 1
+        coarse_operator = None
         if isinstance(expression, base.Cycle):
-            correction = self.transform(expression.correction)
+            coarse_operator = self.truncate(expression)
+        if coarse_operator is not None:
+            # The coarse grid correction is computed exactly
+            result = self._transform(coarse_operator).inverse() * self._transform(expression.rhs)
+        elif isinstance(expression, base.Cycle):
+            correction = self._transform(expression.correction)
             if isinstance(expression.approximation, system.ZeroApproximation):
                 approximation = correction.matching_zero()
             elif isinstance(expression.approximation, system.Approximation):
                 approximation = correction.matching_identity()
             else:
-                approximation = self.transform(expression.approximation)
+                approximation = self._transform(expression.approximation)
             tmp = approximation + expression.relaxation_factor * correction
             if expression.partitioning == partitioning.Single:
                 result = tmp
@@ -90,17 +420,17 @@ class ConvergenceEvaluator:
                             black_entries.append([])
                             for j, entry in enumerate(row):
                                 lfa_grid = self.get_lfa_grid(entry.grid, i)
-                                partition_stencils = expression.partitioning.generate(entry.generate_stencil(), entry.grid)
-                                lfa_red = stencil_to_lfa(partition_stencils[0], lfa_grid)
-                                lfa_black = stencil_to_lfa(partition_stencils[1], lfa_grid)
+                                lfa_red, lfa_black = self.convert_partition_filters(expression.partitioning,
+                                                                                    entry.generate_stencil(),
+                                                                                    entry.grid, lfa_grid)
                                 if i == j:
                                     red_entries[-1].append(lfa_red)
                                     black_entries[-1].append(lfa_black)
                                 else:
                                     red_entries[-1].append(lfa_red * lfa_red.matching_zero())
                                     black_entries[-1].append(lfa_black * lfa_black.matching_zero())
-                        red_filter = lfa_lab.system(red_entries)
-                        black_filter = lfa_lab.system(black_entries)
+                        red_filter = self._backend.system(red_entries)
+                        black_filter = self._backend.system(black_entries)
                         result = (black_filter + red_filter * tmp) * (red_filter + black_filter * tmp)
                     else:
                         raise RuntimeError("Computation could not be partitioned.")
@@ -109,22 +439,22 @@ class ConvergenceEvaluator:
             else:
                 raise NotImplementedError("Not implemented")
         elif isinstance(expression, base.Residual):
-            operator = self.transform(expression.operator)
+            operator = self._transform(expression.operator)
             if isinstance(expression.rhs, system.RightHandSide):
                 rhs = operator.matching_zero()
             else:
-                rhs = self.transform(expression.rhs)
+                rhs = self._transform(expression.rhs)
             if isinstance(expression.approximation, system.ZeroApproximation):
                 approximation = rhs.matching_zero()
             elif isinstance(expression.approximation, system.Approximation):
                 approximation = rhs.matching_identity()
             else:
-                approximation = self.transform(expression.approximation)
+                approximation = self._transform(expression.approximation)
             result = rhs - operator * approximation
             # result = self.transform(expression.generate_expression())
         elif isinstance(expression, base.BinaryExpression):
-            child1 = self.transform(expression.operand1)
-            child2 = self.transform(expression.operand2)
+            child1 = self._transform(expression.operand1)
+            child2 = self._transform(expression.operand2)
             if isinstance(expression, base.Multiplication):
                 result = child1 * child2
             elif isinstance(expression, base.Addition):
@@ -134,62 +464,176 @@ class ConvergenceEvaluator:
             else:
                 raise RuntimeError("Not evaluated")
         elif isinstance(expression, base.Scaling):
-            result = expression.factor * self.transform(expression.operand)
+            result = expression.factor * self._transform(expression.operand)
         elif isinstance(expression, base.Inverse):
-            result = self.transform(expression.operand).inverse()
+            result = self._transform(expression.operand).inverse()
         elif isinstance(expression, system.Diagonal):
-            result = self.transform(expression.operand).diag()
+            result = self._transform(expression.operand).diag()
         elif isinstance(expression, system.ElementwiseDiagonal):
-            result = self.transform(expression.operand).elementwise_diag()
+            result = self._transform(expression.operand).elementwise_diag()
         elif isinstance(expression, base.CoarseGridSolver):
-            operator = self.transform(expression.operator)
+            operator = self._transform(expression.operator)
             result = operator.inverse()
+            if self.coarse_grid_solver_model == 'bound' and expression.expression is not None:
+                # The error of the inexact solve is modeled as a scaling by the spectral radius of the cycle
+                result = (1.0 - self.get_coarse_grid_solver_bound(expression)) * result
         elif isinstance(expression, system.Operator):
             lfa_entries = []
             for operator_row in expression.entries:
                 lfa_entries.append([])
                 for i, entry in enumerate(operator_row):
                     if isinstance(entry, base.InterGridOperator):
-                        operator = entry
-                        lfa_fine_grid = self.get_lfa_grid(operator.fine_grid, i)
-                        lfa_coarse_grid = self.get_lfa_grid(operator.coarse_grid, i)
-                        stencil = operator.generate_stencil()
-                        lfa_stencil = stencil_to_lfa(stencil, lfa_fine_grid)
-                        if isinstance(operator, base.Restriction):
-                            lfa_operator = lfa_lab.injection_restriction(lfa_fine_grid, lfa_coarse_grid) * lfa_stencil
-                        elif isinstance(operator, base.Prolongation):
-                            lfa_operator = lfa_stencil * lfa_lab.injection_interpolation(lfa_fine_grid, lfa_coarse_grid)
-                        else:
-                            raise NotImplementedError("Not implemented")
+                        lfa_operator = self.convert_intergrid_operator(entry, i)
                     else:
                         lfa_grid = self.get_lfa_grid(entry.grid, i)
-                        lfa_operator = stencil_to_lfa(entry.generate_stencil(), lfa_grid)
+                        lfa_operator = self.convert_stencil(entry.generate_stencil(), lfa_grid)
                     lfa_entries[-1].append(lfa_operator)
-            result = lfa_lab.system(lfa_entries)
+            result = self._backend.system(lfa_entries)
         else:
             raise NotImplementedError("Not implemented")
         expression.lfa_symbol = result
+        if key is not None:
+            self._lfa_symbol_cache[key.id] = result
+            if len(self._lfa_symbol_cache) > self._lfa_symbol_cache_size:
+                self._lfa_symbol_cache.popitem(last=False)
         return result
 
-    def compute_spectral_radius(self, expression: base.Expression):
+    def is_decided(self, spectral_radius: float):
+        # An estimate is final if it is not close to any of the thresholds at which decisions are made
+        return all(abs(spectral_radius - threshold) > self.refinement_tolerance * threshold
+                   for threshold in self.decision_thresholds)
+
+    def compute_metrics(self, symbol):
+        # All metrics are derived from the same symbol
+        metrics = {}
+        for name in self.metrics:
+            if name == 'spectral_radius':
+                metrics[name] = symbol.spectral_radius()
+            elif name == 'spectral_norm':
+                metrics[name] = symbol.spectral_norm()
+            elif name == 'k_step_norm':
+                # Average reduction per iteration within the first k iterations
+                k = self.number_of_steps
+                metrics[name] = symbol.power(k).spectral_norm() ** (1.0 / k)
+            else:
+                raise RuntimeError(f'Unknown convergence metric {name}')
+        return metrics
+
+    def estimate_metrics(self, lfa_expression):
+        # Returns the metrics together with the resolution of the symbol
+        if self._backend is not fourier:
+            return self.compute_metrics(lfa_expression.symbol()), None
+        if not self.adaptive_resolution:
+            return self.compute_metrics(lfa_expression.symbol(self.resolution)), self.resolution
+        # Start with a coarse sampling of the frequencies and only refine close to the thresholds
+        resolution = min(self.minimum_resolution, self.resolution)
+        while True:
+            symbol = lfa_expression.symbol(resolution)
+            if resolution >= self.resolution or self.is_decided(symbol.spectral_radius()):
+                return self.compute_metrics(symbol), resolution
+            resolution = min(2 * resolution, self.resolution)
+
+    def failed_metrics(self):
+        return {name: 0.0 for name in self.metrics}
+
+    def compute_metrics_locally(self, expression: base.Expression):
+        try:
+            lfa_expression = self.transform(expression)
+            return self.estimate_metrics(lfa_expression)
+        except (ArithmeticError, RuntimeError, MemoryError) as _:
+            return self.failed_metrics(), None
+
+    def compute_metrics_of_task(self, task):
+        # Evaluated by the workers, which have been forked before the current thresholds were set
+        expression, decision_thresholds = task
+        self._decision_thresholds = decision_thresholds
+        return self.compute_metrics_locally(expression)
+
+    def compute_metrics_in_subprocess(self, expression: base.Expression):
         try:
             lfa_expression = self.transform(expression)
 
             def evaluate(q, expr):
                 try:
-                    s = expr.symbol()
-                    q.put(s.spectral_radius())
+                    q.put(self.estimate_metrics(expr))
 
                 except (ArithmeticError, RuntimeError, MemoryError) as _:
-                    q.put(0.0)
+                    q.put((self.failed_metrics(), None))
 
             queue = Queue()
             p = Process(target=evaluate, args=(queue, lfa_expression))
             p.start()
-            p.join()
+            violation = supervise(p, self.timeout, self.memory_limit)
+            if violation == 'timeout':
+                self._number_of_timeouts += 1
+            elif violation == 'memory':
+                self._number_of_memory_violations += 1
             if queue.empty():
-                return 0.0
+                return self.failed_metrics(), None
             return queue.get(timeout=10)
         except (ArithmeticError, RuntimeError, MemoryError) as _:
-            return 0.0
+            return self.failed_metrics(), None
+
+    def compute_signature(self, expression: base.Expression):
+        # Expressions that share the operator of their outermost residual also share most of their symbols
+        while not isinstance(expression, base.Residual):
+            if isinstance(expression, base.Cycle):
+                expression = expression.correction
+            elif isinstance(expression, base.BinaryExpression):
+                expression = expression.operand2
+            elif isinstance(expression, (base.UnaryExpression, base.Scaling)):
+                expression = expression.operand
+            else:
+                return None
+        return self.compute_structural_key(expression.operator)
+
+    def schedule(self, expressions: List[base.Expression]):
+        # Returns the unique expressions grouped by their signature and the index of each input within them
+        self._structural_keys.clear()
+        groups = {}
+        unique_indices = {}
+        assignment = []
+        try:
+            for i, expression in enumerate(expressions):
+                key = self.compute_structural_key(expression)
+                signature = self.compute_signature(expression)
+                if key is None:
+                    key, signature = ('unique', i), None
+                if key not in unique_indices:
+                    unique_indices[key] = i
+                    groups.setdefault(signature, []).append(i)
+                assignment.append(unique_indices[key])
+        finally:
+            self._structural_keys.clear()
+        order = [i for group in groups.values() for i in group]
+        position = {i: j for j, i in enumerate(order)}
+        return [expressions[i] for i in order], [position[i] for i in assignment]
+
+    def compute_convergence_metrics(self, expressions: List[base.Expression]):
+        # Results are returned in the order of the input
+        unique_expressions, assignment = self.schedule(list(expressions))
+        if not self.isolated:
+            results = [self.compute_metrics_locally(expression) for expression in unique_expressions]
+        elif current_process().daemon:
+            # Daemonic processes are not allowed to create workers, such that the limits can not be enforced
+            if not self._unenforced_limits_reported:
+                print("LFA time and memory limits are not enforced within daemonic processes", flush=True)
+                self._unenforced_limits_reported = True
+            results = [self.compute_metrics_locally(expression) for expression in unique_expressions]
+        else:
+            if self._worker_pool is None:
+                self._worker_pool = LFAWorkerPool(self.compute_metrics_of_task, self.number_of_workers,
+                                                  self.timeout, default=(self.failed_metrics(), None),
+                                                  memory_limit=self.memory_limit)
+            # Expressions that can not be sent to the workers are evaluated in a separate process
+            tasks = [(expression, self.decision_thresholds) for expression in unique_expressions]
+            results = self._worker_pool.map(tasks, fallback=lambda task: self.compute_metrics_in_subprocess(task[0]))
+        results = [results[j] for j in assignment]
+        self._resolutions = [resolution for _, resolution in results]
+        return [dict(metrics) for metrics, _ in results]
 
+    def compute_spectral_radii(self, expressions: List[base.Expression]):
+        return [metrics['spectral_radius'] for metrics in self.compute_convergence_metrics(expressions)]
+
+    def compute_spectral_radius(self, expression: base.Expression):
+        return self.compute_spectral_radii([expression])[0]
@@ -0,0 +1,432 @@
+"""
+Local Fourier analysis with NumPy
+
+Provides the subset of the lfa_lab interface that is required by the ConvergenceEvaluator.
+Expressions are assembled lazily and only evaluated when their symbol is requested.
+All grids are then embedded into a common period, such that each operator is represented by a small dense matrix
+that couples the harmonics of each frequency.
+The matrices of all sampled frequencies are stored in a single array and processed with batched NumPy routines.
+"""
+import math
+import numpy as np
+from functools import reduce
+
+
+class Grid:
+    def __init__(self, dimension: int, step_size: tuple):
+        assert len(step_size) == dimension, "Dimension and step size must match"
+        self._dimension = dimension
+        self._step_size = tuple(step_size)
+
+    def dimension(self):
+        return self._dimension
+
+    def step_size(self):
+        return self._step_size
+
+    def coarse(self, coarsening_factor: tuple):
+        return Grid(self._dimension, tuple(h * c for h, c in zip(self._step_size, coarsening_factor)))
+
+    def __eq__(self, other):
+        return isinstance(other, Grid) and self._step_size == other._step_size
+
+    def __hash__(self):
+        return hash(self._step_size)
+
+    def __repr__(self):
+        return f'Grid({self._dimension}, {repr(self._step_size)})'
+
+
+class SparseStencil:
+    def __init__(self, entries):
+        self._entries = tuple((tuple(offset), value) for offset, value in entries)
+
+    @property
+    def entries(self):
+        return self._entries
+
+    def __iter__(self):
+        return iter(self._entries)
+
+
+class NdArray:
+    def __init__(self, elements):
+        self._elements = elements
+
+    @property
+    def elements(self):
+        return self._elements
+
+    @property
+    def shape(self):
+        shape = []
+        array = self._elements
+        while isinstance(array, (list, tuple)):
+            shape.append(len(array))
+            array = array[0]
+        return tuple(shape)
+
+    def __getitem__(self, index):
+        element = self._elements
+        for i in index:
+            element = element[i]
+        return element
+
+
+class Context:
+    """
+    Common period of all grids and the sampled base frequencies of an expression
+    """
+    def __init__(self, requirements, resolution: int):
+        dimension = len(requirements[0][0])
+        # Step sizes are expressed in multiples of the smallest step size
+        units = tuple(min(step_size[d] for step_size, _ in requirements) for d in range(dimension))
+        period = []
+        for d in range(dimension):
+            multiples = [int(round(step_size[d] * p[d] / units[d])) for step_size, p in requirements]
+            period.append(reduce(lambda a, b: a * b // math.gcd(a, b), multiples))
+        self.dimension = dimension
+        self.units = units
+        self.period = tuple(period)
+        finest_number_of_modes = max(
+            reduce(lambda a, b: a * b, self.number_of_modes(step_size)) for step_size, _ in requirements)
+        finest_number_of_modes = max(int(round(finest_number_of_modes ** (1.0 / dimension))), 1)
+        # The resolution refers to the number of frequencies per dimension on the finest grid
+        # At least two samples are required to resolve the frequency dependence of the symbol
+        self.samples_per_dimension = max(resolution // finest_number_of_modes, 2)
+        n = self.samples_per_dimension
+        base_frequencies = [2 * math.pi * (np.arange(n) + 0.5) / (n * self.period[d]) for d in range(dimension)]
+        # Flattened frequency index in lexicographic order
+        self.base_frequencies = [f.reshape((1,) * d + (n,) + (1,) * (dimension - d - 1))
+                                 for d, f in enumerate(base_frequencies)]
+        self.number_of_frequencies = n ** dimension
+
+    def ratio(self, step_size: tuple):
+        return tuple(int(round(h / u)) for h, u in zip(step_size, self.units))
+
+    def number_of_modes(self, step_size: tuple):
+        return tuple(p // r for p, r in zip(self.period, self.ratio(step_size)))
+
+    def size(self, grid: Grid):
+        return reduce(lambda a, b: a * b, self.number_of_modes(grid.step_size()))
+
+
+def _product_space_size(context: Context, grids):
+    return sum(context.size(grid) for grid in grids)
+
+
+class Node:
+    """
+    Lazily evaluated operator that maps functions on the input grids to functions on the output grids
+    """
+    def __init__(self, output_grids: tuple, input_grids: tuple, children=()):
+        self.output_grids = tuple(output_grids)
+        self.input_grids = tuple(input_grids)
+        self.children = tuple(children)
+
+    def requirements(self):
+        # Pairs of step size and period that must divide the common period
+        return [(grid.step_size(), (1,) * grid.dimension()) for grid in self.output_grids + self.input_grids]
+
+    def evaluate(self, context: Context, memo: dict):
+        key = id(self)
+        if key not in memo:
+            children = [child.evaluate(context, memo) for child in self.children]
+            memo[key] = self._evaluate(context, children)
+        return memo[key]
+
+    def _evaluate(self, context: Context, children: list):
+        raise NotImplementedError("Not implemented")
+
+    def _collect_requirements(self):
+        requirements = []
+        visited = set()
+        stack = [self]
+        while len(stack) > 0:
+            node = stack.pop()
+            if id(node) in visited:
+                continue
+            visited.add(id(node))
+            requirements.extend(node.requirements())
+            stack.extend(node.children)
+        return requirements
+
+    def symbol(self, resolution=64):
+        context = Context(self._collect_requirements(), resolution)
+        return Symbol(self.evaluate(context, {}), context)
+
+    def __add__(self, other):
+        return Sum(self, other)
+
+    def __sub__(self, other):
+        return Sum(self, Scaling(-1.0, other))
+
+    def __neg__(self):
+        return Scaling(-1.0, self)
+
+    def __mul__(self, other):
+        if isinstance(other, Node):
+            return Product(self, other)
+        return Scaling(other, self)
+
+    def __rmul__(self, other):
+        return Scaling(other, self)
+
+    def inverse(self):
+        return Inverse(self)
+
+    def matching_zero(self):
+        return Zero(self.output_grids, self.input_grids)
+
+    def matching_identity(self):
+        return Identity(self.output_grids, self.input_grids)
+
+    def diag(self):
+        raise NotImplementedError("The diagonal is only available for stencils")
+
+    def elementwise_diag(self):
+        raise NotImplementedError("The diagonal is only available for stencils")
+
+
+class Stencil(Node):
+    def __init__(self, stencils: NdArray, grid: Grid):
+        super().__init__((grid,), (grid,))
+        self._stencils = stencils
+        self._grid = grid
+
+    @property
+    def grid(self):
+        return self._grid
+
+    @property
+    def stencils(self):
+        return self._stencils
+
+    def requirements(self):
+        return [(self._grid.step_size(), self._stencils.shape)]
+
+    def diag(self):
+        def recursive_descent(array):
+            if isinstance(array, (list, tuple)):
+                return [recursive_descent(element) for element in array]
+            return SparseStencil(entry for entry in array if all(o == 0 for o in entry[0]))
+        return Stencil(NdArray(recursive_descent(self._stencils.elements)), self._grid)
+
+    def elementwise_diag(self):
+        return self.diag()
+
+    def _evaluate(self, context: Context, _):
+        dimension = context.dimension
+        ratio = context.ratio(self._grid.step_size())
+        number_of_modes = context.number_of_modes(self._grid.step_size())
+        period = self._stencils.shape
+        n = context.samples_per_dimension
+        # Frequencies of all harmonics with shape (n, ..., n, modes_0, ..., modes_d-1)
+        frequencies = []
+        for d in range(dimension):
+            k = np.arange(number_of_modes[d]).reshape((1,) * dimension + (1,) * d + (number_of_modes[d],)
+                                                      + (1,) * (dimension - d - 1))
+            theta = context.base_frequencies[d].reshape(context.base_frequencies[d].shape + (1,) * dimension)
+            frequencies.append(theta + 2 * math.pi * k / context.period[d])
+        shape = (n,) * dimension + number_of_modes
+        symbols = np.zeros(period + shape, dtype=complex)
+        for position in np.ndindex(*period):
+            result = np.zeros(shape, dtype=complex)
+            for offset, value in self._stencils[position]:
+                phase = sum(frequencies[d] * (ratio[d] * offset[d]) for d in range(dimension))
+                result = result + value * np.exp(1j * phase)
+            symbols[position] = result
+        # Decompose the position dependent symbols into their harmonics
+        coefficients = np.fft.fftn(symbols, axes=tuple(range(dimension))) / reduce(lambda a, b: a * b, period)
+        size = reduce(lambda a, b: a * b, number_of_modes)
+        coefficients = coefficients.reshape(period + (context.number_of_frequencies, size))
+        matrices = np.zeros((context.number_of_frequencies, size, size), dtype=complex)
+        modes = np.indices(number_of_modes).reshape(dimension, -1)
+        columns = np.arange(size)
+        for q in np.ndindex(*period):
+            shifted_modes = tuple((modes[d] + q[d] * number_of_modes[d] // period[d]) % number_of_modes[d]
+                                  for d in range(dimension))
+            rows = np.ravel_multi_index(shifted_modes, number_of_modes)
+            matrices[:, rows, columns] += coefficients[q]
+        return matrices
+
+
+class InjectionRestriction(Node):
+    def __init__(self, fine_grid: Grid, coarse_grid: Grid):
+        super().__init__((coarse_grid,), (fine_grid,))
+
+    def _evaluate(self, context: Context, _):
+        fine_modes = context.number_of_modes(self.input_grids[0].step_size())
+        coarse_modes = context.number_of_modes(self.output_grids[0].step_size())
+        modes = np.indices(fine_modes).reshape(len(fine_modes), -1)
+        rows = np.ravel_multi_index(tuple(m % c for m, c in zip(modes, coarse_modes)), coarse_modes)
+        matrix = np.zeros((context.size(self.output_grids[0]), context.size(self.input_grids[0])), dtype=complex)
+        matrix[rows, np.arange(modes.shape[1])] = 1
+        return np.broadcast_to(matrix, (context.number_of_frequencies,) + matrix.shape)
+
+
+class InjectionInterpolation(Node):
+    def __init__(self, fine_grid: Grid, coarse_grid: Grid):
+        super().__init__((fine_grid,), (coarse_grid,))
+
+    def _evaluate(self, context: Context, _):
+        fine_modes = context.number_of_modes(self.output_grids[0].step_size())
+        coarse_modes = context.number_of_modes(self.input_grids[0].step_size())
+        factors = tuple(f // c for f, c in zip(fine_modes, coarse_modes))
+        modes = np.indices(coarse_modes).reshape(len(coarse_modes), -1)
+        matrix = np.zeros((context.size(self.output_grids[0]), context.size(self.input_grids[0])), dtype=complex)
+        columns = np.arange(modes.shape[1])
+        # Injection into the coarse grid points excites all harmonics that alias to the coarse frequency
+        weight = 1.0 / reduce(lambda a, b: a * b, factors)
+        for q in np.ndindex(*factors):
+            rows = np.ravel_multi_index(tuple(m + i * c for m, i, c in zip(modes, q, coarse_modes)), fine_modes)
+            matrix[rows, columns] = weight
+        return np.broadcast_to(matrix, (context.number_of_frequencies,) + matrix.shape)
+
+
+class System(Node):
+    def __init__(self, entries):
+        output_grids = []
+        for row in entries:
+            if len(row[0].output_grids) != 1:
+                raise RuntimeError("Entries of a system must be scalar")
+            output_grids.append(row[0].output_grids[0])
+        input_grids = [entry.input_grids[0] for entry in entries[0]]
+        for row in entries:
+            for j, entry in enumerate(row):
+                if entry.input_grids[0] != input_grids[j]:
+                    raise RuntimeError("Input grids of a system column must match")
+        self._entries = [list(row) for row in entries]
+        super().__init__(output_grids, input_grids, [entry for row in entries for entry in row])
+
+    @property
+    def entries(self):
+        return self._entries
+
+    def diag(self):
+        return System([[entry.diag() if i == j else entry.matching_zero() for j, entry in enumerate(row)]
+                       for i, row in enumerate(self._entries)])
+
+    def elementwise_diag(self):
+        return System([[entry.diag() for entry in row] for row in self._entries])
+
+    def _evaluate(self, context: Context, children: list):
+        number_of_columns = len(self._entries[0])
+        rows = []
+        for i in range(len(self._entries)):
+            rows.append(np.concatenate(children[i * number_of_columns:(i + 1) * number_of_columns], axis=2))
+        return np.concatenate(rows, axis=1)
+
+
+class Sum(Node):
+    def __init__(self, operand1: Node, operand2: Node):
+        if operand1.output_grids != operand2.output_grids or operand1.input_grids != operand2.input_grids:
+            raise RuntimeError("Operands must have the same shape")
+        super().__init__(operand1.output_grids, operand1.input_grids, (operand1, operand2))
+
+    def _evaluate(self, context: Context, children: list):
+        return children[0] + children[1]
+
+
+class Product(Node):
+    def __init__(self, operand1: Node, operand2: Node):
+        if operand1.input_grids != operand2.output_grids:
+            raise RuntimeError("Operands must have a matching shape")
+        super().__init__(operand1.output_grids, operand2.input_grids, (operand1, operand2))
+
+    def _evaluate(self, context: Context, children: list):
+        return np.matmul(children[0], children[1])
+
+
+class Scaling(Node):
+    def __init__(self, factor: float, operand: Node):
+        super().__init__(operand.output_grids, operand.input_grids, (operand,))
+        self._factor = factor
+
+    def _evaluate(self, context: Context, children: list):
+        return self._factor * children[0]
+
+
+class Inverse(Node):
+    def __init__(self, operand: Node):
+        if operand.output_grids != operand.input_grids:
+            raise RuntimeError("Only square operators can be inverted")
+        super().__init__(operand.output_grids, operand.input_grids, (operand,))
+
+    def _evaluate(self, context: Context, children: list):
+        try:
+            return np.linalg.inv(children[0])
+        except np.linalg.LinAlgError as e:
+            raise ArithmeticError(str(e))
+
+
+class Zero(Node):
+    def _evaluate(self, context: Context, _):
+        return np.zeros((context.number_of_frequencies, _product_space_size(context, self.output_grids),
+                         _product_space_size(context, self.input_grids)), dtype=complex)
+
+
+class Identity(Node):
+    def __init__(self, output_grids: tuple, input_grids: tuple):
+        if tuple(output_grids) != tuple(input_grids):
+            raise RuntimeError("The identity requires equal input and output grids")
+        super().__init__(output_grids, input_grids)
+
+    def _evaluate(self, context: Context, _):
+        size = _product_space_size(context, self.output_grids)
+        return np.broadcast_to(np.eye(size, dtype=complex), (context.number_of_frequencies, size, size))
+
+
+class Symbol:
+    """
+    Matrices of an operator for all sampled frequencies
+    """
+    def __init__(self, matrices: np.ndarray, context: Context):
+        self._matrices = matrices
+        self._context = context
+
+    @property
+    def matrices(self):
+        return self._matrices
+
+    @property
+    def resolution(self):
+        return self._context.samples_per_dimension
+
+    def eigenvalues(self):
+        if not np.all(np.isfinite(self._matrices)):
+            raise ArithmeticError("Symbol contains non-finite entries")
+        try:
+            return np.linalg.eigvals(self._matrices)
+        except np.linalg.LinAlgError as e:
+            raise ArithmeticError(str(e))
+
+    def spectral_radius(self):
+        return float(np.max(np.abs(self.eigenvalues())))
+
+    def power(self, k: int):
+        return Symbol(np.linalg.matrix_power(self._matrices, k), self._context)
+
+    def spectral_norm(self):
+        if not np.all(np.isfinite(self._matrices)):
+            raise ArithmeticError("Symbol contains non-finite entries")
+        try:
+            return float(np.max(np.linalg.svd(self._matrices, compute_uv=False)))
+        except np.linalg.LinAlgError as e:
+            raise ArithmeticError(str(e))
+
+
+def from_periodic_stencil(stencils: NdArray, grid: Grid):
+    return Stencil(stencils, grid)
+
+
+def injection_restriction(fine_grid: Grid, coarse_grid: Grid):
+    return InjectionRestriction(fine_grid, coarse_grid)
+
+
+def injection_interpolation(fine_grid: Grid, coarse_grid: Grid):
+    return InjectionInterpolation(fine_grid, coarse_grid)
+
+
+def system(entries):
+    return System(entries)
@@ -0,0 +1,230 @@
+import multiprocessing
+import pickle
+import time
+from multiprocessing.connection import wait
+
+
+def get_resident_set_size(pid: int):
+    # Returns the resident set size of a process in bytes or None if it can not be determined
+    try:
+        with open(f'/proc/{pid}/status', 'r') as file:
+            for line in file:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    return None
+
+
+def exceeds_memory_limit(pid: int, memory_limit):
+    if memory_limit is None:
+        return False
+    resident_set_size = get_resident_set_size(pid)
+    return resident_set_size is not None and resident_set_size > memory_limit
+
+
+def supervise(process, timeout=None, memory_limit=None, poll_interval=0.5):
+    # Waits for the process to finish and kills it as soon as it exceeds one of the limits
+    # Returns 'timeout' or 'memory' if the process was killed and None otherwise
+    deadline = None
+    if timeout is not None:
+        deadline = time.time() + timeout
+    while process.is_alive():
+        wait_time = poll_interval if memory_limit is not None else None
+        if deadline is not None:
+            remaining = max(deadline - time.time(), 0)
+            wait_time = remaining if wait_time is None else min(wait_time, remaining)
+        process.join(wait_time)
+        if not process.is_alive():
+            break
+        if exceeds_memory_limit(process.pid, memory_limit):
+            process.kill()
+            process.join()
+            return 'memory'
+        if deadline is not None and time.time() >= deadline:
+            process.kill()
+            process.join()
+            return 'timeout'
+    return None
+
+
+def _worker_loop(connection, evaluate: callable, default):
+    while True:
+        try:
+            task = connection.recv()
+        except (EOFError, OSError):
+            return
+        if task is None:
+            return
+        try:
+            result = evaluate(task)
+        except Exception:
+            result = default
+        try:
+            connection.send(result)
+        except (OSError, pickle.PicklingError):
+            return
+
+
+class LFAWorkerPool:
+    """
+    Pool of long-lived worker processes that protects the caller from crashes within the local Fourier analysis
+    Workers are forked, such that they inherit the state of the evaluation function at the time of their creation
+    Workers that exceed the timeout (in seconds) or the memory limit (resident set size in bytes) are restarted
+    Tasks that can not be sent to a worker are retried on a restarted worker a limited number of times
+    """
+    def __init__(self, evaluate: callable, number_of_workers=1, timeout=120, default=0.0, memory_limit=None,
+                 poll_interval=0.5, maximum_number_of_retries=3):
+        self._evaluate = evaluate
+        self._number_of_workers = number_of_workers
+        self._timeout = timeout
+        self._default = default
+        self._memory_limit = memory_limit
+        self._poll_interval = poll_interval
+        self._maximum_number_of_retries = maximum_number_of_retries
+        self._workers = []
+        self._number_of_restarts = 0
+        self._number_of_timeouts = 0
+        self._number_of_memory_violations = 0
+
+    @property
+    def number_of_workers(self):
+        return self._number_of_workers
+
+    @property
+    def timeout(self):
+        return self._timeout
+
+    @property
+    def memory_limit(self):
+        return self._memory_limit
+
+    @property
+    def maximum_number_of_retries(self):
+        return self._maximum_number_of_retries
+
+    @property
+    def number_of_restarts(self):
+        return self._number_of_restarts
+
+    @property
+    def number_of_timeouts(self):
+        return self._number_of_timeouts
+
+    @property
+    def number_of_memory_violations(self):
+        return self._number_of_memory_violations
+
+    @property
+    def running(self):
+        return len(self._workers) > 0
+
+    def _start_worker(self):
+        context = multiprocessing.get_context('fork')
+        parent_connection, child_connection = context.Pipe()
+        process = context.Process(target=_worker_loop, args=(child_connection, self._evaluate, self._default),
+                                  daemon=True)
+        process.start()
+        child_connection.close()
+        return process, parent_connection
+
+    @staticmethod
+    def _stop_worker(worker, graceful=True):
+        process, connection = worker
+        if graceful:
+            try:
+                connection.send(None)
+            except OSError:
+                pass
+            process.join(timeout=1)
+        if process.is_alive():
+            process.kill()
+            process.join()
+        connection.close()
+
+    def _restart_worker(self, index):
+        self._stop_worker(self._workers[index], graceful=False)
+        self._workers[index] = self._start_worker()
+        self._number_of_restarts += 1
+
+    def start(self):
+        if self.running:
+            return
+        self._workers = [self._start_worker() for _ in range(self.number_of_workers)]
+
+    def stop(self):
+        for worker in self._workers:
+            self._stop_worker(worker)
+        self._workers = []
+
+    def map(self, tasks: list, fallback: callable = None):
+        # Tasks that can not be sent to a worker are evaluated with the fallback function instead
+        if not self.running:
+            self.start()
+        results = [self._default] * len(tasks)
+        pending = list(reversed(range(len(tasks))))
+        idle = list(range(len(self._workers)))
+        busy = {}
+        number_of_retries = {}
+        while len(pending) > 0 or len(busy) > 0:
+            while len(pending) > 0 and len(idle) > 0:
+                task_index = pending.pop()
+                worker_index = idle.pop()
+                _, connection = self._workers[worker_index]
+                try:
+                    connection.send(tasks[task_index])
+                except (pickle.PicklingError, TypeError, AttributeError):
+                    # The message is serialized before it is sent, such that the worker remains usable
+                    idle.append(worker_index)
+                    if fallback is not None:
+                        results[task_index] = fallback(tasks[task_index])
+                    continue
+                except OSError:
+                    # The worker died while it was idle
+                    self._restart_worker(worker_index)
+                    idle.append(worker_index)
+                    number_of_retries[task_index] = number_of_retries.get(task_index, 0) + 1
+                    if number_of_retries[task_index] <= self.maximum_number_of_retries:
+                        pending.append(task_index)
+                    elif fallback is not None:
+                        results[task_index] = fallback(tasks[task_index])
+                    continue
+                deadline = None
+                if self.timeout is not None:
+                    deadline = time.time() + self.timeout
+                busy[worker_index] = task_index, deadline
+            if len(busy) == 0:
+                continue
+            deadlines = [deadline for _, deadline in busy.values() if deadline is not None]
+            wait_time = None
+            if len(deadlines) > 0:
+                wait_time = max(min(deadlines) - time.time(), 0)
+            if self.memory_limit is not None:
+                # The memory consumption of the busy workers is checked periodically
+                wait_time = self._poll_interval if wait_time is None else min(wait_time, self._poll_interval)
+            connections = {self._workers[worker_index][1]: worker_index for worker_index in busy}
+            ready = wait(list(connections.keys()), timeout=wait_time)
+            for connection in ready:
+                worker_index = connections[connection]
+                task_index, _ = busy.pop(worker_index)
+                try:
+                    results[task_index] = connection.recv()
+                except (EOFError, OSError):
+                    # The worker crashed during the evaluation
+                    self._restart_worker(worker_index)
+                idle.append(worker_index)
+            current_time = time.time()
+            for worker_index, (task_index, deadline) in list(busy.items()):
+                if deadline is not None and current_time >= deadline:
+                    del busy[worker_index]
+                    self._number_of_timeouts += 1
+                    self._restart_worker(worker_index)
+                    idle.append(worker_index)
+            for worker_index in list(busy.keys()):
+                process, _ = self._workers[worker_index]
+                if exceeds_memory_limit(process.pid, self.memory_limit):
+                    del busy[worker_index]
+                    self._number_of_memory_violations += 1
+                    self._restart_worker(worker_index)
+                    idle.append(worker_index)
+        return results
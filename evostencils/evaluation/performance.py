@@ -1,6 +1,7 @@
-from evostencils.expressions import base, partitioning, system
+from evostencils.expressions import base, partitioning, system, dag
 import evostencils.stencils.periodic as periodic
 from functools import reduce
+from typing import List
 
 
 class PerformanceEvaluator:
@@ -8,11 +9,13 @@ class PerformanceEvaluator:
     Class for estimating the performance of matrix expressions by applying a simple roofline model
     """
     def __init__(self, peak_performance: float, peak_bandwidth: float, bytes_per_word: int,
-                 runtime_coarse_grid_solver=0):
+                 runtime_coarse_grid_solver=0, runtime_cache_size=100000):
         self._peak_performance = peak_performance
         self._peak_bandwidth = peak_bandwidth
         self._bytes_per_word = bytes_per_word
         self._runtime_coarse_grid_solver = runtime_coarse_grid_solver
+        # Runtimes of structurally equal expressions are shared within the population
+        self._expression_table = dag.ExpressionTable(maximum_number_of_nodes=runtime_cache_size)
 
     @property
     def peak_performance(self):
@@ -30,8 +33,17 @@ class PerformanceEvaluator:
     def runtime_coarse_grid_solver(self):
         return self._runtime_coarse_grid_solver
 
+    @property
+    def expression_table(self):
+        return self._expression_table
+
     def set_runtime_of_coarse_grid_solver(self, runtime_coarse_grid_solver: float):
         self._runtime_coarse_grid_solver = runtime_coarse_grid_solver
+        # The estimates depend on the runtime of the coarse grid solver
+        self.clear_runtime_cache()
+
+    def clear_runtime_cache(self):
+        self._expression_table.clear()
 
     def compute_performance(self, intensity: float):
         return min(self.peak_performance, intensity * self.peak_bandwidth)
@@ -147,6 +159,22 @@ class PerformanceEvaluator:
         expression.runtime = runtime
         return runtime
 
+    def estimate_runtimes(self, expressions: List[base.Expression]):
+        # The runtime is stored within each (sub)expression, such that shared parts are only estimated once
+        # Structurally equal subexpressions of different individuals share the runtime stored in the side table
+        memo = {}
+        side_table = self._expression_table.runtimes
+        for expression in expressions:
+            self._expression_table.intern(expression, memo)
+        for expression, node in memo.values():
+            if node is not None and expression.runtime is None and node.id in side_table:
+                expression.runtime = side_table[node.id]
+        runtimes = [self.estimate_runtime(expression) for expression in expressions]
+        for expression, node in memo.values():
+            if node is not None and expression.runtime is not None:
+                side_table[node.id] = expression.runtime
+        return runtimes
+
     @staticmethod
     def operations_for_addition():
         return 1
@@ -1,17 +1,65 @@
 import abc
-from functools import reduce
+import weakref
+from functools import reduce, lru_cache, wraps
 from evostencils.expressions import partitioning as part
 from evostencils.stencils import periodic, gallery
 from evostencils.stencils import constant
 
 
+@lru_cache(maxsize=None)
+def get_slot_names(cls):
+    names = []
+    for c in reversed(cls.__mro__):
+        slots = c.__dict__.get('__slots__', ())
+        if isinstance(slots, str):
+            slots = (slots,)
+        names.extend(name for name in slots if name not in ('__dict__', '__weakref__'))
+    return tuple(names)
+
+
+def memoize_stencil(generate_stencil: callable):
+    # The stencil of a derived expression is generated once and stored in its _stencil slot
+    @wraps(generate_stencil)
+    def wrapper(self):
+        try:
+            return self._stencil
+        except AttributeError:
+            pass
+        self._stencil = generate_stencil(self)
+        return self._stencil
+    return wrapper
+
+
+def invalidate_stencil(expression):
+    try:
+        del expression._stencil
+    except AttributeError:
+        pass
+
+
 # Base classes
 class Expression(abc.ABC):
+    __slots__ = ('lfa_symbol', 'valid', 'runtime')
+
     def __init__(self):
         self.lfa_symbol = None
         self.valid = False
         self.runtime = None
 
+    def __getstate__(self):
+        # LFA symbols can not be pickled and are recomputed on demand
+        state = {name: getattr(self, name) for name in get_slot_names(type(self)) if hasattr(self, name)}
+        # Subclasses without slots store their attributes in a dictionary
+        state.update(getattr(self, '__dict__', {}))
+        state['lfa_symbol'] = None
+        # Memoized stencils are regenerated on demand as well
+        state.pop('_stencil', None)
+        return state
+
+    def __setstate__(self, state):
+        for name, value in state.items():
+            setattr(self, name, value)
+
     @property
     @abc.abstractmethod
     def shape(self):
@@ -27,6 +75,7 @@ class Expression(abc.ABC):
 
 
 class Entity(Expression):
+    __slots__ = ('_name', '_shape')
 
     @property
     def name(self):
@@ -47,6 +96,7 @@ class Entity(Expression):
 
 
 class UnaryExpression(Expression):
+    __slots__ = ('_operand', '_shape', '_stencil')
 
     def __init__(self, operand):
         self._operand = operand
@@ -73,6 +123,7 @@ class UnaryExpression(Expression):
 
 
 class BinaryExpression(Expression):
+    __slots__ = ('_operand1', '_operand2', '_shape', '_stencil')
 
     @property
     def operand1(self):
@@ -96,6 +147,8 @@ class BinaryExpression(Expression):
 
 # Entities
 class Operator(Entity):
+    __slots__ = ('_grid', '_stencil_generator')
+
     def __init__(self, name, grid, stencil_generator):
         import operator
         self._name = name
@@ -116,7 +169,7 @@ class Operator(Entity):
     def generate_stencil(self):
         if self._stencil_generator is None:
             return None
-        return self._stencil_generator.generate_stencil(self._grid)
+        return gallery.generate_stencil(self._stencil_generator, self._grid)
 
     def generate_exa3(self):
         if self._stencil_generator is None:
@@ -128,6 +181,8 @@ class Operator(Entity):
 
 
 class Identity(Operator):
+    __slots__ = ()
+
     def __init__(self, grid, name='I'):
         from evostencils.stencils.gallery import IdentityGenerator
         super().__init__(name, grid, IdentityGenerator(grid.dimension))
@@ -137,6 +192,8 @@ class Identity(Operator):
 
 
 class ZeroOperator(Operator):
+    __slots__ = ()
+
     def __init__(self, grid, shape=None, name='0'):
         from evostencils.stencils.gallery import ZeroGenerator
         super().__init__(name, grid, ZeroGenerator(grid.dimension))
@@ -148,11 +205,28 @@ class ZeroOperator(Operator):
 
 
 class Grid:
-    def __init__(self, size, step_size, level):
+    # Grids are interned, such that equal grids on the same level are represented by the same object
+    # Grids that are not referenced anymore are removed from the table
+    __slots__ = ('_size', '_step_size', '_level', '__weakref__')
+    _instances = weakref.WeakValueDictionary()
+
+    def __new__(cls, size, step_size, level):
         assert len(size) == len(step_size), "Dimensions of the size and step size must match"
-        self._size = size
-        self._step_size = step_size
-        self._level = level
+        size = tuple(size)
+        step_size = tuple(step_size)
+        key = cls, size, step_size, level
+        instance = Grid._instances.get(key)
+        if instance is None:
+            instance = super().__new__(cls)
+            instance._size = size
+            instance._step_size = step_size
+            instance._level = level
+            Grid._instances[key] = instance
+        return instance
+
+    def __reduce__(self):
+        # Unpickled grids are interned as well
+        return type(self), (self.size, self.step_size, self.level)
 
     @property
     def size(self):
@@ -174,11 +248,17 @@ class Grid:
         if isinstance(other, Grid):
             return self.size == other.size and self.step_size == other.step_size
 
+    def __hash__(self):
+        # Consistent with the equality, which ignores the level
+        return hash((self.size, self.step_size))
+
     def __repr__(self):
         return f'Grid({repr(self.size)}, {repr(self.step_size)}'
 
 
 class Approximation(Entity):
+    __slots__ = ('_grid',)
+
     def __init__(self, name, grid):
         import operator
         self._name = name
@@ -211,6 +291,7 @@ class Approximation(Entity):
 
 
 class RightHandSide(Approximation):
+    __slots__ = ()
 
     def __eq__(self, other):
         if isinstance(other, RightHandSide):
@@ -226,6 +307,7 @@ class RightHandSide(Approximation):
 
 
 class ZeroApproximation(Approximation):
+    __slots__ = ()
 
     def generate_stencil(self):
         return constant.get_null_stencil(self)
@@ -239,6 +321,9 @@ class ZeroApproximation(Approximation):
 
 # Unary Expressions
 class Diagonal(UnaryExpression):
+    __slots__ = ()
+
+    @memoize_stencil
     def generate_stencil(self):
         return periodic.diagonal(self.operand.generate_stencil())
 
@@ -250,6 +335,9 @@ class Diagonal(UnaryExpression):
 
 
 class LowerTriangle(UnaryExpression):
+    __slots__ = ()
+
+    @memoize_stencil
     def generate_stencil(self):
         return periodic.lower(self.operand.generate_stencil())
 
@@ -261,6 +349,9 @@ class LowerTriangle(UnaryExpression):
 
 
 class UpperTriangle(UnaryExpression):
+    __slots__ = ()
+
+    @memoize_stencil
     def generate_stencil(self):
         return periodic.upper(self.operand.generate_stencil())
 
@@ -272,10 +363,13 @@ class UpperTriangle(UnaryExpression):
 
 
 class BlockDiagonal(UnaryExpression):
+    __slots__ = ('_block_size',)
+
     def __init__(self, operand, block_size):
         self._block_size = block_size
         super().__init__(operand)
 
+    @memoize_stencil
     def generate_stencil(self):
         return periodic.block_diagonal(self.operand.generate_stencil(), self.block_size)
 
@@ -294,6 +388,9 @@ class BlockDiagonal(UnaryExpression):
 
 
 class Inverse(UnaryExpression):
+    __slots__ = ()
+
+    @memoize_stencil
     def generate_stencil(self):
         return periodic.inverse(self.operand.generate_stencil())
 
@@ -305,11 +402,14 @@ class Inverse(UnaryExpression):
 
 
 class Transpose(UnaryExpression):
+    __slots__ = ()
+
     def __init__(self, operand):
         self._operand = operand
         self._shape = (operand.shape[1], operand.shape[0])
         super().__init__(operand)
 
+    @memoize_stencil
     def generate_stencil(self):
         return periodic.transpose(self.operand.generate_stencil())
 
@@ -322,6 +422,7 @@ class Transpose(UnaryExpression):
 
 # Binary Expressions
 class Addition(BinaryExpression):
+    __slots__ = ()
 
     def __init__(self, operand1, operand2):
         # assert operand1.shape == operand2.shape, "Operand shapes are not equal"
@@ -336,6 +437,7 @@ class Addition(BinaryExpression):
     def grid(self):
         return self.operand1.grid
 
+    @memoize_stencil
     def generate_stencil(self):
         return periodic.add(self.operand1.generate_stencil(), self.operand2.generate_stencil())
 
@@ -347,6 +449,7 @@ class Addition(BinaryExpression):
 
 
 class Subtraction(BinaryExpression):
+    __slots__ = ()
 
     def __init__(self, operand1, operand2):
         # assert operand1.shape == operand2.shape, "Operand shapes are not equal"
@@ -361,6 +464,7 @@ class Subtraction(BinaryExpression):
     def grid(self):
         return self.operand1.grid
 
+    @memoize_stencil
     def generate_stencil(self):
         return periodic.sub(self.operand1.generate_stencil(), self.operand2.generate_stencil())
 
@@ -372,6 +476,7 @@ class Subtraction(BinaryExpression):
 
 
 class Multiplication(BinaryExpression):
+    __slots__ = ()
 
     def __init__(self, operand1, operand2):
         assert operand1.shape[1] == operand2.shape[0], "Operand shapes are not aligned"
@@ -384,6 +489,7 @@ class Multiplication(BinaryExpression):
     def grid(self):
         return self.operand1.grid
 
+    @memoize_stencil
     def generate_stencil(self):
         return periodic.mul(self.operand1.generate_stencil(), self.operand2.generate_stencil())
 
@@ -396,6 +502,7 @@ class Multiplication(BinaryExpression):
 
 # Scaling
 class Scaling(Expression):
+    __slots__ = ('_factor', '_operand', '_shape', '_stencil')
 
     def __init__(self, factor, operand):
         self._factor = factor
@@ -419,6 +526,7 @@ class Scaling(Expression):
     def shape(self):
         return self._shape
 
+    @memoize_stencil
     def generate_stencil(self):
         return periodic.scale(self.factor, self.operand.generate_stencil())
 
@@ -470,6 +578,7 @@ def is_quadratic(expression: Expression) -> bool:
 
 
 class InterGridOperator(Operator):
+    __slots__ = ('_fine_grid', '_coarse_grid')
 
     def __init__(self, name, grid, fine_grid, coarse_grid, stencil_generator):
         self._fine_grid = fine_grid
@@ -486,6 +595,8 @@ class InterGridOperator(Operator):
 
 
 class Restriction(InterGridOperator):
+    __slots__ = ()
+
     def __init__(self, name, fine_grid, coarse_grid, stencil_generator=None):
         super().__init__(name, coarse_grid, fine_grid, coarse_grid, stencil_generator)
         import operator
@@ -516,11 +627,15 @@ class Restriction(InterGridOperator):
 
 
 class ZeroRestriction(Restriction):
+    __slots__ = ()
+
     def __init__(self, fine_grid, coarse_grid, name='0'):
         super().__init__(name, fine_grid, coarse_grid, gallery.ZeroGenerator)
 
 
 class Prolongation(InterGridOperator):
+    __slots__ = ()
+
     def __init__(self, name, fine_grid, coarse_grid, stencil_generator=None):
         super().__init__(name, fine_grid, fine_grid, coarse_grid, stencil_generator)
         import operator
@@ -551,11 +666,15 @@ class Prolongation(InterGridOperator):
 
 
 class ZeroProlongation(Prolongation):
+    __slots__ = ()
+
     def __init__(self, fine_grid, coarse_grid, name='0'):
         super().__init__(name, fine_grid, coarse_grid, gallery.ZeroGenerator)
 
 
 class CoarseGridSolver(Entity):
+    __slots__ = ('_operator', '_expression')
+
     def __init__(self, operator, expression=None):
         self._name = "CGS"
         self._shape = operator.shape
@@ -587,6 +706,8 @@ class CoarseGridSolver(Entity):
 
 
 class Residual(Expression):
+    __slots__ = ('_operator', '_approximation', '_rhs')
+
     def __init__(self, operator, approximation, rhs):
         # assert iterate.shape == rhs.shape, "Shapes of iterate and rhs must match"
         self._operator = operator
@@ -640,6 +761,9 @@ class Residual(Expression):
 
 
 class Cycle(Expression):
+    __slots__ = ('_approximation', '_rhs', '_correction', '_relaxation_factor', '_partitioning', 'predecessor',
+                 'global_id', 'weight_obtained', 'weight_set', 'iteration_matrix')
+
     def __init__(self, approximation, rhs, correction, partitioning=part.Single, relaxation_factor=1.0, predecessor=None):
         # assert iterate.shape == correction.shape, "Shapes must match"
         # assert iterate.grid.size == correction.grid.size and iterate.grid.step_size == correction.grid.step_size, \
@@ -653,6 +777,7 @@ class Cycle(Expression):
         self.global_id = None
         self.weight_obtained = False
         self.weight_set = False
+        self.iteration_matrix = None
         super().__init__()
 
     @property
@@ -0,0 +1,191 @@
+"""
+Interned expression graph
+
+Expressions are mapped to immutable nodes, such that structurally equal subexpressions are represented by the same
+node object, which carries a precomputed structural hash.
+Results of analyses are stored in side tables of the expression table that are keyed by the unique id of a node.
+As the ids are never reused, results can be shared safely between all individuals of a population.
+"""
+import itertools
+from collections import OrderedDict
+from evostencils.expressions import base, system
+from evostencils.expressions.krylov_subspace import KrylovSubspaceMethod
+from evostencils.stencils import periodic
+
+# Ids are unique across all tables
+_identifiers = itertools.count()
+
+
+class Node:
+    __slots__ = ('_identifier', '_kind', '_attributes', '_children', '_hash')
+
+    def __init__(self, kind: type, attributes: tuple, children: tuple):
+        object.__setattr__(self, '_identifier', next(_identifiers))
+        object.__setattr__(self, '_kind', kind)
+        object.__setattr__(self, '_attributes', attributes)
+        object.__setattr__(self, '_children', children)
+        # The hash of each child is precomputed as well, such that hashing does not descend into the graph
+        object.__setattr__(self, '_hash', hash((kind, attributes, children)))
+
+    def __setattr__(self, key, value):
+        raise AttributeError("Nodes are immutable")
+
+    def __hash__(self):
+        return self._hash
+
+    # Structurally equal nodes are identical, such that the default comparison by identity is sufficient
+
+    @property
+    def id(self):
+        return self._identifier
+
+    @property
+    def kind(self):
+        return self._kind
+
+    @property
+    def attributes(self):
+        return self._attributes
+
+    @property
+    def children(self):
+        return self._children
+
+    def __repr__(self):
+        return f'Node({self.kind.__name__}, {repr(self.attributes)}, {[child.id for child in self.children]})'
+
+
+def grid_key(grid: base.Grid):
+    return grid.size, grid.step_size
+
+
+def stencil_key(stencil):
+    if stencil is None:
+        return None
+    if isinstance(stencil, periodic.Stencil):
+        def recursive_descent(array, dimension):
+            if dimension == 1:
+                return tuple(element.entries for element in array)
+            else:
+                return tuple(recursive_descent(element, dimension - 1) for element in array)
+        return 'periodic', recursive_descent(stencil.constant_stencils, stencil.dimension)
+    return 'constant', stencil.entries
+
+
+class ExpressionTable:
+    """
+    Table of interned nodes together with side tables for the results of their analysis
+    """
+    def __init__(self, maximum_number_of_nodes=None):
+        # Nodes are ordered by their last use, such that the least recently used node is evicted first
+        self._nodes = OrderedDict()
+        self._maximum_number_of_nodes = maximum_number_of_nodes
+        # Side tables are ordered by insertion, such that their owners can evict the oldest results
+        self._lfa_symbols = OrderedDict()
+        self._runtimes = OrderedDict()
+
+    @property
+    def maximum_number_of_nodes(self):
+        return self._maximum_number_of_nodes
+
+    @property
+    def number_of_nodes(self):
+        return len(self._nodes)
+
+    @property
+    def lfa_symbols(self):
+        return self._lfa_symbols
+
+    @property
+    def runtimes(self):
+        return self._runtimes
+
+    def clear(self):
+        # Nodes that are still referenced elsewhere remain valid, but are not shared with new nodes anymore
+        self._nodes.clear()
+        self._lfa_symbols.clear()
+        self._runtimes.clear()
+
+    def make_node(self, kind: type, attributes: tuple, children: tuple):
+        # Returns None if the node can not be interned
+        if any(child is None for child in children):
+            return None
+        key = kind, attributes, children
+        try:
+            node = self._nodes.get(key)
+        except TypeError:
+            # Unhashable attributes
+            return None
+        if node is None:
+            if self._maximum_number_of_nodes is not None and len(self._nodes) >= self._maximum_number_of_nodes:
+                self.evict()
+            node = Node(kind, attributes, children)
+            self._nodes[key] = node
+        else:
+            self._nodes.move_to_end(key)
+        return node
+
+    def evict(self):
+        # Structurally equal expressions are mapped to a new node afterwards, such that its results are not reachable
+        _, node = self._nodes.popitem(last=False)
+        self._lfa_symbols.pop(node.id, None)
+        self._runtimes.pop(node.id, None)
+
+    def intern(self, expression: base.Expression, memo: dict = None):
+        # Returns the node of the expression or None if the expression type is not supported
+        # The memo maps the id of each visited expression to the expression and its node
+        if memo is None:
+            memo = {}
+        identifier = id(expression)
+        if identifier in memo:
+            return memo[identifier][1]
+
+        def intern_all(expressions):
+            return tuple(self.intern(e, memo) for e in expressions)
+
+        kind = type(expression)
+        if isinstance(expression, base.Cycle):
+            partitioning_type = expression.partitioning
+            attributes = (expression.relaxation_factor,
+                          getattr(partitioning_type, '__name__', type(partitioning_type).__name__))
+            node = self.make_node(kind, attributes,
+                                  intern_all((expression.approximation, expression.rhs, expression.correction)))
+        elif isinstance(expression, base.Residual):
+            node = self.make_node(kind, (),
+                                  intern_all((expression.operator, expression.approximation, expression.rhs)))
+        elif isinstance(expression, base.BinaryExpression):
+            node = self.make_node(kind, (), intern_all((expression.operand1, expression.operand2)))
+        elif isinstance(expression, base.Scaling):
+            node = self.make_node(kind, (expression.factor,), intern_all((expression.operand,)))
+        elif isinstance(expression, base.BlockDiagonal):
+            node = self.make_node(kind, (expression.block_size,), intern_all((expression.operand,)))
+        elif isinstance(expression, base.UnaryExpression):
+            node = self.make_node(kind, (), intern_all((expression.operand,)))
+        elif isinstance(expression, base.CoarseGridSolver):
+            children = (expression.operator,)
+            if expression.expression is not None:
+                children += (expression.expression,)
+            node = self.make_node(kind, (), intern_all(children))
+        elif isinstance(expression, KrylovSubspaceMethod):
+            node = self.make_node(kind, (expression.name, expression.number_of_iterations),
+                                  intern_all((expression.operator,)))
+        elif isinstance(expression, system.Operator):
+            # The entries are stored row by row
+            attributes = (expression.name, len(expression.entries))
+            node = self.make_node(kind, attributes, intern_all(entry for row in expression.entries for entry in row))
+        elif isinstance(expression, base.InterGridOperator):
+            attributes = (expression.name, grid_key(expression.fine_grid), grid_key(expression.coarse_grid),
+                          stencil_key(expression.generate_stencil()))
+            node = self.make_node(kind, attributes, ())
+        elif isinstance(expression, base.Operator):
+            attributes = (expression.name, grid_key(expression.grid), stencil_key(expression.generate_stencil()))
+            node = self.make_node(kind, attributes, ())
+        elif isinstance(expression, system.Approximation):
+            node = self.make_node(kind, (expression.name,), intern_all(expression.entries))
+        elif isinstance(expression, base.Approximation):
+            node = self.make_node(kind, (expression.name, grid_key(expression.grid)), ())
+        else:
+            node = None
+        # Keep a reference to the expression, such that its id is not reused while the memo is alive
+        memo[identifier] = expression, node
+        return node
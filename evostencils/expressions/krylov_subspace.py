@@ -2,6 +2,8 @@ from evostencils.expressions.base import Entity
 
 
 class KrylovSubspaceMethod(Entity):
+    __slots__ = ('_operator', '_number_of_iterations')
+
     def __init__(self, name, operator, number_of_iterations):
         self._name = name
         self._shape = operator.shape
@@ -3,6 +3,7 @@ from typing import List, Tuple
 
 
 class Operator(base.Entity):
+    __slots__ = ('_entries',)
 
     def __init__(self, name, entries):
         self._name = name
@@ -26,12 +27,16 @@ class Operator(base.Entity):
 
 
 class ZeroOperator(Operator):
+    __slots__ = ()
+
     def __init__(self, grid: [base.Grid], name='0'):
         entries = [[base.ZeroOperator(g) for g in grid] for _ in grid]
         super().__init__(name, entries)
 
 
 class Identity(Operator):
+    __slots__ = ()
+
     def __init__(self, grid: [base.Grid], name='I'):
         entries = []
         for i, _ in enumerate(grid):
@@ -45,6 +50,7 @@ class Identity(Operator):
 
 
 class Approximation(base.Entity):
+    __slots__ = ('_entries',)
 
     def __init__(self, name, entries):
         self._name = name
@@ -72,15 +78,19 @@ class Approximation(base.Entity):
 
 
 class RightHandSide(Approximation):
-    pass
+    __slots__ = ()
 
 
 class ZeroApproximation(Approximation):
+    __slots__ = ()
+
     def __init__(self, grid: [base.Grid], name='0'):
         super().__init__(name, [base.ZeroApproximation(g) for g in grid])
 
 
 class InterGridOperator(Operator):
+    __slots__ = ()
+
     def __init__(self, name, list_of_intergrid_operators, ZeroOperatorType):
         entries = [[intergrid_operator if i == j else ZeroOperatorType(intergrid_operator.fine_grid, intergrid_operator.coarse_grid)
                     for j in range(len(list_of_intergrid_operators))]for i, intergrid_operator in enumerate(list_of_intergrid_operators)]
@@ -88,21 +98,25 @@ class InterGridOperator(Operator):
 
 
 class Restriction(InterGridOperator):
+    __slots__ = ()
+
     def __init__(self, name, list_of_intergrid_operators):
         super().__init__(name, list_of_intergrid_operators, base.ZeroRestriction)
 
 
 class Prolongation(InterGridOperator):
+    __slots__ = ()
+
     def __init__(self, name, list_of_intergrid_operators):
         super().__init__(name, list_of_intergrid_operators, base.ZeroProlongation)
 
 
 class Diagonal(base.UnaryExpression):
-    pass
+    __slots__ = ()
 
 
 class ElementwiseDiagonal(base.UnaryExpression):
-    pass
+    __slots__ = ()
 
 
 def get_coarse_grid(grid: [base.Grid], coarsening_factors: List[Tuple[int, ...]]):
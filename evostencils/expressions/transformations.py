@@ -45,6 +45,7 @@ def invalidate_expression(expression: base.Expression):
     if expression is not None:
         expression.lfa_symbol = None
         expression.valid = False
+        base.invalidate_stencil(expression)
         expression.mutate(invalidate_expression)
 
 
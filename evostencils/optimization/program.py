@@ -7,11 +7,15 @@ from evostencils.initialization import multigrid as multigrid_initialization
 from evostencils.expressions import base, transformations, system, reference_cycles
 from evostencils.genetic_programming import genGrow, mutNodeReplacement, mutInsert, select_unique_best
 import evostencils.optimization.relaxation_factors as relaxation_factor_optimization
+from evostencils.optimization.surrogate import SurrogateModel
 from evostencils.types import level_control
 import math, numpy
 import numpy as np
 import time
 import itertools
+import multiprocessing
+import multiprocessing.util
+import queue
 
 
 class suppress_output(object):
@@ -50,11 +54,46 @@ def load_checkpoint_from_file(filename):
         return pickle.load(file)
 
 
+# Optimizer instance inherited by the forked evaluation workers
+_evaluation_worker_optimizer = None
+
+
+def acquire_worker_id(worker_counter):
+    # Workers that replace a dead worker obtain a new id instead of blocking on ids that are never returned,
+    # such that they also build into their own output directory
+    with worker_counter.get_lock():
+        worker_id = worker_counter.value
+        worker_counter.value += 1
+    return worker_id
+
+
+def _initialize_evaluation_worker(worker_counter):
+    optimizer = _evaluation_worker_optimizer
+    worker_id = acquire_worker_id(worker_counter)
+    optimizer._program_generator = optimizer.program_generator.create_worker(worker_id)
+    # Pool workers do not run atexit handlers, but finalizers on a regular shutdown of the pool
+    multiprocessing.util.Finalize(None, optimizer.program_generator.shutdown_compiler_server, exitpriority=10)
+
+
+def _evaluate_in_worker(arguments):
+    optimizer = _evaluation_worker_optimizer
+    individual, evaluation_time_limit = arguments
+    optimizer.program_generator.evaluation_time_limit = evaluation_time_limit
+    failed_evaluations = optimizer._failed_evaluations
+    terminated_evaluations = optimizer.program_generator.terminated_evaluations
+    values = optimizer._toolbox.evaluate(individual)
+    # The fitness of a terminated run depends on the current time limit and must not be cached
+    terminated = optimizer.program_generator.terminated_evaluations > terminated_evaluations
+    return values, optimizer._failed_evaluations - failed_evaluations, terminated
+
+
 class Optimizer:
     def __init__(self, dimension, finest_grid, coarsening_factor, min_level, max_level, equations, operators, fields,
                  program_generator, convergence_evaluator=None, performance_evaluator=None,
                  mpi_comm=None, mpi_rank=0, number_of_mpi_processes=1,
-                 epsilon=1e-12, infinity=1e300, checkpoint_directory_path='./'):
+                 epsilon=1e-12, infinity=1e300, checkpoint_directory_path='./', number_of_evaluation_workers=1,
+                 early_termination_factor=None, prescreening_margin=None, surrogate_fraction=None,
+                 convergence_objective='spectral_radius'):
         assert program_generator is not None, "At least a program generator must be available"
         self._dimension = dimension
         self._finest_grid = finest_grid
@@ -87,17 +126,39 @@ class Optimizer:
         self._individual_cache_size = 100000
         self._individual_cache_hits = 0
         self._individual_cache_misses = 0
+        # Estimated fitnesses are kept separately, such that they never replace a measured one
+        self._estimate_cache = {}
         self._timeout_counter_limit = 10000
+        self._number_of_evaluation_workers = number_of_evaluation_workers
+        self._evaluation_pool = None
+        self._early_termination_factor = early_termination_factor
+        self._prescreening_margin = prescreening_margin
+        self._estimated_front = []
+        self._required_convergence = 0.9
+        # Name of an LFA metric or function that combines the metrics of an expression to a convergence factor
+        self._convergence_objective = convergence_objective
+        if isinstance(convergence_objective, str) and convergence_evaluator is not None \
+                and convergence_objective not in convergence_evaluator.metrics:
+            convergence_evaluator.set_metrics(convergence_evaluator.metrics + (convergence_objective,))
+        # Fraction of the offspring that is evaluated when ranked by the surrogate model
+        self._surrogate_fraction = surrogate_fraction
+        self._surrogate = None
+        if surrogate_fraction is not None:
+            self._surrogate = SurrogateModel()
 
     @staticmethod
     def _init_creator():
         creator.create("MultiObjectiveFitness", deap.base.Fitness, weights=(-1.0, -1.0))
-        creator.create("MultiObjectiveIndividual", gp.PrimitiveTree, fitness=creator.MultiObjectiveFitness)
+        # Individuals whose fitness is only estimated are marked with fitness_estimated
+        creator.create("MultiObjectiveIndividual", gp.PrimitiveTree, fitness=creator.MultiObjectiveFitness,
+                       fitness_estimated=False)
         creator.create("SingleObjectiveFitness", deap.base.Fitness, weights=(-1.0,))
-        creator.create("SingleObjectiveIndividual", gp.PrimitiveTree, fitness=creator.SingleObjectiveFitness)
+        creator.create("SingleObjectiveIndividual", gp.PrimitiveTree, fitness=creator.SingleObjectiveFitness,
+                       fitness_estimated=False)
 
     def _init_toolbox(self, pset):
         self._toolbox = deap.base.Toolbox()
+        self._toolbox.register("map", self.map)
         self._toolbox.register("expression", genGrow, pset=pset, min_height=0, max_height=50)
         self._toolbox.register("mate", gp.cxOnePoint)
 
@@ -131,6 +192,12 @@ class Optimizer:
         if len(self.individual_cache) < self._individual_cache_size:
             self.individual_cache[str(individual)] = values
 
+    def add_measurement(self, individual, values):
+        # Only measured fitnesses are used to train the surrogate model
+        self.add_individual_to_cache(individual, values)
+        if self._surrogate is not None:
+            self._surrogate.add_sample(individual, values)
+
     def individual_in_cache(self, individual):
         tmp = str(individual) in self.individual_cache
         if tmp:
@@ -142,6 +209,19 @@ class Optimizer:
     def get_cached_fitness(self, individual):
         return self.individual_cache[str(individual)]
 
+    @property
+    def estimate_cache(self):
+        return self._estimate_cache
+
+    def add_estimate_to_cache(self, individual, values):
+        if len(self.estimate_cache) < self._individual_cache_size:
+            self.estimate_cache[str(individual)] = values
+
+    @staticmethod
+    def discard_estimated(individuals):
+        # Estimated fitnesses are not comparable to measured ones and must not enter the selection or hall of fame
+        return [individual for individual in individuals if not individual.fitness_estimated]
+
     @property
     def dimension(self):
         return self._dimension
@@ -293,6 +373,190 @@ class Optimizer:
             print(f"Emigration of individuals failed on process with rank {self.mpi_rank}")
             return False
 
+    @property
+    def number_of_evaluation_workers(self):
+        return self._number_of_evaluation_workers
+
+    def start_evaluation_pool(self):
+        # Must be called after the evaluation function has been registered,
+        # because the workers inherit the toolbox and program generator when they are forked
+        global _evaluation_worker_optimizer
+        _evaluation_worker_optimizer = self
+        context = multiprocessing.get_context('fork')
+        worker_counter = context.Value('i', 0)
+        self._evaluation_pool = context.Pool(self.number_of_evaluation_workers,
+                                             initializer=_initialize_evaluation_worker, initargs=(worker_counter,))
+
+    def stop_evaluation_pool(self):
+        if self._evaluation_pool is not None:
+            self._evaluation_pool.close()
+            self._evaluation_pool.join()
+            self._evaluation_pool = None
+
+    @property
+    def prescreening_margin(self):
+        return self._prescreening_margin
+
+    def map(self, function, individuals):
+        if function is not self._toolbox.evaluate:
+            return list(map(function, individuals))
+        individuals = list(individuals)
+        # All individuals are assigned a new fitness, which is only marked again if it is estimated
+        for individual in individuals:
+            individual.fitness_estimated = False
+        if not self.prescreening_enabled() and self.surrogate is None:
+            return self.map_evaluate(individuals)
+        fitnesses = [None] * len(individuals)
+        indices = list(range(len(individuals)))
+        if self.prescreening_enabled():
+            indices = self.prescreen(individuals, fitnesses)
+        if self.surrogate is not None:
+            indices = self.select_by_surrogate(individuals, indices, fitnesses)
+        results = self.map_evaluate([individuals[i] for i in indices])
+        for i, values in zip(indices, results):
+            fitnesses[i] = values
+        return fitnesses
+
+    def prescreening_enabled(self):
+        return self.prescreening_margin is not None and self.convergence_evaluator is not None \
+            and self.performance_evaluator is not None and hasattr(self._toolbox, 'estimate_batch')
+
+    def estimate_fitnesses(self, individuals):
+        # Estimates are not counted as evaluations
+        return self._toolbox.estimate_batch(individuals, count_evaluations=False)
+
+    def dominates_with_margin(self, values1, values2):
+        # Minimization of all objectives is assumed
+        factor = 1 + self.prescreening_margin
+        return all(a * factor <= b for a, b in zip(values1, values2)) and \
+            any(a * factor < b for a, b in zip(values1, values2))
+
+    def prescreen(self, individuals, fitnesses):
+        # Returns the indices of the individuals that need to be evaluated
+        # All other individuals are assigned their estimated fitness, which is marked with fitness_estimated
+        indices = []
+        candidate_indices = []
+        for i, individual in enumerate(individuals):
+            if str(individual) in self.individual_cache:
+                indices.append(i)
+            else:
+                candidate_indices.append(i)
+        estimates = self.estimate_fitnesses([individuals[i] for i in candidate_indices])
+        candidates = list(zip(candidate_indices, estimates))
+        for j, (i, values) in enumerate(candidates):
+            reference = self._estimated_front + estimates[:j] + estimates[j+1:]
+            if any(self.dominates_with_margin(other, values) for other in reference):
+                individuals[i].fitness_estimated = True
+                fitnesses[i] = values
+            else:
+                individuals[i].fitness_estimated = False
+                indices.append(i)
+                self._estimated_front.append(values)
+        self._estimated_front = [values for values in self._estimated_front
+                                 if not any(self.dominates_with_margin(other, values) for other in self._estimated_front)]
+        indices.sort()
+        return indices
+
+    @property
+    def surrogate(self):
+        return self._surrogate
+
+    def select_by_surrogate(self, individuals, indices, fitnesses):
+        # Returns the subset of indices that should be evaluated
+        # The remaining individuals are assigned the predicted fitness, which is marked with fitness_estimated
+        candidates = [i for i in indices if str(individuals[i]) not in self.individual_cache]
+        predictions = self.surrogate.predict([individuals[i] for i in candidates])
+        if predictions is None:
+            return indices
+        weights = individuals[candidates[0]].fitness.weights if len(candidates) > 0 else ()
+        # Rank by the number of dominating candidates first and by the sum of the normalized predictions second
+        scores = []
+        for prediction in predictions:
+            signed_prediction = [-w * v for w, v in zip(weights, prediction)]
+            number_of_dominating_predictions = 0
+            for other in predictions:
+                signed_other = [-w * v for w, v in zip(weights, other)]
+                if all(a <= b for a, b in zip(signed_other, signed_prediction)) and \
+                        any(a < b for a, b in zip(signed_other, signed_prediction)):
+                    number_of_dominating_predictions += 1
+            scores.append((number_of_dominating_predictions,
+                           sum(-w * math.log(v) for w, v in zip(weights, prediction))))
+        order = sorted(range(len(candidates)), key=lambda j: scores[j])
+        number_of_evaluations = max(1, math.ceil(self._surrogate_fraction * len(candidates)))
+        selected = set(candidates[j] for j in order[:number_of_evaluations])
+        for j in order[number_of_evaluations:]:
+            i = candidates[j]
+            individuals[i].fitness_estimated = True
+            fitnesses[i] = predictions[j]
+        return [i for i in indices if i in selected or i not in candidates]
+
+    def map_evaluate(self, individuals):
+        if self.number_of_evaluation_workers <= 1:
+            return list(map(self._toolbox.evaluate, individuals))
+        if self._evaluation_pool is None:
+            self.start_evaluation_pool()
+        individuals = list(individuals)
+        fitnesses = [None] * len(individuals)
+        pending = {}
+        for i, individual in enumerate(individuals):
+            self._total_number_of_evaluations += 1
+            if self.individual_in_cache(individual):
+                fitnesses[i] = self.get_cached_fitness(individual)
+            else:
+                key = str(individual)
+                if key not in pending:
+                    pending[key] = (individual, [])
+                pending[key][1].append(i)
+        evaluation_time_limit = self.program_generator.evaluation_time_limit
+        results = self._evaluation_pool.map(_evaluate_in_worker,
+                                            [(individual, evaluation_time_limit) for individual, _ in pending.values()],
+                                            chunksize=1)
+        for (individual, indices), (values, failed_evaluations, terminated) in zip(pending.values(), results):
+            self._failed_evaluations += failed_evaluations
+            if not terminated:
+                self.add_measurement(individual, values)
+            for i in indices:
+                fitnesses[i] = values
+        return fitnesses
+
+    def update_evaluation_time_limit(self, hof):
+        # Candidates whose time to solution exceeds the worst member of the front by the given factor are terminated
+        # Only effective if the program generator evaluates in streaming mode
+        if self._early_termination_factor is None:
+            return
+        times = []
+        for individual in hof:
+            values = individual.fitness.values
+            if len(values) == 1:
+                time_to_solution = values[0]
+            else:
+                # The objectives are the convergence factor and the time per iteration
+                convergence_factor, time_per_iteration = values
+                if not 0.0 < convergence_factor < 1.0:
+                    continue
+                time_to_solution = math.log(self.epsilon) / math.log(convergence_factor) * time_per_iteration
+            # Exclude penalized individuals
+            if time_to_solution < math.sqrt(self.infinity):
+                times.append(time_to_solution)
+        if len(times) > 0:
+            self.program_generator.evaluation_time_limit = self._early_termination_factor * max(times)
+        else:
+            self.program_generator.evaluation_time_limit = None
+
+    def update_decision_thresholds(self, hof):
+        # The spectral radius only needs to be estimated accurately close to the required convergence,
+        # the divergence threshold and the convergence factors on the current front
+        if self.convergence_evaluator is None or not self.convergence_evaluator.adaptive_resolution:
+            return
+        thresholds = [self._required_convergence, 1.0]
+        # The first objective is only a convergence factor in the multi-objective case
+        convergence_factors = [values[0] for values in [individual.fitness.values for individual in hof]
+                               + self._estimated_front if len(values) == 2 and 0.0 < values[0] < 1.0]
+        # Only the best and the worst factor on the front are used, such that the number of thresholds is bounded
+        if len(convergence_factors) > 0:
+            thresholds += [min(convergence_factors), max(convergence_factors)]
+        self.convergence_evaluator.set_decision_thresholds(thresholds)
+
     def reset_evaluation_counters(self):
         self._failed_evaluations = 0
         self._total_number_of_evaluations = 0
@@ -303,67 +567,96 @@ class Optimizer:
     def compile_individual(self, individual, pset):
         return gp.compile(individual, pset)
 
-    def estimate_single_objective(self, individual, pset):
-        self._total_number_of_evaluations += 1
-        if self.individual_in_cache(individual):
-            return self.get_cached_fitness(individual)
-        with suppress_output():
-            try:
-                expression1, expression2 = self.compile_individual(individual, pset)
-            except MemoryError:
-                self._failed_evaluations += 1
-                values = self.infinity,
-                self.add_individual_to_cache(individual, values)
-                return values
+    def compile_for_estimation(self, individuals, pset, results, number_of_objectives, count_evaluations=True):
+        # Returns the expressions of all individuals that are neither cached nor failed to compile
+        expressions = []
+        indices = []
+        for i, individual in enumerate(individuals):
+            if count_evaluations and number_of_objectives == 1:
+                self._total_number_of_evaluations += 1
+            key = str(individual)
+            if key in self.estimate_cache:
+                results[i] = self.estimate_cache[key]
+                continue
+            if count_evaluations and number_of_objectives > 1:
+                self._total_number_of_evaluations += 1
+            with suppress_output():
+                try:
+                    expression1, expression2 = self.compile_individual(individual, pset)
+                except MemoryError:
+                    if count_evaluations:
+                        self._failed_evaluations += 1
+                    results[i] = (self.infinity,) * number_of_objectives
+                    self.add_estimate_to_cache(individual, results[i])
+                    continue
+            expressions.append(expression1)
+            indices.append(i)
+        return expressions, indices
 
-        expression = expression1
-        with suppress_output():
-            spectral_radius = self.convergence_evaluator.compute_spectral_radius(expression)
+    @property
+    def convergence_objective(self):
+        return self._convergence_objective
 
-        if spectral_radius == 0.0 or math.isnan(spectral_radius) \
-                or math.isinf(spectral_radius) or numpy.isinf(spectral_radius) or numpy.isnan(spectral_radius):
-            values = self.infinity,
-            self.add_individual_to_cache(individual, values)
-            return values
-        else:
-            if spectral_radius < 1:
-                runtime = self.performance_evaluator.estimate_runtime(expression) * 1e3
+    def estimate_convergence_factors(self, expressions):
+        # All metrics of an expression are obtained from a single LFA evaluation
+        metrics = self.convergence_evaluator.compute_convergence_metrics(expressions)
+        if callable(self.convergence_objective):
+            return [self.convergence_objective(m) for m in metrics]
+        return [m[self.convergence_objective] for m in metrics]
+
+    @staticmethod
+    def is_invalid_spectral_radius(spectral_radius):
+        return spectral_radius == 0.0 or math.isnan(spectral_radius) \
+            or math.isinf(spectral_radius) or numpy.isinf(spectral_radius) or numpy.isnan(spectral_radius)
+
+    def estimate_single_objective_batch(self, individuals, pset, count_evaluations=True):
+        # All spectral radii and runtimes are computed with a single batch call
+        results = [None] * len(individuals)
+        expressions, indices = self.compile_for_estimation(individuals, pset, results, 1, count_evaluations)
+        with suppress_output():
+            spectral_radii = self.estimate_convergence_factors(expressions)
+        convergent = [j for j, spectral_radius in enumerate(spectral_radii)
+                      if not self.is_invalid_spectral_radius(spectral_radius) and spectral_radius < 1]
+        runtimes = self.performance_evaluator.estimate_runtimes([expressions[j] for j in convergent])
+        runtimes = dict(zip(convergent, runtimes))
+        for j, (i, spectral_radius) in enumerate(zip(indices, spectral_radii)):
+            if self.is_invalid_spectral_radius(spectral_radius):
+                values = self.infinity,
+            elif spectral_radius < 1:
+                runtime = runtimes[j] * 1e3
                 values = math.log(self.epsilon) / math.log(spectral_radius) * runtime,
-                self.add_individual_to_cache(individual, values)
-                return values
             else:
                 values = spectral_radius * math.sqrt(self.infinity),
-                self.add_individual_to_cache(individual, values)
-                return values
+            self.add_estimate_to_cache(individuals[i], values)
+            results[i] = values
+        return results
 
-    def estimate_multiple_objectives(self, individual, pset):
-        if self.individual_in_cache(individual):
-            return self.get_cached_fitness(individual)
-        self._total_number_of_evaluations += 1
-        with suppress_output():
-            try:
-                expression1, expression2 = self.compile_individual(individual, pset)
-            except MemoryError:
-                self._failed_evaluations += 1
-                values = self.infinity, self.infinity
-                self.add_individual_to_cache(individual, values)
-                return values
+    def estimate_single_objective(self, individual, pset):
+        return self.estimate_single_objective_batch([individual], pset)[0]
 
-        expression = expression1
+    def estimate_multiple_objectives_batch(self, individuals, pset, count_evaluations=True):
+        # All spectral radii and runtimes are computed with a single batch call
+        results = [None] * len(individuals)
+        expressions, indices = self.compile_for_estimation(individuals, pset, results, 2, count_evaluations)
         with suppress_output():
-            spectral_radius = self.convergence_evaluator.compute_spectral_radius(expression)
+            spectral_radii = self.estimate_convergence_factors(expressions)
+        valid = [j for j, spectral_radius in enumerate(spectral_radii)
+                 if not self.is_invalid_spectral_radius(spectral_radius)]
+        runtimes = self.performance_evaluator.estimate_runtimes([expressions[j] for j in valid])
+        runtimes = dict(zip(valid, runtimes))
+        for j, (i, spectral_radius) in enumerate(zip(indices, spectral_radii)):
+            if self.is_invalid_spectral_radius(spectral_radius):
+                if count_evaluations:
+                    self._failed_evaluations += 1
+                values = self.infinity, self.infinity
+            else:
+                values = spectral_radius, runtimes[j] * 1e3
+            self.add_estimate_to_cache(individuals[i], values)
+            results[i] = values
+        return results
 
-        if spectral_radius == 0.0 or math.isnan(spectral_radius) \
-                or math.isinf(spectral_radius) or numpy.isinf(spectral_radius) or numpy.isnan(spectral_radius):
-            self._failed_evaluations += 1
-            values = self.infinity, self.infinity
-            self.add_individual_to_cache(individual, values)
-            return values
-        else:
-            runtime = self.performance_evaluator.estimate_runtime(expression) * 1e3
-            values = spectral_radius, runtime
-            self.add_individual_to_cache(individual, values)
-            return values
+    def estimate_multiple_objectives(self, individual, pset):
+        return self.estimate_multiple_objectives_batch([individual], pset)[0]
 
     def evaluate_single_objective(self, individual, pset, storages, min_level, max_level, solver_program):
         self._total_number_of_evaluations += 1
@@ -375,16 +668,21 @@ class Optimizer:
             except MemoryError:
                 self._failed_evaluations += 1
                 values = self.infinity,
-                self.add_individual_to_cache(individual, values)
+                self.add_measurement(individual, values)
                 return values
             expression = expression1
+            terminated_evaluations = self._program_generator.terminated_evaluations
             time, convergence_factor, number_of_iterations = self._program_generator.generate_and_evaluate(expression, storages, min_level, max_level,
                     solver_program, infinity=self.infinity,
                     number_of_samples=5)
+            if self._program_generator.terminated_evaluations > terminated_evaluations:
+                # Terminated runs count as failed, but are not cached because they depend on the current time limit
+                self._failed_evaluations += 1
+                return self.infinity,
             fitness = time,
             if number_of_iterations >= 100 or convergence_factor > 1:
                 fitness = convergence_factor * math.sqrt(self.infinity),
-            self.add_individual_to_cache(individual, fitness)
+            self.add_measurement(individual, fitness)
             return fitness
 
     def evaluate_multiple_objectives(self, individual, pset, storages, min_level, max_level, solver_program):
@@ -397,16 +695,21 @@ class Optimizer:
             except MemoryError:
                 self._failed_evaluations += 1
                 values = self.infinity, self.infinity
-                self.add_individual_to_cache(individual, values)
+                self.add_measurement(individual, values)
                 return values
             expression = expression1
+            terminated_evaluations = self._program_generator.terminated_evaluations
             time, convergence_factor, iterations = \
                 self._program_generator.generate_and_evaluate(expression, storages, min_level, max_level, solver_program,
                                                               infinity=self.infinity,
                                                               number_of_samples=5)
+            if self._program_generator.terminated_evaluations > terminated_evaluations:
+                # Terminated runs count as failed, but are not cached because they depend on the current time limit
+                self._failed_evaluations += 1
+                return self.infinity, self.infinity
 
             values = convergence_factor, time / iterations
-            self.add_individual_to_cache(individual, values)
+            self.add_measurement(individual, values)
             return values
 
     def multi_objective_random_search(self, pset, initial_population_size, generations, mu_, lambda_,
@@ -418,6 +721,8 @@ class Optimizer:
         self._init_multi_objective_toolbox(pset)
         self._toolbox.register("select", tools.selNSGA2, nd='standard')
         # self._toolbox.register('evaluate', self.estimate_multiple_objectives, pset=pset)
+        self._toolbox.register('estimate', self.estimate_multiple_objectives, pset=pset)
+        self._toolbox.register('estimate_batch', self.estimate_multiple_objectives_batch, pset=pset)
         self._toolbox.register('evaluate', self.evaluate_multiple_objectives, pset=pset,
                                storages=storages, min_level=min_level, max_level=max_level,
                                solver_program=program)
@@ -461,7 +766,8 @@ class Optimizer:
         invalid_ind = [ind for ind in population]
         toolbox = self._toolbox
         self.reset_evaluation_counters()
-        fitnesses = toolbox.map(toolbox.evaluate, invalid_ind)
+        # The initial population is always measured, such that it provides a reliable reference for pre-screening
+        fitnesses = self.map_evaluate(invalid_ind)
         for ind, fit in zip(invalid_ind, fitnesses):
             ind.fitness.values = fit
         hof.update(population)
@@ -477,9 +783,12 @@ class Optimizer:
             offspring = self._toolbox.population(n=lambda_)
             # Evaluate the individuals with an invalid fitness
             invalid_ind = [ind for ind in offspring if not ind.fitness.valid]
+            self.update_evaluation_time_limit(hof)
+            self.update_decision_thresholds(hof)
             fitnesses = toolbox.map(toolbox.evaluate, invalid_ind)
             for ind, fit in zip(invalid_ind, fitnesses):
                 ind.fitness.values = fit
+            offspring = self.discard_estimated(offspring)
             hof.update(offspring)
             if gen % checkpoint_frequency == 0:
                 if solver is not None:
@@ -501,10 +810,8 @@ class Optimizer:
 
         return population, logbook, hof
 
-    def ea_mu_plus_lambda(self, initial_population_size, generations, mu_, lambda_,
-                          crossover_probability, mutation_probability, min_level, max_level,
-                          program, solver, logbooks, checkpoint_frequency, checkpoint, mstats, hof):
-
+    def initialize_evolution(self, initial_population_size, mu_, lambda_, logbooks, checkpoint, mstats, hof):
+        # Returns the evaluated initial population, the logbook and the generation to start with
         mstats.register("avg", np.mean)
         mstats.register("std", np.std)
         mstats.register("min", np.min)
@@ -524,7 +831,6 @@ class Optimizer:
         else:
             population = self._toolbox.population(n=initial_population_size)
             min_generation = 0
-        max_generation = generations
 
         if use_checkpoint:
             logbook = logbooks[-1]
@@ -536,7 +842,8 @@ class Optimizer:
         invalid_ind = [ind for ind in population]
         toolbox = self._toolbox
         self.reset_evaluation_counters()
-        fitnesses = toolbox.map(toolbox.evaluate, invalid_ind)
+        # The initial population is always measured, such that it provides a reliable reference for pre-screening
+        fitnesses = self.map_evaluate(invalid_ind)
         for ind, fit in zip(invalid_ind, fitnesses):
             ind.fitness.values = fit
         successful_evaluations = self._total_number_of_evaluations - self._failed_evaluations
@@ -546,37 +853,87 @@ class Optimizer:
         self.reset_evaluation_counters()
         population = toolbox.select(population, max(lambda_, successful_evaluations - successful_evaluations % 4))
         hof.update(population)
+        self.record_generation(logbook, min_generation, len(invalid_ind), population, mstats)
+        return population, logbook, min_generation
+
+    def record_generation(self, logbook, gen, number_of_evaluations, population, mstats):
         record = mstats.compile(population) if mstats is not None else {}
-        logbook.record(gen=min_generation, nevals=len(invalid_ind), **record)
+        logbook.record(gen=gen, nevals=number_of_evaluations, **record)
         if self.is_root():
             print(logbook.stream, flush=True)
-        # Begin the generational process
-        immigration_interval = 5
-        receive_request_left_neighbor = None
-        receive_request_right_neighbor = None
-        if self.number_of_mpi_processes > 1:
-            receive_request_left_neighbor, receive_request_right_neighbor = self.mpi_receive_from_neighbors()
-        for gen in range(min_generation + 1, max_generation + 1):
-            if gen % immigration_interval == 0 and self.number_of_mpi_processes > 1:
-                if self.is_root():
-                    print("Exchanging colonies", flush=True)
 
-                send_request_left_neighbor, send_request_right_neighbor = \
-                    self.mpi_send_to_neighbors(population[:len(population)//2])
+    def dump_checkpoint(self, min_level, max_level, gen, program, solver, population, logbooks, logbook):
+        if solver is not None:
+            transformations.invalidate_expression(solver)
+        logbooks[-1] = logbook
+        checkpoint = CheckPoint(min_level, max_level, gen, program, solver, population, logbooks)
+        try:
+            if not os.path.exists(self._checkpoint_directory_path):
+                os.makedirs(self._checkpoint_directory_path)
+            checkpoint.dump_to_file(f'{self._checkpoint_directory_path}/checkpoint.p')
+        except (pickle.PickleError, TypeError, FileNotFoundError) as e:
+            print(e, flush=True)
+            print(f'Skipping checkpoint on process with rank {self.mpi_rank}', flush=True)
+
+    def start_migration(self):
+        # Returns the receive requests for the immigrants from both neighbors
+        if self.number_of_mpi_processes > 1:
+            return self.mpi_receive_from_neighbors()
+        return None, None
+
+    def exchange_colonies(self, population, receive_requests):
+        # Sends half of the population to both neighbors and returns the population extended by the immigrants
+        receive_request_left_neighbor, receive_request_right_neighbor = receive_requests
+        send_request_left_neighbor, send_request_right_neighbor = \
+            self.mpi_send_to_neighbors(population[:len(population) // 2])
+
+        self.mpi_wait_for_send_request(send_request_left_neighbor)
+        left_neighbor_population = self.mpi_wait_for_receive_request(receive_request_left_neighbor)
+        if left_neighbor_population is not None:
+            population.extend(left_neighbor_population)
+
+        self.mpi_wait_for_send_request(send_request_right_neighbor)
+        right_neighbor_population = self.mpi_wait_for_receive_request(receive_request_right_neighbor)
+        if right_neighbor_population is not None:
+            population.extend(right_neighbor_population)
+        return population
+
+    def migrate(self, population, receive_requests, mu_):
+        # Returns the selected population and the receive requests for the next migration
+        if self.is_root():
+            print("Exchanging colonies", flush=True)
+        population = self.exchange_colonies(population, receive_requests)
+        receive_requests = self.mpi_receive_from_neighbors()
+        population = self._toolbox.select(population, mu_)
+        self.mpi_comm.barrier()
+        return population, receive_requests
 
-                self.mpi_wait_for_send_request(send_request_left_neighbor)
-                left_neighbor_population = self.mpi_wait_for_receive_request(receive_request_left_neighbor)
-                if left_neighbor_population is not None:
-                    population.extend(left_neighbor_population)
+    def finish_migration(self, population, receive_requests):
+        if self.is_root():
+            print("Exchanging colonies", flush=True)
 
-                self.mpi_wait_for_send_request(send_request_right_neighbor)
-                right_neighbor_population = self.mpi_wait_for_receive_request(receive_request_right_neighbor)
-                if right_neighbor_population is not None:
-                    population.extend(right_neighbor_population)
+        if self.number_of_mpi_processes > 1:
+            population = self.exchange_colonies(population, receive_requests)
+            self.mpi_comm.barrier()
+            number_of_immigrants = max(10, 2 * len(population) // self.number_of_mpi_processes)
+            colonies = self.mpi_comm.allgather(population[:number_of_immigrants])
+            immigrants = list(itertools.chain.from_iterable(colonies))
+            population.extend(immigrants)
+        return population
 
-                receive_request_left_neighbor, receive_request_right_neighbor = self.mpi_receive_from_neighbors()
-                population = toolbox.select(population, mu_)
-                self.mpi_comm.barrier()
+    def ea_mu_plus_lambda(self, initial_population_size, generations, mu_, lambda_,
+                          crossover_probability, mutation_probability, min_level, max_level,
+                          program, solver, logbooks, checkpoint_frequency, checkpoint, mstats, hof):
+        population, logbook, min_generation = \
+            self.initialize_evolution(initial_population_size, mu_, lambda_, logbooks, checkpoint, mstats, hof)
+        max_generation = generations
+        toolbox = self._toolbox
+        # Begin the generational process
+        immigration_interval = 5
+        receive_requests = self.start_migration()
+        for gen in range(min_generation + 1, max_generation + 1):
+            if gen % immigration_interval == 0 and self.number_of_mpi_processes > 1:
+                population, receive_requests = self.migrate(population, receive_requests, mu_)
             # Vary the population
             selected = toolbox.select_for_mating(population, lambda_)
             parents = [toolbox.clone(ind) for ind in selected]
@@ -592,57 +949,132 @@ class Optimizer:
                     child1 = ind1
                     child2 = ind2
                 del child1.fitness.values, child2.fitness.values
+                child1.fitness_estimated = child2.fitness_estimated = False
                 offspring.append(child1)
                 offspring.append(child2)
 
             # Evaluate the individuals with an invalid fitness
             invalid_ind = [ind for ind in offspring if not ind.fitness.valid]
+            self.update_evaluation_time_limit(hof)
+            self.update_decision_thresholds(hof)
             fitnesses = toolbox.map(toolbox.evaluate, invalid_ind)
             for ind, fit in zip(invalid_ind, fitnesses):
                 ind.fitness.values = fit
+            offspring = self.discard_estimated(offspring)
             hof.update(offspring)
 
             if gen % checkpoint_frequency == 0:
-                if solver is not None:
-                    transformations.invalidate_expression(solver)
-                logbooks[-1] = logbook
-                checkpoint = CheckPoint(min_level, max_level, gen, program, solver, population, logbooks)
-                try:
-                    if not os.path.exists(self._checkpoint_directory_path):
-                        os.makedirs(self._checkpoint_directory_path)
-                    checkpoint.dump_to_file(f'{self._checkpoint_directory_path}/checkpoint.p')
-                except (pickle.PickleError, TypeError, FileNotFoundError) as e:
-                    print(e, flush=True)
-                    print(f'Skipping checkpoint on process with rank {self.mpi_rank}', flush=True)
+                self.dump_checkpoint(min_level, max_level, gen, program, solver, population, logbooks, logbook)
             # Select the next generation population
             population = toolbox.select(population + offspring, mu_)
-            record = mstats.compile(population)
             # Update the statistics with the new population
-            logbook.record(gen=gen, nevals=len(invalid_ind), **record)
-            if self.is_root():
-                print(logbook.stream, flush=True)
-        if self.is_root():
-            print("Exchanging colonies", flush=True)
+            self.record_generation(logbook, gen, len(invalid_ind), population, mstats)
+        population = self.finish_migration(population, receive_requests)
 
-        if self.number_of_mpi_processes > 1:
-            send_request_left_neighbor, send_request_right_neighbor = \
-                self.mpi_send_to_neighbors(population[:len(population) // 2])
+        hof.update(population)
+        if self.is_root():
+            print("Optimization finished", flush=True)
 
-            self.mpi_wait_for_send_request(send_request_left_neighbor)
-            left_neighbor_population = self.mpi_wait_for_receive_request(receive_request_left_neighbor)
-            if left_neighbor_population is not None:
-                population.extend(left_neighbor_population)
+        return population, logbook, hof
 
-            self.mpi_wait_for_send_request(send_request_right_neighbor)
-            right_neighbor_population = self.mpi_wait_for_receive_request(receive_request_right_neighbor)
-            if right_neighbor_population is not None:
-                population.extend(right_neighbor_population)
+    def generate_offspring(self, population, crossover_probability, mutation_probability):
+        selected = self._toolbox.select_for_mating(population, 4)[:2]
+        ind1, ind2 = [self._toolbox.clone(ind) for ind in selected]
+        operator_choice = random.random()
+        if operator_choice < crossover_probability:
+            child1, child2 = self._toolbox.mate(ind1, ind2)
+        elif operator_choice < crossover_probability + mutation_probability + self.epsilon:
+            child1, = self._toolbox.mutate(ind1)
+            child2, = self._toolbox.mutate(ind2)
+        else:
+            child1 = ind1
+            child2 = ind2
+        del child1.fitness.values, child2.fitness.values
+        child1.fitness_estimated = child2.fitness_estimated = False
+        return [child1, child2]
+
+    def submit_evaluation(self, individual, results: queue.Queue):
+        # Puts the individual, its fitness, the number of failed evaluations and whether the fitness
+        # still needs to be recorded as measurement into the results queue
+        # The evaluation is performed asynchronously if multiple evaluation workers are available
+        individual.fitness_estimated = False
+        if self.prescreening_enabled():
+            fitnesses = [None]
+            if len(self.prescreen([individual], fitnesses)) == 0:
+                results.put((individual, fitnesses[0], 0, False))
+                return
+        if self.number_of_evaluation_workers <= 1:
+            results.put((individual, self._toolbox.evaluate(individual), 0, False))
+            return
+        if self._evaluation_pool is None:
+            self.start_evaluation_pool()
+        self._total_number_of_evaluations += 1
+        if self.individual_in_cache(individual):
+            results.put((individual, self.get_cached_fitness(individual), 0, False))
+            return
+
+        def callback(result):
+            values, failed_evaluations, terminated = result
+            results.put((individual, values, failed_evaluations, not terminated))
+
+        def error_callback(_):
+            values = tuple(self.infinity for _ in individual.fitness.weights)
+            results.put((individual, values, 1, False))
+
+        arguments = individual, self.program_generator.evaluation_time_limit
+        self._evaluation_pool.apply_async(_evaluate_in_worker, (arguments,),
+                                          callback=callback, error_callback=error_callback)
+
+    def ea_steady_state(self, initial_population_size, generations, mu_, lambda_,
+                        crossover_probability, mutation_probability, min_level, max_level,
+                        program, solver, logbooks, checkpoint_frequency, checkpoint, mstats, hof):
+        population, logbook, min_generation = \
+            self.initialize_evolution(initial_population_size, mu_, lambda_, logbooks, checkpoint, mstats, hof)
+        max_generation = generations
+        toolbox = self._toolbox
 
-            self.mpi_comm.barrier()
-            number_of_immigrants = max(10, 2 * len(population) // self.number_of_mpi_processes)
-            colonies = self.mpi_comm.allgather(population[:number_of_immigrants])
-            immigrants = list(itertools.chain.from_iterable(colonies))
-            population.extend(immigrants)
+        # Survivor selection is performed whenever an evaluation finishes, such that no evaluation slot is idle
+        # A generation corresponds to lambda_ finished evaluations, such that the budget equals the generational variant
+        immigration_interval = 5
+        receive_requests = self.start_migration()
+        number_of_slots = max(self.number_of_evaluation_workers, 1)
+        results = queue.Queue()
+        offspring = []
+        number_of_remaining_evaluations = (max_generation - min_generation) * lambda_
+        number_of_pending_evaluations = 0
+        number_of_finished_evaluations = 0
+        gen = min_generation
+        self.update_evaluation_time_limit(hof)
+        self.update_decision_thresholds(hof)
+        while number_of_remaining_evaluations > 0 or number_of_pending_evaluations > 0:
+            while number_of_pending_evaluations < number_of_slots and number_of_remaining_evaluations > 0:
+                if len(offspring) == 0:
+                    offspring = self.generate_offspring(population, crossover_probability, mutation_probability)
+                self.submit_evaluation(offspring.pop(), results)
+                number_of_pending_evaluations += 1
+                number_of_remaining_evaluations -= 1
+            individual, values, failed_evaluations, measured_in_worker = results.get()
+            number_of_pending_evaluations -= 1
+            number_of_finished_evaluations += 1
+            self._failed_evaluations += failed_evaluations
+            if measured_in_worker:
+                self.add_measurement(individual, values)
+            individual.fitness.values = values
+            if not individual.fitness_estimated:
+                hof.update([individual])
+                population = toolbox.select(population + [individual], mu_)
+            if number_of_finished_evaluations % lambda_ == 0:
+                gen += 1
+                # The limits are only adapted once per generation
+                self.update_evaluation_time_limit(hof)
+                self.update_decision_thresholds(hof)
+                if gen % checkpoint_frequency == 0:
+                    self.dump_checkpoint(min_level, max_level, gen, program, solver, population, logbooks, logbook)
+                self.record_generation(logbook, gen, lambda_, population, mstats)
+                # All processes finish the same number of evaluations per generation
+                if gen % immigration_interval == 0 and self.number_of_mpi_processes > 1:
+                    population, receive_requests = self.migrate(population, receive_requests, mu_)
+        population = self.finish_migration(population, receive_requests)
 
         hof.update(population)
         if self.is_root():
@@ -652,13 +1084,15 @@ class Optimizer:
 
     def SOGP(self, pset, initial_population_size, generations, mu_, lambda_,
              crossover_probability, mutation_probability, min_level, max_level,
-             program, storages, solver, logbooks, checkpoint_frequency=2, checkpoint=None):
+             program, storages, solver, logbooks, checkpoint_frequency=2, checkpoint=None, steady_state=False):
         if self.is_root():
             print("Running Single-Objective Genetic Programming", flush=True)
         self._init_single_objective_toolbox(pset)
         self._toolbox.register("select", select_unique_best)
         self._toolbox.register("select_for_mating", tools.selTournament, tournsize=4)
         # self._toolbox.register('evaluate', self.estimate_single_objective, pset=pset)
+        self._toolbox.register('estimate', self.estimate_single_objective, pset=pset)
+        self._toolbox.register('estimate_batch', self.estimate_single_objective_batch, pset=pset)
         self._toolbox.register('evaluate', self.evaluate_single_objective, pset=pset,
                                storages=storages, min_level=min_level, max_level=max_level, solver_program=program)
 
@@ -667,19 +1101,25 @@ class Optimizer:
         mstats = tools.MultiStatistics(fitness=stats_fit, size=stats_size)
 
         hof = tools.HallOfFame(100, similar=lambda a, b: a.fitness == b.fitness)
-        return self.ea_mu_plus_lambda(initial_population_size, generations, mu_, lambda_,
-                                      crossover_probability, mutation_probability, min_level, max_level,
-                                      program, solver, logbooks, checkpoint_frequency, checkpoint, mstats, hof)
+        if steady_state:
+            algorithm = self.ea_steady_state
+        else:
+            algorithm = self.ea_mu_plus_lambda
+        return algorithm(initial_population_size, generations, mu_, lambda_,
+                         crossover_probability, mutation_probability, min_level, max_level,
+                         program, solver, logbooks, checkpoint_frequency, checkpoint, mstats, hof)
 
     def NSGAII(self, pset, initial_population_size, generations, mu_, lambda_,
                crossover_probability, mutation_probability, min_level, max_level,
-               program, storages, solver, logbooks, checkpoint_frequency=2, checkpoint=None):
+               program, storages, solver, logbooks, checkpoint_frequency=2, checkpoint=None, steady_state=False):
         if self.is_root():
             print("Running NSGA-II Genetic Programming", flush=True)
         self._init_multi_objective_toolbox(pset)
         self._toolbox.register("select", tools.selNSGA2, nd='standard')
         self._toolbox.register("select_for_mating", tools.selTournamentDCD)
         # self._toolbox.register('evaluate', self.estimate_multiple_objectives, pset=pset)
+        self._toolbox.register('estimate', self.estimate_multiple_objectives, pset=pset)
+        self._toolbox.register('estimate_batch', self.estimate_multiple_objectives_batch, pset=pset)
         self._toolbox.register('evaluate', self.evaluate_multiple_objectives, pset=pset,
                                storages=storages, min_level=min_level, max_level=max_level,
                                solver_program=program)
@@ -691,13 +1131,17 @@ class Optimizer:
 
         hof = tools.ParetoFront(similar=lambda a, b: a.fitness == b.fitness)
 
-        return self.ea_mu_plus_lambda(initial_population_size, generations, mu_, lambda_,
-                                      crossover_probability, mutation_probability, min_level, max_level,
-                                      program, solver, logbooks, checkpoint_frequency, checkpoint, mstats, hof)
+        if steady_state:
+            algorithm = self.ea_steady_state
+        else:
+            algorithm = self.ea_mu_plus_lambda
+        return algorithm(initial_population_size, generations, mu_, lambda_,
+                         crossover_probability, mutation_probability, min_level, max_level,
+                         program, solver, logbooks, checkpoint_frequency, checkpoint, mstats, hof)
 
     def NSGAIII(self, pset, initial_population_size, generations, mu_, lambda_,
                 crossover_probability, mutation_probability, min_level, max_level,
-                program, storages, solver, logbooks, checkpoint_frequency=2, checkpoint=None):
+                program, storages, solver, logbooks, checkpoint_frequency=2, checkpoint=None, steady_state=False):
         if self.is_root():
             print("Running NSGA-III Genetic Programming", flush=True)
         self._init_multi_objective_toolbox(pset)
@@ -707,6 +1151,8 @@ class Optimizer:
         self._toolbox.register("select", tools.selNSGA3WithMemory(reference_points, nd='standard'))
         self._toolbox.register("select_for_mating", tools.selRandom)
         # self._toolbox.register('evaluate', self.estimate_multiple_objectives, pset=pset)
+        self._toolbox.register('estimate', self.estimate_multiple_objectives, pset=pset)
+        self._toolbox.register('estimate_batch', self.estimate_multiple_objectives_batch, pset=pset)
         self._toolbox.register('evaluate', self.evaluate_multiple_objectives, pset=pset,
                                storages=storages, min_level=min_level, max_level=max_level,
                                solver_program=program)
@@ -718,9 +1164,13 @@ class Optimizer:
 
         hof = tools.ParetoFront(similar=lambda a, b: a.fitness == b.fitness)
 
-        return self.ea_mu_plus_lambda(initial_population_size, generations, mu_, lambda_,
-                                      crossover_probability, mutation_probability, min_level, max_level,
-                                      program, solver, logbooks, checkpoint_frequency, checkpoint, mstats, hof)
+        if steady_state:
+            algorithm = self.ea_steady_state
+        else:
+            algorithm = self.ea_mu_plus_lambda
+        return algorithm(initial_population_size, generations, mu_, lambda_,
+                         crossover_probability, mutation_probability, min_level, max_level,
+                         program, solver, logbooks, checkpoint_frequency, checkpoint, mstats, hof)
 
     def evolutionary_optimization(self, levels_per_run=2, gp_mu=100, gp_lambda=100, gp_generations=100,
                                   gp_crossover_probability=0.5, gp_mutation_probability=0.5, es_generations=200,
@@ -728,7 +1178,7 @@ class Optimizer:
                                   restart_from_checkpoint=False, maximum_block_size=8, optimization_method=None,
                                   krylov_subspace_methods=('ConjugateGradient', 'BiCGStab', 'MinRes',
                                                            'ConjugateResidual'),
-                                  minimum_solver_iterations=8, maximum_solver_iterations=1024):
+                                  minimum_solver_iterations=8, maximum_solver_iterations=1024, steady_state=False):
         assert minimum_solver_iterations < maximum_solver_iterations, 'Invalid range of solver iterations'
 
         levels = self.max_level - self.min_level
@@ -774,7 +1224,7 @@ class Optimizer:
                     continue
             approximation = approximations[i]
 
-            self._convergence_evaluator.reinitialize_lfa_grids(approximation.grid)
+            self._convergence_evaluator.reinitialize_lfa_grids(approximation.grid, max_level - min_level + 1)
             if i > 0:
                 self.performance_evaluator.set_runtime_of_coarse_grid_solver(0.0)
 
@@ -807,20 +1257,37 @@ class Optimizer:
             if optimization_method is None:
                 optimization_method = self.NSGAIII
             self.clear_individual_cache()
-            pop, log, hof = optimization_method(pset, initial_population_size, gp_generations, gp_mu, gp_lambda,
-                                                gp_crossover_probability, gp_mutation_probability,
-                                                min_level, max_level, solver_program, storages, best_expression, logbooks,
-                                                checkpoint_frequency=2, checkpoint=tmp)
+            self._estimate_cache.clear()
+            self._estimated_front = []
+            self._required_convergence = required_convergence
+            self.update_decision_thresholds([])
+            if self.surrogate is not None:
+                self.surrogate.clear()
+            kwargs = {}
+            if steady_state:
+                # Only supported by SOGP, NSGAII and NSGAIII
+                kwargs['steady_state'] = True
+            try:
+                pop, log, hof = optimization_method(pset, initial_population_size, gp_generations, gp_mu, gp_lambda,
+                                                    gp_crossover_probability, gp_mutation_probability,
+                                                    min_level, max_level, solver_program, storages, best_expression,
+                                                    logbooks, checkpoint_frequency=2, checkpoint=tmp, **kwargs)
+            finally:
+                self.stop_evaluation_pool()
+                # The final evaluation of the front must not be terminated early
+                self.program_generator.evaluation_time_limit = None
 
             pops.append(pop)
             best_time = self.infinity
             best_convergence_factor = self.infinity
             self.program_generator.initialize_code_generation(self.min_level, self.max_level, iteration_limit=100)
             try:
+                expressions = [self.compile_individual(hof[j], pset)[0] for j in range(0, min(len(hof), 100))]
+                estimated_convergence_factors = self.convergence_evaluator.compute_spectral_radii(expressions)
                 for j in range(0, min(len(hof), 100)):
                     individual = hof[j]
-                    expression = self.compile_individual(individual, pset)[0]
-                    estimated_convergence_factor = self.convergence_evaluator.compute_spectral_radius(expression)
+                    expression = expressions[j]
+                    estimated_convergence_factor = estimated_convergence_factors[j]
                     if not estimated_convergence_factor < 0.9:
                         continue
                     time, convergence_factor, number_of_iterations = \
@@ -870,6 +1337,7 @@ class Optimizer:
                                                                             max_level, self.max_level)
             solver_program += cycle_function
 
+        self.program_generator.shutdown_compiler_server()
         self.mpi_comm.barrier()
         return solver_program, pops, logbooks
 
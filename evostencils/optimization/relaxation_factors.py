@@ -83,14 +83,14 @@ class Optimizer:
 
     def optimize(self, expression: base.Expression, problem_size, generations, storages, evaluation_time):
 
+        program_generator = self._gp_optimizer.program_generator
+
         def evaluate(weights):
-            program_generator = self._gp_optimizer.program_generator
+            # The weights are passed at runtime, such that the executable does not need to be rebuilt
             output_path = program_generator._output_path_generated
-            program_generator.generate_global_weight_initializations(output_path, weights)
-            program_generator.run_c_compiler(output_path)
+            environment = program_generator.generate_weight_environment(weights)
             runtime, convergence_factor, _ = program_generator.evaluate(output_path, infinity=self._gp_optimizer.infinity,
-                                                                        number_of_samples=1)
-            program_generator.restore_global_initializations(output_path)
+                                                                        number_of_samples=1, environment=environment)
             return convergence_factor,
         self._toolbox.register("evaluate", evaluate)
         lambda_ = int(round((4 + 3 * log(problem_size)) * 2))
@@ -109,7 +109,16 @@ class Optimizer:
         if generator.run_exastencils_compiler(knowledge_path=generator.knowledge_path_generated,
                                               settings_path=generator.settings_path_generated) != 0:
             raise RuntimeError("Could not initialize code generator for relaxation factor optimization")
-        _, logbook = algorithms.eaGenerateUpdate(self._toolbox, ngen=generations, halloffame=hof, verbose=False, stats=stats)
+        output_path = generator._output_path_generated
+        generator.generate_runtime_weight_initializations(output_path, problem_size)
+        if generator.run_c_compiler(output_path) != 0:
+            generator.restore_global_initializations(output_path)
+            raise RuntimeError("Could not compile program for relaxation factor optimization")
+        try:
+            _, logbook = algorithms.eaGenerateUpdate(self._toolbox, ngen=generations, halloffame=hof, verbose=False,
+                                                     stats=stats)
+        finally:
+            generator.restore_global_initializations(output_path)
         if self._gp_optimizer.is_root():
             print(logbook, flush=True)
         return hof[0]
@@ -0,0 +1,124 @@
+import math
+import re
+import numpy as np
+from deap import gp
+
+
+class SurrogateModel:
+    """
+    Online ridge regression model that predicts the objectives of an individual from features of its tree
+    """
+    def __init__(self, regularization=1e-2, minimum_number_of_samples=32, maximum_number_of_samples=10000):
+        self._regularization = regularization
+        self._minimum_number_of_samples = minimum_number_of_samples
+        self._maximum_number_of_samples = maximum_number_of_samples
+        self._samples = {}
+        self._feature_names = []
+        self._weights = None
+        self._mean = None
+        self._scale = None
+        self._number_of_objectives = None
+        self._outdated = True
+
+    @property
+    def regularization(self):
+        return self._regularization
+
+    @property
+    def minimum_number_of_samples(self):
+        return self._minimum_number_of_samples
+
+    @property
+    def number_of_samples(self):
+        return len(self._samples)
+
+    @property
+    def trained(self):
+        return self.number_of_samples >= self.minimum_number_of_samples
+
+    @staticmethod
+    def extract_features(individual) -> dict:
+        features = {'size': len(individual), 'height': individual.height}
+        relaxation_factors = []
+        for node in individual:
+            if isinstance(node, gp.Primitive):
+                # Primitive names are suffixed with the level
+                match = re.fullmatch(r'(.*)_(\d+)', node.name)
+                if match is not None:
+                    name, level = match.group(1), match.group(2)
+                    features[f'level_{level}'] = features.get(f'level_{level}', 0) + 1
+                else:
+                    name = node.name
+                features[name] = features.get(name, 0) + 1
+            elif isinstance(node.value, float):
+                relaxation_factors.append(node.value)
+            elif isinstance(node.value, int):
+                features['krylov_iterations'] = features.get('krylov_iterations', 0) + math.log2(node.value)
+            elif isinstance(node.value, tuple):
+                # Number of unknowns in all blocks
+                number_of_terms = 0
+                for block_size in node.value:
+                    number_of_terms += math.prod(block_size)
+                features['block_size'] = features.get('block_size', 0) + number_of_terms
+            else:
+                name = re.sub(r'_\d+$', '', str(node.value))
+                features[name] = features.get(name, 0) + 1
+        if len(relaxation_factors) > 0:
+            features['relaxation_factor_mean'] = sum(relaxation_factors) / len(relaxation_factors)
+            features['relaxation_factor_max'] = max(relaxation_factors)
+        return features
+
+    def add_sample(self, individual, values: tuple):
+        # Penalized or failed evaluations are not representative for the objectives
+        if any(math.isinf(v) or math.isnan(v) or v <= 0 or v >= 1e100 for v in values):
+            return
+        if self._number_of_objectives is None:
+            self._number_of_objectives = len(values)
+        elif self._number_of_objectives != len(values):
+            return
+        if len(self._samples) >= self._maximum_number_of_samples:
+            # Forget the oldest sample
+            del self._samples[next(iter(self._samples))]
+        self._samples[str(individual)] = (self.extract_features(individual), values)
+        self._outdated = True
+
+    def clear(self):
+        self._samples.clear()
+        self._feature_names = []
+        self._weights = None
+        self._number_of_objectives = None
+        self._outdated = True
+
+    def _to_matrix(self, features_list):
+        matrix = np.zeros((len(features_list), len(self._feature_names)))
+        for i, features in enumerate(features_list):
+            for j, name in enumerate(self._feature_names):
+                matrix[i, j] = features.get(name, 0)
+        return matrix
+
+    def fit(self):
+        feature_names = set()
+        for features, _ in self._samples.values():
+            feature_names.update(features.keys())
+        self._feature_names = sorted(feature_names)
+        x = self._to_matrix([features for features, _ in self._samples.values()])
+        # Fit the logarithm of the objectives, as they vary over several orders of magnitude
+        y = np.log(np.array([values for _, values in self._samples.values()]))
+        self._mean = x.mean(axis=0)
+        self._scale = x.std(axis=0)
+        self._scale[self._scale == 0] = 1
+        x = np.hstack([np.ones((x.shape[0], 1)), (x - self._mean) / self._scale])
+        regularization = self.regularization * np.eye(x.shape[1])
+        # The intercept is not regularized
+        regularization[0, 0] = 0
+        self._weights = np.linalg.solve(x.T @ x + regularization, x.T @ y)
+        self._outdated = False
+
+    def predict(self, individuals) -> list:
+        if not self.trained:
+            return None
+        if self._outdated:
+            self.fit()
+        x = self._to_matrix([self.extract_features(individual) for individual in individuals])
+        x = np.hstack([np.ones((x.shape[0], 1)), (x - self._mean) / self._scale])
+        return [tuple(float(v) for v in row) for row in np.exp(x @ self._weights)]
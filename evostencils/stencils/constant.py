@@ -2,11 +2,26 @@ class Stencil:
     def __init__(self, entries, dimension=None):
         self._dimension = dimension
         self._entries = tuple(entries)
+        self._index = None
 
     @property
     def entries(self):
         return self._entries
 
+    @property
+    def index(self):
+        # Maps each offset to its coefficient, the order of the entries is preserved
+        # The coefficients of duplicate offsets are summed up
+        if self._index is None:
+            self._index = {}
+            for offset, value in self._entries:
+                offset = tuple(offset)
+                if offset in self._index:
+                    self._index[offset] = self._index[offset] + value
+                else:
+                    self._index[offset] = value
+        return self._index
+
     @property
     def dimension(self):
         if self._dimension is None:
@@ -54,17 +69,14 @@ def filter_stencil(stencil, predicate):
 def combine(stencil1, stencil2, f):
     if stencil1 is None or stencil2 is None:
         return None
-    new_entries = list(stencil1.entries)
-    for entry2 in stencil2.entries:
-        added = False
-        for i, new_entry in enumerate(new_entries):
-            if new_entry[0] == entry2[0]:
-                new_entries[i] = (entry2[0], f(new_entry[1], entry2[1]))
-                added = True
-                break
-        if not added:
-            new_entries.append(entry2)
-    return Stencil(new_entries)
+    new_entries = dict(stencil1.index)
+    for offset, value in stencil2.entries:
+        offset = tuple(offset)
+        if offset in new_entries:
+            new_entries[offset] = f(new_entries[offset], value)
+        else:
+            new_entries[offset] = value
+    return Stencil(new_entries.items())
 
 
 def diagonal(stencil):
@@ -121,20 +133,16 @@ def mul(stencil1, stencil2):
     if stencil1 is None or stencil2 is None:
         return None
     from operator import add as builtin_add
-    new_entries = []
+    new_entries = {}
     for offset2, value2 in stencil2.entries:
         for offset1, value1 in stencil1.entries:
-            added = False
             offset = tuple(map(builtin_add, offset1, offset2))
             value = value1 * value2
-            for i, new_entry in enumerate(new_entries):
-                if offset == new_entry[0]:
-                    new_entries[i] = (offset, new_entry[1] + value)
-                    added = True
-                    break
-            if not added:
-                new_entries.append((offset, value))
-    return Stencil(new_entries)
+            if offset in new_entries:
+                new_entries[offset] = new_entries[offset] + value
+            else:
+                new_entries[offset] = value
+    return Stencil(new_entries.items())
 
 
 def get_unit_stencil(grid) -> Stencil:
@@ -0,0 +1,170 @@
+"""
+Dense representation of periodic stencils
+
+The coefficients of all constant stencils within a period are stored in a single array of shape
+period + (number of offsets,) together with a mask that marks the entries that are present
+and a table of offsets that is shared by all positions.
+Operations are vectorized over the period and only loop over the offsets.
+The conversion from and to periodic stencils is provided by the periodic module.
+"""
+import numpy as np
+
+
+class DenseStencil:
+    def __init__(self, coefficients: np.ndarray, mask: np.ndarray, offsets: tuple):
+        assert coefficients.shape == mask.shape, "Shapes of the coefficients and the mask must match"
+        assert coefficients.shape[-1] == len(offsets), "Number of offsets must match"
+        self._coefficients = coefficients
+        self._mask = mask
+        self._offsets = tuple(offsets)
+
+    @property
+    def coefficients(self):
+        return self._coefficients
+
+    @property
+    def mask(self):
+        return self._mask
+
+    @property
+    def offsets(self):
+        return self._offsets
+
+    @property
+    def period(self):
+        return self._coefficients.shape[:-1]
+
+    @property
+    def dimension(self):
+        return len(self.period)
+
+
+def _to_array(values):
+    try:
+        return np.array(values, dtype=float)
+    except (TypeError, ValueError):
+        # Symbolic coefficients
+        return np.array(values, dtype=object)
+
+
+def from_entries(period: tuple, entries: list):
+    # Expects the entries of the constant stencils at all positions of the period in lexicographic order
+    offset_indices = {}
+    for position_entries in entries:
+        for offset, _ in position_entries:
+            offset_indices.setdefault(tuple(offset), len(offset_indices))
+    number_of_offsets = max(len(offset_indices), 1)
+    values = [[0.0] * number_of_offsets for _ in entries]
+    # The mask is filled as a list and converted once, as indexing numpy arrays element by element is slow
+    mask = [[False] * number_of_offsets for _ in entries]
+    for position_values, position_mask, position_entries in zip(values, mask, entries):
+        for offset, value in position_entries:
+            k = offset_indices[tuple(offset)]
+            # The coefficients of duplicate offsets are summed up, as in constant.Stencil.index
+            if position_mask[k]:
+                position_values[k] = position_values[k] + value
+            else:
+                position_values[k] = value
+                position_mask[k] = True
+    mask = np.array(mask, dtype=bool).reshape(len(entries), number_of_offsets)
+    offsets = tuple(offset_indices.keys())
+    if len(offsets) == 0:
+        offsets = ((0,) * len(period),)
+    coefficients = _to_array(values).reshape(tuple(period) + (number_of_offsets,))
+    return DenseStencil(coefficients, mask.reshape(tuple(period) + (number_of_offsets,)), offsets)
+
+
+def to_entries(stencil: DenseStencil):
+    # Returns the entries at all positions of the period in lexicographic order
+    coefficients = stencil.coefficients.reshape(-1, len(stencil.offsets)).tolist()
+    mask = stencil.mask.reshape(-1, len(stencil.offsets)).tolist()
+    return [tuple((offset, value) for offset, value, present in zip(stencil.offsets, position_coefficients,
+                                                                      position_mask) if present)
+            for position_coefficients, position_mask in zip(coefficients, mask)]
+
+
+def expand(stencil: DenseStencil, period: tuple):
+    # Repeats the stencil periodically such that it covers the given period
+    if stencil.period == tuple(period):
+        return stencil
+    coefficients = stencil.coefficients
+    mask = stencil.mask
+    for axis, (p, q) in enumerate(zip(period, stencil.period)):
+        indices = np.arange(p) % q
+        coefficients = np.take(coefficients, indices, axis=axis)
+        mask = np.take(mask, indices, axis=axis)
+    return DenseStencil(coefficients, mask, stencil.offsets)
+
+
+def block_diagonal(stencil: DenseStencil, block_size: tuple):
+    # Equivalent to periodic.block_diagonal: Only the couplings within a block are kept
+    period = tuple(max(p, b) for p, b in zip(stencil.period, block_size))
+    stencil = expand(stencil, period)
+    offsets = np.array(stencil.offsets, dtype=int).reshape(len(stencil.offsets), stencil.dimension)
+    mask = stencil.mask.copy()
+    for axis, b in enumerate(block_size):
+        position = np.arange(period[axis]).reshape((1,) * axis + (period[axis],) + (1,) * (stencil.dimension - axis))
+        target = position + offsets[:, axis]
+        mask &= (target >= 0) & (target < b)
+    return DenseStencil(stencil.coefficients, mask, stencil.offsets)
+
+
+def _common_period(stencil1: DenseStencil, stencil2: DenseStencil):
+    period = tuple(max(p, q) for p, q in zip(stencil1.period, stencil2.period))
+    return expand(stencil1, period), expand(stencil2, period)
+
+
+def mul(stencil1: DenseStencil, stencil2: DenseStencil):
+    # Equivalent to constant.mul at each position, the products are summed up in the same order
+    stencil1, stencil2 = _common_period(stencil1, stencil2)
+    offsets = {}
+    for offset2 in stencil2.offsets:
+        for offset1 in stencil1.offsets:
+            offsets.setdefault(tuple(a + b for a, b in zip(offset1, offset2)), len(offsets))
+    dtype = np.result_type(stencil1.coefficients.dtype, stencil2.coefficients.dtype)
+    coefficients = np.zeros(stencil1.period + (len(offsets),), dtype=dtype)
+    mask = np.zeros(stencil1.period + (len(offsets),), dtype=bool)
+    for k2, offset2 in enumerate(stencil2.offsets):
+        for k1, offset1 in enumerate(stencil1.offsets):
+            k = offsets[tuple(a + b for a, b in zip(offset1, offset2))]
+            present = stencil1.mask[..., k1] & stencil2.mask[..., k2]
+            value = stencil1.coefficients[..., k1] * stencil2.coefficients[..., k2]
+            coefficients[..., k] = np.where(present & mask[..., k], coefficients[..., k] + value,
+                                            np.where(present, value, coefficients[..., k]))
+            mask[..., k] |= present
+    return DenseStencil(coefficients, mask, tuple(offsets.keys()))
+
+
+def filter_offsets(stencil: DenseStencil, predicate: callable):
+    # Removes the entries whose offset does not satisfy the predicate at all positions
+    keep = np.array([predicate(offset) for offset in stencil.offsets], dtype=bool)
+    return DenseStencil(stencil.coefficients, stencil.mask & keep, stencil.offsets)
+
+
+def diagonal(stencil: DenseStencil):
+    return filter_offsets(stencil, lambda offset: all(i == 0 for i in offset))
+
+
+def lower(stencil: DenseStencil):
+    # The first nonzero component of the offset is negative
+    return filter_offsets(stencil, lambda offset: next((i < 0 for i in offset if i != 0), False))
+
+
+def upper(stencil: DenseStencil):
+    return filter_offsets(stencil, lambda offset: next((i > 0 for i in offset if i != 0), False))
+
+
+def transpose(stencil: DenseStencil):
+    return DenseStencil(stencil.coefficients, stencil.mask, tuple(tuple(-i for i in offset)
+                                                                  for offset in stencil.offsets))
+
+
+def red_black_filters(maximal_shape: tuple):
+    # Unit stencils at the positions of the red or black blocks of the given shape and empty stencils elsewhere
+    shape = tuple(2 * n for n in maximal_shape)
+    positions = np.indices(shape)
+    blocks = sum(positions[d] // n for d, n in enumerate(maximal_shape))
+    red = (blocks % 2 == 0)[..., np.newaxis]
+    coefficients = np.ones(shape + (1,))
+    offsets = ((0,) * len(shape),)
+    return DenseStencil(coefficients, red, offsets), DenseStencil(coefficients, ~red, offsets)
@@ -1,6 +1,22 @@
 import abc
+import weakref
+from functools import lru_cache
 from evostencils.stencils import constant
 
+# Stencils of each generator indexed by the grid, such that they are generated only once
+_generated_stencils = weakref.WeakKeyDictionary()
+
+
+def generate_stencil(stencil_generator, grid):
+    try:
+        stencils = _generated_stencils.setdefault(stencil_generator, {})
+    except TypeError:
+        # Generators that can not be referenced weakly are not cached
+        return stencil_generator.generate_stencil(grid)
+    if grid not in stencils:
+        stencils[grid] = stencil_generator.generate_stencil(grid)
+    return stencils[grid]
+
 
 class StencilGenerator(abc.ABC):
 
@@ -185,17 +201,33 @@ Operator A from Stencil {
 """
 
 
+@lru_cache(maxsize=None)
+def generate_multilinear_interpolation(dimension, step_size, coarsening_factor):
+    import lfa_lab as lfa
+    from evostencils.evaluation.convergence import lfa_sparse_stencil_to_constant_stencil
+    lfa_grid = lfa.Grid(dimension, step_size)
+    lfa_interpolation = lfa.gallery.ml_interpolation_stencil(lfa_grid, lfa_grid.coarse(coarsening_factor))
+    return lfa_sparse_stencil_to_constant_stencil(lfa_interpolation)
+
+
+@lru_cache(maxsize=None)
+def generate_full_weighting_restriction(dimension, step_size, coarsening_factor):
+    import lfa_lab as lfa
+    from evostencils.evaluation.convergence import lfa_sparse_stencil_to_constant_stencil
+    lfa_grid = lfa.Grid(dimension, step_size)
+    lfa_restriction = lfa.gallery.fw_restriction_stencil(lfa_grid, lfa_grid.coarse(coarsening_factor))
+    return lfa_sparse_stencil_to_constant_stencil(lfa_restriction)
+
+
 class MultilinearInterpolationGenerator:
 
     def __init__(self, coarsening_factor):
         self.coarsening_factor = coarsening_factor
 
     def generate_stencil(self, grid):
-        import lfa_lab as lfa
-        from evostencils.evaluation.convergence import lfa_sparse_stencil_to_constant_stencil
-        lfa_grid = lfa.Grid(grid.dimension, grid.step_size)
-        lfa_interpolation = lfa.gallery.ml_interpolation_stencil(lfa_grid, lfa_grid.coarse(self.coarsening_factor))
-        return lfa_sparse_stencil_to_constant_stencil(lfa_interpolation)
+        # Shared between all generators with the same coarsening factor
+        return generate_multilinear_interpolation(grid.dimension, tuple(grid.step_size),
+                                                  tuple(self.coarsening_factor))
 
     @staticmethod
     def generate_exa3(name):
@@ -208,11 +240,9 @@ class FullWeightingRestrictionGenerator:
         self.coarsening_factor = coarsening_factor
 
     def generate_stencil(self, grid):
-        import lfa_lab as lfa
-        from evostencils.evaluation.convergence import lfa_sparse_stencil_to_constant_stencil
-        lfa_grid = lfa.Grid(grid.dimension, grid.step_size)
-        lfa_restriction = lfa.gallery.fw_restriction_stencil(lfa_grid, lfa_grid.coarse(self.coarsening_factor))
-        return lfa_sparse_stencil_to_constant_stencil(lfa_restriction)
+        # Shared between all generators with the same coarsening factor
+        return generate_full_weighting_restriction(grid.dimension, tuple(grid.step_size),
+                                                   tuple(self.coarsening_factor))
 
     @staticmethod
     def generate_exa3(name):
@@ -1,4 +1,8 @@
 import evostencils.stencils.constant as constant
+import evostencils.stencils.dense as dense
+from functools import lru_cache
+import itertools
+import math
 
 
 class Stencil:
@@ -129,20 +133,53 @@ def indexed_map_stencil(stencil, f):
     return Stencil(result, stencil.dimension)
 
 
+# Below this number of positions per period, the conversion to the dense representation does not pay off
+# Operations that touch each entry only once (add, sub, scale, inverse) are always faster element by element
+minimum_number_of_dense_positions = 64
+
+
+def apply_dense(operation: callable, *stencils):
+    # Applies the vectorized operation to the dense representation of the stencils
+    # Returns None if one of the stencils contains undefined constant stencils or if the stencils are too small
+    if any(stencil is None for stencil in stencils):
+        return None
+    if all(math.prod(determine_maximal_shape(stencil)) < minimum_number_of_dense_positions for stencil in stencils):
+        return None
+    dense_stencils = []
+    for stencil in stencils:
+        dense_stencil = to_dense(stencil)
+        if dense_stencil is None:
+            return None
+        dense_stencils.append(dense_stencil)
+    return from_dense(operation(*dense_stencils))
+
+
 def diagonal(stencil):
-    return map_stencil(stencil, constant.diagonal)
+    result = apply_dense(dense.diagonal, stencil)
+    if result is None:
+        return map_stencil(stencil, constant.diagonal)
+    return result
 
 
 def lower(stencil):
-    return map_stencil(stencil, constant.lower)
+    result = apply_dense(dense.lower, stencil)
+    if result is None:
+        return map_stencil(stencil, constant.lower)
+    return result
 
 
 def upper(stencil):
-    return map_stencil(stencil, constant.upper)
+    result = apply_dense(dense.upper, stencil)
+    if result is None:
+        return map_stencil(stencil, constant.upper)
+    return result
 
 
 def transpose(stencil):
-    return map_stencil(stencil, constant.transpose)
+    result = apply_dense(dense.transpose, stencil)
+    if result is None:
+        return map_stencil(stencil, constant.transpose)
+    return result
 
 
 def inverse(stencil):
@@ -181,7 +218,10 @@ def sub(stencil1, stencil2):
 
 
 def mul(stencil1, stencil2):
-    return combine(stencil1, stencil2, constant.mul)
+    result = apply_dense(dense.mul, stencil1, stencil2)
+    if result is None:
+        return combine(stencil1, stencil2, constant.mul)
+    return result
 
 
 def scale(factor, stencil):
@@ -201,8 +241,46 @@ def create_empty_multidimensional_array(shape):
     return result
 
 
+@convert_constant_stencils
+def to_dense(stencil):
+    # Returns None if the stencil contains undefined constant stencils
+    if stencil is None:
+        return None
+    period = tuple(determine_maximal_shape(stencil))
+    entries = []
+    for index in itertools.product(*(range(p) for p in period)):
+        element = stencil.constant_stencils
+        for i in index:
+            # Shorter periods are repeated, as in indexed_combine
+            element = element[i % len(element)]
+        if element is None:
+            return None
+        entries.append(element.entries)
+    return dense.from_entries(period, entries)
+
+
+def from_dense(stencil: dense.DenseStencil):
+    dimension = stencil.dimension
+    constant_stencils = iter(constant.Stencil(entries, dimension) for entries in dense.to_entries(stencil))
+
+    def recursive_descent(depth):
+        if depth == dimension:
+            return next(constant_stencils)
+        return tuple(recursive_descent(depth + 1) for _ in range(stencil.period[depth]))
+
+    return Stencil(recursive_descent(0), dimension)
+
+
 def block_diagonal(stencil, block_size):
     assert len(block_size) == stencil.dimension, 'Block size does not match dimension of the problem'
+    result = apply_dense(lambda s: dense.block_diagonal(s, block_size), stencil)
+    if result is None:
+        return block_diagonal_elementwise(stencil, block_size)
+    return result
+
+
+def block_diagonal_elementwise(stencil, block_size):
+    # Stencils with undefined entries are processed element by element
     stencils = create_empty_multidimensional_array(block_size)
     empty_stencil = Stencil(stencils, stencil.dimension)
 
@@ -220,21 +298,33 @@ def block_diagonal(stencil, block_size):
 def red_black_partitioning(stencil, grid):
     if stencil is None:
         return None
-    tmp = determine_maximal_shape(stencil)
-    shape = tuple(2 * n for n in tmp)
-    empty_stencil = Stencil(create_empty_multidimensional_array(shape), stencil.dimension)
+    return red_black_filters(tuple(determine_maximal_shape(stencil)), grid.dimension)
+
+
+@lru_cache(maxsize=None)
+def red_black_filters(maximal_shape: tuple, dimension: int):
+    # The filters only depend on the maximal shape of the stencil and the dimension
+    red_filter, black_filter = dense.red_black_filters(maximal_shape)
+    return from_dense(red_filter), from_dense(black_filter)
+
+
+def red_black_filters_elementwise(maximal_shape: tuple, dimension: int):
+    shape = tuple(2 * n for n in maximal_shape)
+    empty_stencil = Stencil(create_empty_multidimensional_array(shape), dimension)
+    unit_stencil = constant.Stencil((((0,) * dimension, 1.0),))
+    null_stencil = constant.Stencil(entries=(), dimension=dimension)
 
     def red(_, index):
-        if sum(tuple(i // j for i, j in zip(index, tmp))) % 2 == 0:
-            return constant.get_unit_stencil(grid)
+        if sum(tuple(i // j for i, j in zip(index, maximal_shape))) % 2 == 0:
+            return unit_stencil
         else:
-            return constant.get_null_stencil(grid)
+            return null_stencil
 
     def black(_, index):
-        if sum(tuple(i // j for i, j in zip(index, tmp))) % 2 == 0:
-            return constant.get_null_stencil(grid)
+        if sum(tuple(i // j for i, j in zip(index, maximal_shape))) % 2 == 0:
+            return null_stencil
         else:
-            return constant.get_unit_stencil(grid)
+            return unit_stencil
     red_filter = indexed_map_stencil(empty_stencil, red)
     black_filter = indexed_map_stencil(empty_stencil, black)
     return red_filter, black_filter
@@ -93,11 +93,14 @@ def main():
     if not os.path.exists(f'{cwd}/{problem_name}'):
         os.makedirs(f'{cwd}/{problem_name}')
     checkpoint_directory_path = f'{cwd}/{problem_name}/checkpoints_{mpi_rank}'
+    # Number of candidate programs that are generated, compiled and evaluated concurrently on each MPI process
+    number_of_evaluation_workers = 1
     optimizer = Optimizer(dimension, finest_grid, coarsening_factors, min_level, max_level, equations, operators, fields,
                           mpi_comm=comm, mpi_rank=mpi_rank, number_of_mpi_processes=nprocs,
                           convergence_evaluator=convergence_evaluator,
                           performance_evaluator=performance_evaluator, program_generator=program_generator,
-                          epsilon=epsilon, infinity=infinity, checkpoint_directory_path=checkpoint_directory_path)
+                          epsilon=epsilon, infinity=infinity, checkpoint_directory_path=checkpoint_directory_path,
+                          number_of_evaluation_workers=number_of_evaluation_workers)
 
     # restart_from_checkpoint = True
     restart_from_checkpoint = False
@@ -115,6 +118,9 @@ def main():
         elif sys.argv[1].upper() == "RANDOM":
             optimization_method = optimizer.multi_objective_random_search
 
+    # Asynchronous steady-state evolution, useful in combination with multiple evaluation workers
+    steady_state = False
+
     crossover_probability = 2.0/3.0
     mutation_probability = 1.0 - crossover_probability
     minimum_solver_iterations = 8
@@ -131,7 +137,8 @@ def main():
                                                                restart_from_checkpoint=restart_from_checkpoint,
                                                                krylov_subspace_methods=krylov_subspace_methods,
                                                                minimum_solver_iterations=minimum_solver_iterations,
-                                                               maximum_solver_iterations=maximum_solver_iterations)
+                                                               maximum_solver_iterations=maximum_solver_iterations,
+                                                               steady_state=steady_state)
     
     if mpi_rank == 0:
         print(f'ExaSlang representation:\n{program}\n', flush=True)
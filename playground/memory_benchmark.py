@@ -0,0 +1,77 @@
+import argparse
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import tracemalloc
+import sympy
+from deap import gp
+from evostencils.expressions import base, system
+from evostencils.genetic_programming import genGrow
+from evostencils.initialization import multigrid as mg
+from evostencils.stencils import constant, gallery
+
+# Measures the memory that is allocated for the expression trees returned by gp.compile
+# With --baseline, the same measurement is repeated on a checkout of the given git revision for comparison,
+# e.g. the revision before the expression classes were slotted and the grids were interned
+parser = argparse.ArgumentParser()
+parser.add_argument('--number-of-individuals', type=int, default=1000)
+parser.add_argument('--depth', type=int, default=2)
+parser.add_argument('--seed', type=int, default=0)
+parser.add_argument('--baseline', default=None, help='git revision to compare with')
+args = parser.parse_args()
+
+dimension = 2
+coarsening_factors = [(2, 2)]
+max_level = 8
+size = 2 ** max_level
+grid = [base.Grid((size, size), (1.0 / size, 1.0 / size), max_level)]
+fields = [sympy.Symbol('u')]
+equations = [mg.EquationInfo('equation', max_level, 'A@finest * u@finest == f@finest')]
+
+# Full weighting restriction and bilinear interpolation
+weights = {0: 4, 1: 2, 2: 1}
+full_weighting = constant.Stencil(tuple(((i, j), weights[abs(i) + abs(j)] / 16)
+                                        for i in (-1, 0, 1) for j in (-1, 0, 1)), dimension)
+interpolation = constant.scale(4, full_weighting)
+operators = []
+level_grid = grid[0]
+for level in range(max_level, max_level - args.depth - 1, -1):
+    operators.append(mg.OperatorInfo('A', level, gallery.Poisson2D().generate_stencil(level_grid)))
+    operators.append(mg.OperatorInfo('R', level, full_weighting, base.Restriction))
+    operators.append(mg.OperatorInfo('P', level, interpolation, base.Prolongation))
+    level_grid = base.get_coarse_grid(level_grid, coarsening_factors[0])
+
+approximation = system.Approximation('x', [base.Approximation('u', grid[0])])
+rhs = system.RightHandSide('b', [base.RightHandSide('f', grid[0])])
+pset, _ = mg.generate_primitive_set(approximation, rhs, dimension, coarsening_factors, max_level, equations,
+                                    operators, fields, depth=args.depth,
+                                    krylov_subspace_methods=('ConjugateGradient', 'BiCGStab', 'MinRes',
+                                                             'ConjugateResidual'))
+
+random.seed(args.seed)
+individuals = [gp.PrimitiveTree(genGrow(pset, 0, 50)) for _ in range(args.number_of_individuals)]
+
+tracemalloc.start()
+before, _ = tracemalloc.get_traced_memory()
+compiled_individuals = [gp.compile(individual, pset) for individual in individuals]
+after, peak = tracemalloc.get_traced_memory()
+tracemalloc.stop()
+# Equal in both runs if the same individuals are measured
+print(f'Nodes per individual: {sum(len(individual) for individual in individuals) / args.number_of_individuals:.1f}')
+print(f'Bytes per compiled individual: {(after - before) / args.number_of_individuals:.0f}')
+print(f'Peak bytes per compiled individual: {(peak - before) / args.number_of_individuals:.0f}', flush=True)
+
+if args.baseline is not None:
+    repository_path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    with tempfile.TemporaryDirectory() as directory:
+        # Only the package is taken from the baseline, such that the same individuals are measured
+        archive = subprocess.run(['git', '-C', repository_path, 'archive', args.baseline, 'evostencils'],
+                                 stdout=subprocess.PIPE, check=True)
+        subprocess.run(['tar', '-x', '-C', directory], input=archive.stdout, check=True)
+        environment = dict(os.environ, PYTHONPATH=directory)
+        print(f'Baseline {args.baseline}:', flush=True)
+        subprocess.run([sys.executable, os.path.abspath(__file__),
+                        '--number-of-individuals', str(args.number_of_individuals),
+                        '--depth', str(args.depth), '--seed', str(args.seed)], env=environment, check=True)
@@ -0,0 +1,51 @@
+import os
+from evostencils.code_generation.cache import EvaluationCache
+
+
+def test_round_trip(tmp_path):
+    cache = EvaluationCache(str(tmp_path))
+    key = EvaluationCache.compute_key(['program', 'settings'])
+    assert cache.lookup(key) is None
+    cache.insert(key, (0.125, 1.5, 7))
+    assert cache.lookup(key) == (0.125, 1.5, 7)
+    assert (cache.hits, cache.misses) == (1, 1)
+    # Entries persist across instances
+    assert EvaluationCache(str(tmp_path)).lookup(key) == (0.125, 1.5, 7)
+
+
+def test_keys_separate_contents():
+    assert EvaluationCache.compute_key(['ab', 'c']) != EvaluationCache.compute_key(['a', 'bc'])
+
+
+def test_overwrite_does_not_count_twice(tmp_path):
+    cache = EvaluationCache(str(tmp_path))
+    cache.insert('key', (1.0, 2.0, 3))
+    cache.insert('key', (4.0, 5.0, 6))
+    assert cache.number_of_entries == 1
+    assert cache.lookup('key') == (4.0, 5.0, 6)
+
+
+def test_evicts_least_recently_used_entries(tmp_path):
+    cache = EvaluationCache(str(tmp_path), maximum_number_of_entries=10)
+    for i in range(10):
+        cache.insert(f'key{i}', (i, 0.0, 0))
+        os.utime(tmp_path / f'key{i}.json', (i, i))
+    # A lookup marks an entry as recently used
+    assert cache.lookup('key0') is not None
+    assert cache.number_of_entries == 10
+    cache.insert('key10', (10, 0.0, 0))
+    # Eviction reduces the cache to the eviction ratio of the maximum
+    assert cache.number_of_entries == 9
+    assert cache.scan()[0] == 9
+    assert cache.lookup('key0') is not None
+    assert cache.lookup('key1') is None
+    assert cache.lookup('key2') is None
+    assert cache.lookup('key10') is not None
+
+
+def test_evicts_when_maximum_size_is_exceeded(tmp_path):
+    cache = EvaluationCache(str(tmp_path), maximum_size=100)
+    for i in range(10):
+        cache.insert(f'key{i}', (i, 0.0, 0))
+    assert cache.size <= 100
+    assert cache.scan() == (cache.number_of_entries, cache.size)
@@ -0,0 +1,11 @@
+from evostencils.stencils import constant
+
+
+def test_index_maps_offsets_to_values():
+    stencil = constant.Stencil((((-1, 0), -1.0), ((0, 0), 4.0), ((1, 0), -1.0)))
+    assert stencil.index == {(-1, 0): -1.0, (0, 0): 4.0, (1, 0): -1.0}
+
+
+def test_index_sums_duplicate_offsets():
+    stencil = constant.Stencil((((0, 0), 1.0), ((1, 0), 2.0), ((0, 0), 3.0)))
+    assert stencil.index[(0, 0)] == 4.0
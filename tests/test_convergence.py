@@ -0,0 +1,66 @@
+import pytest
+from evostencils.expressions import base
+from evostencils.evaluation.convergence import ConvergenceEvaluator
+from evostencils.evaluation import fourier
+from test_fourier import coarsening_factor, two_grid_cycle
+
+
+def test_decision_thresholds_are_sent_to_running_workers():
+    size = 64
+    step_size = 1 / size
+    grid = base.Grid((size, size), (step_size, step_size), 8)
+    evaluator = ConvergenceEvaluator(2, [coarsening_factor], [fourier.Grid(2, (step_size, step_size))],
+                                     backend='numpy', adaptive_resolution=True, minimum_resolution=8, resolution=64,
+                                     number_of_workers=1, timeout=60)
+    try:
+        evaluator.reinitialize_lfa_grids([grid], 2)
+        cycle = two_grid_cycle(grid, 1, 0.8)
+        # The coarse estimate of about 0.29 is far from the default thresholds
+        assert evaluator.compute_spectral_radius(cycle) == pytest.approx(0.291, abs=1e-3)
+        assert evaluator.resolutions == [8]
+        worker_pool = evaluator.worker_pool
+        evaluator.set_decision_thresholds([0.9, 1.0, 0.3])
+        # The estimate is refined close to the new threshold
+        assert evaluator.compute_spectral_radius(cycle) == pytest.approx(0.342, abs=1e-3)
+        assert evaluator.resolutions == [16]
+        assert evaluator.worker_pool is worker_pool
+        assert worker_pool.number_of_restarts == 0
+    finally:
+        evaluator.shutdown()
+
+
+def create_evaluator(grid, **kwargs):
+    step_size = grid.step_size
+    evaluator = ConvergenceEvaluator(2, [coarsening_factor], [fourier.Grid(2, step_size)], backend='numpy',
+                                     timeout=None, **kwargs)
+    evaluator.reinitialize_lfa_grids([grid], 2)
+    return evaluator
+
+
+def test_all_metrics_are_computed_from_one_symbol(monkeypatch):
+    size = 64
+    grid = base.Grid((size, size), (1 / size, 1 / size), 8)
+    evaluator = create_evaluator(grid, metrics=('spectral_radius', 'spectral_norm', 'k_step_norm'), number_of_steps=4)
+    number_of_symbols = []
+    symbol = fourier.Node.symbol
+
+    def counting_symbol(node, *args, **kwargs):
+        number_of_symbols.append(node)
+        return symbol(node, *args, **kwargs)
+    monkeypatch.setattr(fourier.Node, 'symbol', counting_symbol)
+    metrics, = evaluator.compute_convergence_metrics([two_grid_cycle(grid, 1, 0.8)])
+    assert len(number_of_symbols) == 1
+    assert metrics['spectral_radius'] == pytest.approx(0.359, abs=1e-3)
+    # The norm of k iterations approaches the spectral radius from above
+    assert metrics['spectral_radius'] <= metrics['k_step_norm'] <= metrics['spectral_norm']
+
+
+def test_k_step_norm_requires_numpy_backend(monkeypatch):
+    size = 64
+    grid = base.Grid((size, size), (1 / size, 1 / size), 8)
+    evaluator = create_evaluator(grid)
+    # Any other backend
+    monkeypatch.setattr(evaluator, '_backend', None)
+    evaluator.set_metrics(('spectral_norm',))
+    with pytest.raises(RuntimeError):
+        evaluator.set_metrics(('k_step_norm',))
@@ -0,0 +1,48 @@
+import pytest
+from evostencils.expressions import base, system
+from evostencils.expressions.dag import ExpressionTable
+from evostencils.stencils import gallery
+
+
+def jacobi_iteration(relaxation_factor, grid=None):
+    # A new expression tree is constructed on each call
+    if grid is None:
+        grid = base.Grid((64, 64), (1 / 64, 1 / 64), 6)
+    A = system.Operator('A', [[base.Operator('A', grid, gallery.Poisson2D())]])
+    u = system.Approximation('u', [base.Approximation('u', grid)])
+    f = system.RightHandSide('f', [base.RightHandSide('f', grid)])
+    correction = base.Multiplication(base.Inverse(system.Diagonal(A)), base.Residual(A, u, f))
+    return base.Cycle(u, f, correction, relaxation_factor=relaxation_factor)
+
+
+def test_equal_expressions_share_nodes():
+    table = ExpressionTable()
+    node = table.intern(jacobi_iteration(0.8))
+    assert node is not None
+    assert table.intern(jacobi_iteration(0.8)) is node
+    other = table.intern(jacobi_iteration(0.6))
+    assert other is not node
+    # Only the cycle itself differs
+    assert other.children == node.children
+
+
+def test_different_grids_give_different_nodes():
+    table = ExpressionTable()
+    grid = base.Grid((32, 32), (1 / 32, 1 / 32), 5)
+    assert table.intern(jacobi_iteration(0.8)) is not table.intern(jacobi_iteration(0.8, grid))
+
+
+def test_nodes_are_immutable():
+    node = ExpressionTable().intern(jacobi_iteration(0.8))
+    with pytest.raises(AttributeError):
+        node.foo = 1
+
+
+def test_eviction_bounds_number_of_nodes():
+    table = ExpressionTable(maximum_number_of_nodes=5)
+    for i in range(10):
+        table.intern(jacobi_iteration(i / 10))
+        assert table.number_of_nodes <= 5
+    table.runtimes[table.intern(jacobi_iteration(0.8)).id] = 1.0
+    table.clear()
+    assert table.number_of_nodes == 0 and len(table.runtimes) == 0
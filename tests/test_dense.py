@@ -0,0 +1,119 @@
+import pytest
+from evostencils.expressions import base
+from evostencils.stencils import constant, gallery, periodic
+
+block_sizes = [(1, 1), (1, 2), (2, 2), (3, 1), (4, 4)]
+
+
+@pytest.fixture(autouse=True)
+def dense_path(monkeypatch):
+    # The test stencils are smaller than the size from which the dense representation is used
+    monkeypatch.setattr(periodic, 'minimum_number_of_dense_positions', 1)
+
+
+def positions(stencil):
+    # Maps each position within the period to the entries of its constant stencil
+    if isinstance(stencil, constant.Stencil):
+        return {(): dict(stencil.entries)}
+    result = {}
+
+    def recursive_descent(array, index):
+        if len(index) == stencil.dimension:
+            result[index] = dict(array.entries)
+        else:
+            for i, element in enumerate(array):
+                recursive_descent(element, index + (i,))
+    recursive_descent(stencil.constant_stencils, ())
+    return result
+
+
+def periodic_stencil():
+    # Rectangular 2x2 period with a different stencil at each position
+    def entries(i, j):
+        return constant.Stencil((((0, 0), 4.0 + i + 2 * j), ((-1, 0), -1.0 - i), ((1, 0), -1.0),
+                                 ((0, -1), -1.0 - j), ((0, 1), -0.5), ((1, 1), 0.25 * (i + j))))
+    return periodic.Stencil(tuple(tuple(entries(i, j) for j in range(2)) for i in range(2)), 2)
+
+
+def poisson_stencil():
+    grid = base.Grid((64, 64), (1 / 64, 1 / 64), 6)
+    return gallery.Poisson2D().generate_stencil(grid)
+
+
+@pytest.mark.parametrize('block_size', block_sizes)
+@pytest.mark.parametrize('make_stencil', [poisson_stencil, periodic_stencil])
+def test_block_diagonal_matches_elementwise(make_stencil, block_size):
+    stencil = make_stencil()
+    result = periodic.block_diagonal(stencil, block_size)
+    expected = periodic.block_diagonal_elementwise(stencil, block_size)
+    assert periodic.determine_maximal_shape(result) == periodic.determine_maximal_shape(expected)
+    assert positions(result) == positions(expected)
+
+
+def test_dense_round_trip():
+    stencil = periodic_stencil()
+    assert positions(periodic.from_dense(periodic.to_dense(stencil))) == positions(stencil)
+
+
+def diagonal_stencil():
+    return periodic.diagonal(periodic_stencil())
+
+
+unary_operations = [
+    # constant.diagonal relies on np.int, which is not available in current NumPy versions
+    (periodic.diagonal, lambda s: constant.filter_stencil(s, lambda offset, _: all(i == 0 for i in offset))),
+    (periodic.lower, constant.lower),
+    (periodic.upper, constant.upper),
+    (periodic.transpose, constant.transpose),
+]
+
+
+def normalized_positions(stencil):
+    # Offsets are compared as tuples, as the elementwise transpose returns arrays
+    result = {}
+
+    def recursive_descent(array, index):
+        if len(index) == stencil.dimension:
+            result[index] = {tuple(int(i) for i in offset): value for offset, value in array.entries}
+        else:
+            for i, element in enumerate(array):
+                recursive_descent(element, index + (i,))
+    recursive_descent(stencil.constant_stencils, ())
+    return result
+
+
+@pytest.mark.parametrize('operation, constant_operation', unary_operations)
+@pytest.mark.parametrize('make_stencil', [poisson_stencil, periodic_stencil])
+def test_unary_operations_match_elementwise(make_stencil, operation, constant_operation):
+    stencil = make_stencil()
+    expected = periodic.map_stencil(stencil, constant_operation)
+    assert normalized_positions(operation(stencil)) == normalized_positions(expected)
+
+
+@pytest.mark.parametrize('make_stencil1, make_stencil2', [(poisson_stencil, periodic_stencil),
+                                                          (periodic_stencil, periodic_stencil),
+                                                          (diagonal_stencil, poisson_stencil)])
+def test_mul_matches_elementwise(make_stencil1, make_stencil2):
+    stencil1, stencil2 = make_stencil1(), make_stencil2()
+    result = normalized_positions(periodic.mul(stencil1, stencil2))
+    expected = normalized_positions(periodic.combine(stencil1, stencil2, constant.mul))
+    assert result.keys() == expected.keys()
+    for index in expected:
+        assert result[index] == pytest.approx(expected[index])
+
+
+@pytest.mark.parametrize('maximal_shape', [(1, 1), (2, 1), (2, 3, 2)])
+def test_red_black_filters_match_elementwise(maximal_shape):
+    dimension = len(maximal_shape)
+    red, black = periodic.red_black_filters(maximal_shape, dimension)
+    expected_red, expected_black = periodic.red_black_filters_elementwise(maximal_shape, dimension)
+    assert positions(red) == positions(expected_red)
+    assert positions(black) == positions(expected_black)
+
+
+def test_small_stencils_are_processed_elementwise(monkeypatch):
+    monkeypatch.setattr(periodic, 'minimum_number_of_dense_positions', 64)
+    assert periodic.apply_dense(periodic.dense.transpose, periodic_stencil()) is None
+    large_stencil = periodic.Stencil(tuple(tuple(periodic_stencil().constant_stencils[i % 2][j % 2]
+                                                 for j in range(8)) for i in range(8)), 2)
+    assert periodic.apply_dense(periodic.dense.transpose, large_stencil) is not None
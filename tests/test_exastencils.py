@@ -0,0 +1,57 @@
+import pytest
+from evostencils.code_generation.exastencils import ProgramGenerator, BATCH_MARKER
+
+
+def solver_output(convergence_factors, time_to_solution):
+    lines = ['Initial residual: 1.0']
+    lines += [f'Residual after {i + 1} iterations is {0.1 ** (i + 1)}, convergence factor is {rho}'
+              for i, rho in enumerate(convergence_factors)]
+    lines += ['Total number of iterations: ' + str(len(convergence_factors)),
+              f'Mean time to solution: {time_to_solution} ms']
+    return '\n'.join(lines) + '\n'
+
+
+def test_parse_output():
+    time_to_solution, convergence_factor, number_of_iterations = \
+        ProgramGenerator.parse_output(solver_output([0.25, 0.25, 0.25], 12.5), 1e300)
+    assert time_to_solution == 12.5
+    assert convergence_factor == pytest.approx(0.25)
+    assert number_of_iterations == 3
+
+
+def test_parse_batched_output():
+    times = [12.0, 10.0, 11.0]
+    output = ''.join(solver_output([0.5, 0.5], t) + BATCH_MARKER + '\n' for t in times)
+    samples = ProgramGenerator.parse_batched_output(output, 1e300)
+    assert [time_to_solution for time_to_solution, _, _ in samples] == times
+    assert all(convergence_factor == pytest.approx(0.5) for _, convergence_factor, _ in samples)
+    statistics = ProgramGenerator.compute_sample_statistics(samples)
+    assert statistics['median'] == 11.0
+    assert statistics['variance'] == pytest.approx(2 / 3)
+
+
+def test_parse_incomplete_batched_output():
+    # The output of a sample that has not been completed is ignored
+    output = solver_output([0.5], 10.0) + BATCH_MARKER + '\n' + 'Initial residual: 1.0\n'
+    assert len(ProgramGenerator.parse_batched_output(output, 1e300)) == 1
+    # Malformed samples invalidate the whole batch
+    assert ProgramGenerator.parse_batched_output('garbage\n' + BATCH_MARKER + '\n', 1e300) == []
+
+
+def count_diverging_iterations(lines):
+    number_of_diverging_iterations = 0
+    for line in lines:
+        number_of_diverging_iterations = ProgramGenerator.count_diverging_iterations(line, number_of_diverging_iterations)
+    return number_of_diverging_iterations
+
+
+def test_count_diverging_iterations():
+    lines = solver_output([0.5, 1.5, 2.0, float('nan')], 10.0).encode('utf8').split(b'\n')
+    assert count_diverging_iterations(lines) == 3
+    # A converging iteration resets the count
+    lines = solver_output([1.5, 2.0, 0.5, 1.5], 10.0).encode('utf8').split(b'\n')
+    assert count_diverging_iterations(lines) == 1
+    # Lines without a convergence factor and incomplete numbers are ignored
+    assert count_diverging_iterations([b'convergence factor is 1.5', b'Initial residual: 1.0',
+                                       b'convergence factor is 1.25']) == 2
+    assert count_diverging_iterations([b'convergence factor is 1.5', b'convergence factor is ']) == 1
@@ -0,0 +1,49 @@
+import pytest
+from evostencils.expressions import base, system
+from evostencils.stencils import gallery, constant
+from evostencils.evaluation.convergence import ConvergenceEvaluator
+from evostencils.evaluation import fourier
+
+coarsening_factor = (2, 2)
+
+
+def two_grid_cycle(grid, steps, relaxation_factor):
+    coarse_grid = base.get_coarse_grid(grid, coarsening_factor)
+    # Full weighting restriction and bilinear interpolation
+    full_weighting = constant.Stencil(tuple(((i, j), (2 - abs(i)) * (2 - abs(j)) / 16)
+                                            for i in (-1, 0, 1) for j in (-1, 0, 1)))
+    A = system.Operator('A', [[base.Operator('A', grid, gallery.Poisson2D())]])
+    A_c = system.Operator('A', [[base.Operator('A', coarse_grid, gallery.Poisson2D())]])
+    R = system.Restriction('R', [base.Restriction('R', grid, coarse_grid,
+                                                  base.ConstantStencilGenerator(full_weighting))])
+    P = system.Prolongation('P', [base.Prolongation('P', grid, coarse_grid,
+                                                    base.ConstantStencilGenerator(constant.scale(4, full_weighting)))])
+    u = system.Approximation('u', [base.Approximation('u', grid)])
+    f = system.RightHandSide('f', [base.RightHandSide('f', grid)])
+
+    def smooth(x):
+        for _ in range(steps):
+            correction = base.Multiplication(base.Inverse(system.Diagonal(A)), base.Residual(A, x, f))
+            x = base.Cycle(x, f, correction, relaxation_factor=relaxation_factor)
+        return x
+
+    cycle = smooth(u)
+    coarse_grid_correction = base.Multiplication(P, base.Multiplication(
+        base.CoarseGridSolver(A_c), base.Multiplication(R, base.Residual(A, cycle, f))))
+    cycle = base.Cycle(cycle, f, coarse_grid_correction)
+    return smooth(cycle)
+
+
+# Two-grid convergence factors of damped Jacobi (omega = 0.8) for the 2D Poisson problem
+@pytest.mark.parametrize('size, steps, expected', [(64, 1, 0.359), (256, 2, 0.136)])
+def test_two_grid_convergence_factor(size, steps, expected):
+    step_size = 1 / size
+    grid = base.Grid((size, size), (step_size, step_size), 8)
+    evaluator = ConvergenceEvaluator(2, [coarsening_factor], [fourier.Grid(2, (step_size, step_size))],
+                                     backend='numpy')
+    try:
+        evaluator.reinitialize_lfa_grids([grid], 2)
+        spectral_radius = evaluator.compute_spectral_radius(two_grid_cycle(grid, steps, 0.8))
+    finally:
+        evaluator.shutdown()
+    assert spectral_radius == pytest.approx(expected, abs=1e-3)
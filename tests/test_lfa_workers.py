@@ -0,0 +1,73 @@
+import os
+import time
+from evostencils.evaluation.lfa_workers import LFAWorkerPool
+
+
+def evaluate(task):
+    if task == 'crash':
+        os._exit(1)
+    if task == 'hang':
+        time.sleep(60)
+    if task == 'fail':
+        raise RuntimeError('LFA failed')
+    return task * task
+
+
+def test_results_keep_task_order():
+    pool = LFAWorkerPool(evaluate, number_of_workers=3, timeout=10)
+    try:
+        assert pool.map(list(range(10))) == [i * i for i in range(10)]
+    finally:
+        pool.stop()
+
+
+def test_failures_return_default():
+    pool = LFAWorkerPool(evaluate, number_of_workers=2, timeout=1, default=-1)
+    try:
+        assert pool.map([2, 'crash', 'fail', 'hang', 3]) == [4, -1, -1, -1, 9]
+        assert pool.number_of_timeouts == 1
+        assert pool.number_of_restarts == 2
+        # Restarted workers remain usable
+        assert pool.map([4, 5]) == [16, 25]
+    finally:
+        pool.stop()
+
+
+def test_task_is_retried_if_worker_died_while_idle():
+    pool = LFAWorkerPool(evaluate, number_of_workers=2, timeout=10, default=-1)
+    try:
+        pool.start()
+        for process, _ in pool._workers:
+            process.kill()
+            process.join()
+        assert pool.map([2, 3, 4]) == [4, 9, 16]
+        assert pool.number_of_restarts == 2
+    finally:
+        pool.stop()
+
+
+def test_unpicklable_task_uses_fallback():
+    pool = LFAWorkerPool(evaluate, number_of_workers=1, timeout=10, default=-1)
+    try:
+        assert pool.map([2, lambda: None, 3], fallback=lambda task: 0) == [4, 0, 9]
+    finally:
+        pool.stop()
+
+
+class DeadWorkerPool(LFAWorkerPool):
+    # Workers die immediately after they have been started
+    def _start_worker(self):
+        process, connection = super()._start_worker()
+        process.kill()
+        process.join()
+        return process, connection
+
+
+def test_retries_are_limited():
+    pool = DeadWorkerPool(evaluate, number_of_workers=1, timeout=10, default=-1, maximum_number_of_retries=2)
+    try:
+        assert pool.map([2, 3], fallback=lambda task: 0) == [0, 0]
+        assert pool.number_of_restarts == 6
+        assert pool.map([2]) == [-1]
+    finally:
+        pool.stop()
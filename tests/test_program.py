@@ -0,0 +1,257 @@
+import multiprocessing
+import operator
+import sympy
+import pytest
+from deap import creator, gp, tools
+from evostencils.expressions import base
+from evostencils.initialization.multigrid import EquationInfo
+from evostencils.optimization.program import Optimizer, acquire_worker_id
+
+
+def _worker_id(_):
+    return _pool_worker_id
+
+
+def _initialize(worker_counter):
+    global _pool_worker_id
+    _pool_worker_id = acquire_worker_id(worker_counter)
+
+
+def test_replacement_workers_obtain_new_ids():
+    context = multiprocessing.get_context('fork')
+    worker_counter = context.Value('i', 0)
+    # Each worker is replaced after a single task, as if it had died
+    with context.Pool(2, initializer=_initialize, initargs=(worker_counter,), maxtasksperchild=1) as pool:
+        worker_ids = pool.map(_worker_id, range(6), chunksize=1)
+    assert len(set(worker_ids)) == 6
+
+
+class ProgramGenerator:
+    # Replaces the code generation, as the evaluation is defined by the toolbox
+    evaluation_time_limit = None
+    terminated_evaluations = 0
+
+    def create_worker(self, _):
+        return self
+
+    def shutdown_compiler_server(self):
+        pass
+
+
+pset = gp.PrimitiveSet('main', 0)
+pset.addPrimitive(operator.add, 2)
+for i in range(1, 5):
+    pset.addTerminal(i)
+
+
+def evaluate(individual):
+    # Larger trees converge faster but need more time per iteration
+    return 1 / (1 + len(individual)), float(len(individual))
+
+
+def create_optimizer(**kwargs):
+    grid = [base.Grid((8, 8), (1 / 8, 1 / 8), 3)]
+    optimizer = Optimizer(2, grid, [(2, 2)], 2, 3, [EquationInfo('eq', 3, 'A * u == f')], [], [sympy.Symbol('u')],
+                          ProgramGenerator(), **kwargs)
+    optimizer._init_toolbox(pset)
+    toolbox = optimizer._toolbox
+    toolbox.register('expression', gp.genFull, pset=pset, min_=1, max_=3)
+    optimizer._init_multi_objective_toolbox(pset)
+    toolbox.register('evaluate', evaluate)
+    toolbox.register('select', tools.selNSGA2)
+    toolbox.register('select_for_mating', tools.selRandom)
+    toolbox.register('mutate', gp.mutNodeReplacement, pset=pset)
+    return optimizer
+
+
+def run_steady_state(optimizer, generations=3, mu=8, lambda_=4):
+    hof = tools.ParetoFront()
+    statistics = tools.Statistics(lambda individual: individual.fitness.values)
+    population, logbook, hof = optimizer.ea_steady_state(mu, generations, mu, lambda_, 0.5, 0.3, 2, 3, '', None,
+                                                         [], 100, None, statistics, hof)
+    return population, logbook, hof
+
+
+@pytest.mark.parametrize('number_of_evaluation_workers', [1, 2])
+def test_steady_state_evaluates_lambda_individuals_per_generation(number_of_evaluation_workers):
+    optimizer = create_optimizer(number_of_evaluation_workers=number_of_evaluation_workers)
+    try:
+        population, logbook, hof = run_steady_state(optimizer)
+    finally:
+        optimizer.stop_evaluation_pool()
+    assert logbook.select('gen') == [0, 1, 2, 3]
+    assert logbook.select('nevals') == [8, 4, 4, 4]
+    assert len(population) == 8
+    assert all(individual.fitness.valid for individual in population)
+    # The fitness of each individual matches its own evaluation
+    assert all(individual.fitness.values == evaluate(individual) for individual in population)
+    assert all(individual.fitness.values == evaluate(individual) for individual in hof)
+
+
+def test_steady_state_measures_each_offspring():
+    optimizer = create_optimizer()
+    evaluated = []
+
+    def counting_evaluate(individual):
+        evaluated.append(str(individual))
+        return evaluate(individual)
+    optimizer._toolbox.register('evaluate', counting_evaluate)
+    run_steady_state(optimizer, generations=5, lambda_=6)
+    assert len(evaluated) == 8 + 5 * 6
+
+
+class Request:
+    def __init__(self, data=None):
+        self.data = data
+
+    def Test(self):
+        return True
+
+    def wait(self):
+        return self.data
+
+    def Cancel(self):
+        pass
+
+
+class Communicator:
+    # Simulates the neighbors of rank 0 in a ring of three processes
+    def __init__(self, colonies):
+        self.colonies = colonies
+        self.sent = []
+        self.number_of_barriers = 0
+
+    def irecv(self, source, tag):
+        return Request(self.colonies[source])
+
+    def isend(self, data, destination, tag):
+        self.sent.append((destination, data))
+        return Request()
+
+    def barrier(self):
+        self.number_of_barriers += 1
+
+    def allgather(self, data):
+        return [data] + [colony[:len(data)] for colony in self.colonies.values()]
+
+
+def test_migration_exchanges_colonies_with_both_neighbors():
+    optimizer = create_optimizer()
+    toolbox = optimizer._toolbox
+    population = toolbox.population(n=8)
+    colonies = {1: toolbox.population(n=4), 2: toolbox.population(n=4)}
+    for individual in population + colonies[1] + colonies[2]:
+        individual.fitness.values = evaluate(individual)
+    communicator = Communicator(colonies)
+    optimizer._mpi_comm = communicator
+    optimizer._number_of_mpi_processes = 3
+    receive_requests = optimizer.start_migration()
+    selected, receive_requests = optimizer.migrate(list(population), receive_requests, 8)
+    assert len(selected) == 8
+    assert len(receive_requests) == 2
+    assert communicator.number_of_barriers == 1
+    # Half of the population is sent to each neighbor
+    assert sorted(destination for destination, _ in communicator.sent) == [1, 2]
+    assert all(len(data) == 4 for _, data in communicator.sent)
+    # The selection includes the immigrants
+    immigrants = set(map(id, colonies[1] + colonies[2]))
+    candidates = set(map(id, population)) | immigrants
+    assert all(id(individual) in candidates for individual in selected)
+    final_population = optimizer.finish_migration(list(population), receive_requests)
+    assert len(final_population) > len(population) + 8
+
+
+def create_individuals(expressions):
+    return [creator.MultiObjectiveIndividual(gp.PrimitiveTree.from_string(expression, pset))
+            for expression in expressions]
+
+
+def register_estimates(optimizer, estimates):
+    def estimate_batch(individuals, count_evaluations=True):
+        return [estimates[str(individual)] for individual in individuals]
+    optimizer._toolbox.register('estimate_batch', estimate_batch)
+
+
+def test_prescreening_only_evaluates_candidates_close_to_the_front():
+    optimizer = create_optimizer(prescreening_margin=0.1)
+    # Evaluators are only required to be present
+    optimizer._convergence_evaluator = optimizer._performance_evaluator = object()
+    expressions = ['add(1, 2)', 'add(3, 4)', 'add(1, 1)', 'add(2, 2)']
+    individuals = create_individuals(expressions)
+    estimates = {
+        # Dominated by far
+        'add(1, 2)': (0.5, 5.0),
+        'add(3, 4)': (0.1, 1.0),
+        # Dominated, but within the margin
+        'add(1, 1)': (0.105, 1.05),
+        # Not dominated
+        'add(2, 2)': (0.05, 2.0),
+    }
+    register_estimates(optimizer, estimates)
+    evaluated = []
+
+    def measure(individual):
+        evaluated.append(str(individual))
+        return evaluate(individual)
+    optimizer._toolbox.register('evaluate', measure)
+    fitnesses = optimizer.map(optimizer._toolbox.evaluate, individuals)
+    assert evaluated == expressions[1:]
+    assert [individual.fitness_estimated for individual in individuals] == [True, False, False, False]
+    assert fitnesses[0] == estimates['add(1, 2)']
+    assert fitnesses[1:] == [evaluate(individual) for individual in individuals[1:]]
+    for individual, values in zip(individuals, fitnesses):
+        individual.fitness.values = values
+    assert optimizer.discard_estimated(individuals) == individuals[1:]
+    # Estimates are not cached as measured fitnesses
+    assert str(individuals[0]) not in optimizer.individual_cache
+
+
+def test_prescreening_evaluates_cached_individuals():
+    optimizer = create_optimizer(prescreening_margin=0.0)
+    individuals = create_individuals(['add(1, 2)', 'add(3, 4)'])
+    register_estimates(optimizer, {'add(1, 2)': (0.5, 5.0), 'add(3, 4)': (0.1, 1.0)})
+    optimizer.add_individual_to_cache(individuals[0], (0.2, 2.0))
+    fitnesses = [None, None]
+    assert optimizer.prescreen(individuals, fitnesses) == [0, 1]
+    assert fitnesses == [None, None]
+    # The front of the estimates is kept for the next generation
+    individuals = create_individuals(['add(1, 1)'])
+    register_estimates(optimizer, {'add(1, 1)': (0.2, 2.0)})
+    assert optimizer.prescreen(individuals, fitnesses) == []
+    assert individuals[0].fitness_estimated
+
+
+class Surrogate:
+    def __init__(self, predictions):
+        self.predictions = predictions
+
+    def predict(self, individuals):
+        return [self.predictions[str(individual)] for individual in individuals]
+
+
+def test_surrogate_selects_the_best_ranked_fraction():
+    optimizer = create_optimizer(surrogate_fraction=0.5)
+    expressions = ['add(1, 2)', 'add(3, 4)', 'add(1, 1)', 'add(2, 2)', 'add(4, 4)']
+    individuals = create_individuals(expressions)
+    optimizer._surrogate = Surrogate({
+        'add(1, 2)': (0.2, 2.0),
+        'add(3, 4)': (0.1, 1.0),
+        'add(1, 1)': (0.5, 5.0),
+        'add(2, 2)': (0.05, 3.0),
+    })
+    # Cached individuals are always evaluated
+    optimizer.add_individual_to_cache(individuals[4], (0.3, 3.0))
+    fitnesses = [None] * len(individuals)
+    indices = optimizer.select_by_surrogate(individuals, list(range(len(individuals))), fitnesses)
+    # Non-dominated predictions are ranked first and the rest by the number of dominating predictions
+    assert indices == [1, 3, 4]
+    assert [individual.fitness_estimated for individual in individuals] == [True, False, True, False, False]
+    assert fitnesses == [(0.2, 2.0), None, (0.5, 5.0), None, None]
+
+
+def test_surrogate_is_ignored_until_trained():
+    optimizer = create_optimizer(surrogate_fraction=0.1)
+    individuals = create_individuals(['add(1, 2)', 'add(3, 4)'])
+    fitnesses = optimizer.map(optimizer._toolbox.evaluate, individuals)
+    assert fitnesses == [evaluate(individual) for individual in individuals]
+    assert not any(individual.fitness_estimated for individual in individuals)
@@ -0,0 +1,62 @@
+import math
+import operator
+import pytest
+from deap import base, creator, gp
+from evostencils.optimization.surrogate import SurrogateModel
+
+pset = gp.PrimitiveSet('main', 0)
+pset.addPrimitive(operator.add, 2, name='cycle_3')
+pset.addPrimitive(operator.neg, 1, name='smooth_2')
+block_size = ((2, 2), (1, 2))
+for terminal in (0.5, 1.5, 8, block_size):
+    pset.addTerminal(terminal)
+creator.create('SurrogateFitness', base.Fitness, weights=(-1.0, -1.0))
+creator.create('SurrogateIndividual', gp.PrimitiveTree, fitness=creator.SurrogateFitness)
+
+
+def create_individual(names):
+    # The nodes are given in prefix order
+    return creator.SurrogateIndividual([pset.mapping[name] for name in names])
+
+
+def nested_individual(depth):
+    return create_individual(['cycle_3', 'smooth_2'] * depth + ['0.5'] + ['1.5'] * depth)
+
+
+def test_extract_features():
+    features = SurrogateModel.extract_features(create_individual(['cycle_3', 'smooth_2', '0.5', 'cycle_3', '8', repr(block_size)]))
+    assert features['size'] == 6
+    assert features['cycle'] == 2
+    assert features['level_3'] == 2
+    assert features['smooth'] == 1
+    assert features['level_2'] == 1
+    assert features['krylov_iterations'] == 3
+    # Number of unknowns in all blocks
+    assert features['block_size'] == 6
+    assert features['relaxation_factor_mean'] == 0.5
+
+
+def test_fit_recovers_log_linear_objectives():
+    surrogate = SurrogateModel(regularization=1e-6, minimum_number_of_samples=4)
+    individuals = [nested_individual(depth) for depth in range(8)]
+    for individual in individuals[:3]:
+        surrogate.add_sample(individual, (math.exp(-0.1 * len(individual)), math.exp(0.2 * len(individual))))
+    # Not enough samples
+    assert not surrogate.trained
+    assert surrogate.predict(individuals) is None
+    for individual in individuals[3:6]:
+        surrogate.add_sample(individual, (math.exp(-0.1 * len(individual)), math.exp(0.2 * len(individual))))
+    # Penalized evaluations are not used for training
+    surrogate.add_sample(individuals[6], (1e300, 1e300))
+    assert surrogate.number_of_samples == 6
+    predictions = surrogate.predict(individuals[6:])
+    for individual, prediction in zip(individuals[6:], predictions):
+        expected = (math.exp(-0.1 * len(individual)), math.exp(0.2 * len(individual)))
+        assert prediction == pytest.approx(expected, rel=1e-3)
+
+
+def test_oldest_samples_are_forgotten():
+    surrogate = SurrogateModel(maximum_number_of_samples=2)
+    for depth in range(3):
+        surrogate.add_sample(nested_individual(depth), (0.5, 1.0))
+    assert surrogate.number_of_samples == 2